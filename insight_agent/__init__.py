@@ -1,4 +1,14 @@
-# Initializes the insight_agent package 
+# Initializes the insight_agent package
 
-# Make root_agent discoverable when importing the package
-from .agent import root_agent 
\ No newline at end of file
+import importlib
+
+
+# Make root_agent discoverable when importing the package. It is resolved lazily so that importing
+# the package (or one of its lightweight modules) neither builds the agent graph nor loads the SDKs;
+# ADK's `insight_agent.agent.root_agent` lookup goes through the same lazy path (see agent.py).
+def __getattr__(name):
+    if name == "root_agent":
+        return importlib.import_module(".agent", __name__).get_root_agent()
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,23 @@
+import functools
 import os
+import threading
+
 from dotenv import load_dotenv
-from google.adk.agents import Agent
-from google.adk.tools import google_search, built_in_code_execution
-from google.adk.tools.agent_tool import AgentTool # Import AgentTool
-from google.genai import types as genai_types # Import genai_types
-# Import for RAG tool
-from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
-from vertexai.preview import rag # Ensure this is the correct import for RagResource
 
 # Import prompts
-from .prompts import get_internal_coordinator_instructions, get_presenter_agent_instructions
+from .prompts import (
+    get_college_analyst_instructions,
+    get_context_compaction_note,
+    get_internal_coordinator_instructions,
+    get_presenter_agent_instructions,
+    get_search_gating_note,
+    get_unavailable_specialists_note,
+)
+
+# The agent graph is built lazily: importing this module (or the insight_agent package) only loads
+# the prompts. The ADK, google.genai and Vertex AI SDKs are imported, and the agents constructed,
+# on the first call to get_root_agent() - which is what `insight_agent.agent.root_agent` resolves
+# to (see __getattr__ at the bottom of this module). scripts/import_profile.py reports the cost.
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,112 +36,434 @@ load_dotenv()
 #         raise ValueError("GOOGLE_API_KEY not set in .env for Google AI Studio")
 # --- End Environment Variable Checks ---
 
+DEFAULT_MODEL_NAME = "gemini-2.5-flash-preview-04-17"
+
+# Specialist selection: INSIGHT_SPECIALISTS is a comma-separated subset of these keys (default: all).
+# Specialists left out are neither imported nor built, and the coordinators are told they are unavailable.
+SPECIALIST_AGENT_NAMES = {"rag": "RAGAgent", "search": "SearchAgent", "coding": "CodingAgent"}
+
+
+def model_name():
+    return os.getenv("ADK_MODEL_NAME", DEFAULT_MODEL_NAME)
+
+
+def agent_model(role):
+    """The model for an agent in `role` (see scheduler.ROLE_PRIORITY). With INSIGHT_SCHEDULER=1 its calls
+    go through the process-wide scheduler (shared quota, priorities, pooled client); otherwise it is
+    the model name."""
+    from .scheduler import scheduled_model, scheduler_enabled
+
+    return scheduled_model(model_name(), role) if scheduler_enabled() else model_name()
+
+
+def enabled_specialists():
+    """Returns the specialist keys selected by INSIGHT_SPECIALISTS, in SPECIALIST_AGENT_NAMES order."""
+    requested = os.getenv("INSIGHT_SPECIALISTS", "")
+    if not requested.strip():
+        return list(SPECIALIST_AGENT_NAMES)
+    keys = {key.strip().lower() for key in requested.split(",") if key.strip()}
+    unknown = keys - set(SPECIALIST_AGENT_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown INSIGHT_SPECIALISTS entries: {', '.join(sorted(unknown))} "
+                         f"(expected a subset of {', '.join(SPECIALIST_AGENT_NAMES)}).")
+    return [key for key in SPECIALIST_AGENT_NAMES if key in keys]
+
+
+# RAG_BACKEND selects where 'retrieve_rag_documentation' looks things up:
+#   "vertex" (default) - Vertex AI RAG Engine corpus named by RAG_CORPUS.
+#   "local"            - in-process vector index over data/, persisted under .insight_index/ (see local_retrieval.py).
+RAG_BACKEND = os.getenv("RAG_BACKEND", "vertex").lower()
+
+# Coordinator execution mode:
+#   "sequential" (default) - a single LLM coordinator works through the colleges one at a time.
+#   "parallel"             - the college list is extracted from the query and each college's
+#                            RAG -> Search -> Coding pipeline runs as its own asyncio task (see fanout.py).
+COORDINATOR_MODE = os.getenv("INSIGHT_COORDINATOR_MODE", "sequential").lower()
+
+# Presenter mode:
+#   "llm" (default) - an LLM agent calls the coordinator as a tool and writes the report.
+#   "template"      - the coordinator output is parsed and rendered deterministically (see presenter.py),
+#                     saving one model invocation per request and streaming colleges as they finish.
+PRESENTER_MODE = os.getenv("INSIGHT_PRESENTER_MODE", "llm").lower()
+
 # --- Specialist Agents Definition ---
 
-# 1. RAG Agent (using existing vertex_rag_retrieval_tool)
-vertex_rag_retrieval_tool = VertexAiRagRetrieval(
-    name='retrieve_rag_documentation',
-    description=(
-        'Use this tool to retrieve specific documentation and data about US colleges from the specialized RAG corpus. '
-        'This includes admission statistics, program details, course requirements, and other factual college-specific information.'
-    ),
-    rag_resources=[
-        rag.RagResource(rag_corpus=os.environ.get("RAG_CORPUS"))
-    ] if os.environ.get("RAG_CORPUS") else [],
-    similarity_top_k=5,
+RAG_TOOL_DESCRIPTION = (
+    'Use this tool to retrieve specific documentation and data about US colleges from the specialized RAG corpus. '
+    'This includes admission statistics, program details, course requirements, and other factual college-specific information.'
 )
 
-rag_agent = Agent(
-    name="RAGAgent",
-    model=os.getenv("ADK_MODEL_NAME", "gemini-2.5-flash-preview-04-17"),
-    instruction="You are a specialist in retrieving college information. Given a college name, use the 'retrieve_rag_documentation' tool to find data like GPA, test scores, and acceptance rates. Your final output to the Coordinator MUST be a single, concise text string summarizing the findings or clearly stating if specific data was not found or if the retrieval failed. Example: 'For [College Name]: Avg GPA: 3.5, SAT Range: 1200-1400, Acceptance Rate: 15%. Median ACT not found.' OR 'For [College Name]: Failed to retrieve data.'",
-    tools=[vertex_rag_retrieval_tool]
-)
+
+def build_rag_retrieval_tool():
+    """Builds 'retrieve_rag_documentation' for RAG_BACKEND (results are cached in-process and optionally on disk; see rag_cache.py)."""
+    from .rag_cache import get_default_cache
+    from .singleflight import get_default_singleflight, singleflight_enabled
+    from .tools import CachedVertexAiRagRetrieval, LocalRagRetrieval
+
+    # INSIGHT_SINGLEFLIGHT=1: concurrent identical retrievals share one call (see singleflight.py).
+    singleflight = get_default_singleflight() if singleflight_enabled() else None
+    if RAG_BACKEND == "local":
+        return LocalRagRetrieval(
+            cache=get_default_cache(),
+            singleflight=singleflight,
+            name='retrieve_rag_documentation',
+            description=RAG_TOOL_DESCRIPTION,
+            similarity_top_k=5,
+        )
+
+    from vertexai.preview import rag # Ensure this is the correct import for RagResource
+
+    return CachedVertexAiRagRetrieval(
+        cache=get_default_cache(),
+        singleflight=singleflight,
+        corpus_name=os.environ.get("RAG_CORPUS"),
+        name='retrieve_rag_documentation',
+        description=RAG_TOOL_DESCRIPTION,
+        rag_resources=[
+            rag.RagResource(rag_corpus=os.environ.get("RAG_CORPUS"))
+        ] if os.environ.get("RAG_CORPUS") else [],
+        similarity_top_k=5,
+    )
+
+
+# 1. RAG Agent
+def build_rag_agent():
+    from google.adk.agents import Agent
+    from .college_stats import lookup_college_stats
+
+    return Agent(
+        name="RAGAgent",
+        model=agent_model("specialist"),
+        instruction="You are a specialist in retrieving college information. Given a college name, first call the 'lookup_college_stats' tool for exact pre-extracted statistics (acceptance rate, SAT/ACT percentiles, GPA figures, graduation rate, data year). Then use the 'retrieve_rag_documentation' tool, starting with the query 'Admission statistics for <full college name>', to find any data like GPA, test scores, and acceptance rates that the lookup did not return, or other requested details. Your final output to the Coordinator MUST be a single, concise text string summarizing the findings or clearly stating if specific data was not found or if the retrieval failed. Example: 'For [College Name]: Avg GPA: 3.5, SAT Range: 1200-1400, Acceptance Rate: 15%. Median ACT not found.' OR 'For [College Name]: Failed to retrieve data.'",
+        tools=[lookup_college_stats, build_rag_retrieval_tool()]
+    )
+
 
 # 2. Search Agent
-search_agent = Agent(
-    name="SearchAgent",
-    model=os.getenv("ADK_MODEL_NAME", "gemini-2.5-flash-preview-04-17"),
-    instruction="You are a specialist in web searches for recent information. Given a college name and a query about recent news/policies, use Google Search. Your final output to the Coordinator MUST be a single, concise text string summarizing relevant findings (e.g., specific policy changes, dates) or stating 'No relevant recent information found' or 'Search failed.' Example: 'For [College Name]: Found a policy update on their website dated YYYY-MM-DD regarding test-optional status.' OR 'For [College Name]: No major admission policy changes found in the last 3-6 months.'",
-    tools=[google_search]
-)
+def build_search_agent():
+    from google.adk.agents import Agent
+    from google.adk.tools import google_search
+
+    return Agent(
+        name="SearchAgent",
+        model=agent_model("search"),
+        instruction="You are a specialist in web searches for recent information. Given a college name and a query about recent news/policies, use Google Search. Your final output to the Coordinator MUST be a single, concise text string summarizing relevant findings (e.g., specific policy changes, dates) or stating 'No relevant recent information found' or 'Search failed.' Example: 'For [College Name]: Found a policy update on their website dated YYYY-MM-DD regarding test-optional status.' OR 'For [College Name]: No major admission policy changes found in the last 3-6 months.'",
+        tools=[google_search]
+    )
+
 
 # 3. Coding Agent
-coding_agent = Agent(
-    name="CodingAgent",
-    model=os.getenv("ADK_MODEL_NAME", "gemini-2.5-flash-preview-04-17"),
-    instruction="You are a specialist in executing Python code for calculations. Given a specific calculation request with all necessary inputs, write and execute the code. Your final output to the Coordinator MUST be a single text string with the numerical result or a clear error message. Example: 'Calculation result: 42.' OR 'Error: Division by zero.'",
-    tools=[built_in_code_execution]
-)
+def build_coding_agent():
+    from google.adk.agents import Agent
+    from google.adk.tools import built_in_code_execution
 
-# --- Root Agent Definition ---
+    return Agent(
+        name="CodingAgent",
+        model=agent_model("specialist"),
+        instruction="You are a specialist in executing Python code for calculations. Given a specific calculation request with all necessary inputs, write and execute the code. Your final output to the Coordinator MUST be a single text string with the numerical result or a clear error message. Example: 'Calculation result: 42.' OR 'Error: Division by zero.'",
+        tools=[built_in_code_execution]
+    )
 
-# Configure Automatic Function Calling for the Root Agent
-# We estimate roughly 3 sub-agent calls per college (RAG, Search, Code).
-# For up to 15-16 sub-agent calls, set maximum_remote_calls to ~50 for a good buffer.
-coordinator_afc_settings = genai_types.AutomaticFunctionCallingConfig(
-    maximum_remote_calls=50
-)
 
-# Create GenerateContentConfig for the coordinator agent
-# This is where AFC settings are passed for an ADK Agent
-coordinator_generate_content_config = genai_types.GenerateContentConfig(
-    automatic_function_calling=coordinator_afc_settings
-    # We could also include a tool_config here if needed for other AFC behaviors like mode='ANY'
-    # For example: 
-    # tool_config=genai_types.ToolConfig(
-    #    function_calling_config=genai_types.FunctionCallingConfig(mode='ANY')
-    # )
-)
+SPECIALIST_BUILDERS = {"rag": build_rag_agent, "search": build_search_agent, "coding": build_coding_agent}
 
-internal_coordinator_agent = Agent(
-    name="InternalCoordinatorAgent",
-    model=os.getenv("ADK_MODEL_NAME", "gemini-2.5-flash-preview-04-17"),
-    description="Coordinates multiple specialist agents to provide college admission chance analysis.",
-    instruction=get_internal_coordinator_instructions(),
-    tools=[
-        AgentTool(agent=rag_agent),
-        AgentTool(agent=search_agent),
-        AgentTool(agent=coding_agent)
-    ],
-    # Pass the custom GenerateContentConfig here
-    generate_content_config=coordinator_generate_content_config 
-)
+
+def build_specialists(keys):
+    """Builds the selected specialist agents, keyed like SPECIALIST_AGENT_NAMES."""
+    return {key: SPECIALIST_BUILDERS[key]() for key in keys}
+
+
+def _with_unavailable_specialists(instruction, specialists):
+    missing = [name for key, name in SPECIALIST_AGENT_NAMES.items() if key not in specialists]
+    return instruction + get_unavailable_specialists_note(missing) if missing else instruction
+
+
+def _search_gating(specialists):
+    # Deterministic SearchAgent gating (see freshness.py; INSIGHT_SEARCH_GATING=0 disables it).
+    from .freshness import search_gating_enabled
+
+    return "search" in specialists and search_gating_enabled()
+
+
+def _coordinator_instruction(instruction, specialists):
+    instruction = _with_unavailable_specialists(instruction, specialists)
+    return instruction + get_search_gating_note() if _search_gating(specialists) else instruction
+
+
+def _install_search_gating(agent, specialists):
+    from .freshness import install_search_gating
+
+    return install_search_gating(agent) if _search_gating(specialists) else agent
+
+
+def _specialist_tools(specialists):
+    from .classification import classify_admission_chances
+    from .resilience import build_specialist_tool
+
+    # Specialist calls get opt-in deadlines and hedging (see resilience.py).
+    return [build_specialist_tool(agent) for agent in specialists.values()] + [classify_admission_chances]
+
+# --- Coordinator Agent Definition ---
+
+def build_llm_coordinator(name, specialists):
+    """Builds the LLM coordinator that processes colleges sequentially, as described in its prompt."""
+    from google.adk.agents import Agent
+    from google.genai import types as genai_types
+    from .compaction import context_compaction_enabled, install_context_compaction
+    from .resilience import install_request_deadline, request_deadline_seconds
+
+    # Configure Automatic Function Calling for the coordinator
+    # We estimate roughly 3 sub-agent calls per college (RAG, Search, Code).
+    # For up to 15-16 sub-agent calls, set maximum_remote_calls to ~50 for a good buffer.
+    # With context compaction, each college adds one (local) record_college_analysis call.
+    coordinator_afc_settings = genai_types.AutomaticFunctionCallingConfig(
+        maximum_remote_calls=50
+    )
+
+    # Create GenerateContentConfig for the coordinator agent
+    # This is where AFC settings are passed for an ADK Agent
+    coordinator_generate_content_config = genai_types.GenerateContentConfig(
+        automatic_function_calling=coordinator_afc_settings
+        # We could also include a tool_config here if needed for other AFC behaviors like mode='ANY'
+        # For example:
+        # tool_config=genai_types.ToolConfig(
+        #    function_calling_config=genai_types.FunctionCallingConfig(mode='ANY')
+        # )
+    )
+
+    instruction = _coordinator_instruction(get_internal_coordinator_instructions(), specialists)
+    if context_compaction_enabled():
+        instruction += get_context_compaction_note()
+    coordinator = Agent(
+        name=name,
+        model=agent_model("coordinator"),
+        description="Coordinates multiple specialist agents to provide college admission chance analysis.",
+        instruction=instruction,
+        tools=_specialist_tools(specialists),
+        # Pass the custom GenerateContentConfig here
+        generate_content_config=coordinator_generate_content_config
+    )
+    # Context compaction (see compaction.py; INSIGHT_CONTEXT_COMPACTION=0 disables it): finished colleges are
+    # recorded in session state and their turns are replaced by their final blocks, so the prompt stays flat.
+    if context_compaction_enabled():
+        install_context_compaction(coordinator)
+    # SearchAgent calls are decided by the freshness policy, and their results update the freshness table.
+    _install_search_gating(coordinator, specialists)
+    # INSIGHT_REQUEST_DEADLINE_S: once it passes, specialist calls return "deadline_exceeded" and the
+    # prompt has the coordinator finish with the colleges it has already researched.
+    if request_deadline_seconds():
+        install_request_deadline(coordinator, request_deadline_seconds())
+    return coordinator
+
+
+def build_parallel_coordinator(name, specialists, max_concurrency):
+    from google.adk.agents import Agent
+    from google.genai import types as genai_types
+    from .fanout import ParallelCoordinatorAgent
+    from .resilience import request_deadline_seconds
+
+    # Handles exactly one college per run; roughly 3 sub-agent calls plus a small retry buffer.
+    college_analyst_agent = Agent(
+        name="CollegeAnalystAgent",
+        model=agent_model("analyst"),
+        description="Analyzes a single college for a student using the specialist agents.",
+        instruction=_coordinator_instruction(get_college_analyst_instructions(), specialists),
+        tools=_specialist_tools(specialists),
+        generate_content_config=genai_types.GenerateContentConfig(
+            automatic_function_calling=genai_types.AutomaticFunctionCallingConfig(maximum_remote_calls=10)
+        )
+    )
+    _install_search_gating(college_analyst_agent, specialists)
+    return ParallelCoordinatorAgent(
+        name=name,
+        description="Coordinates multiple specialist agents to provide college admission chance analysis.",
+        college_agent=college_analyst_agent,
+        # Used when the college list cannot be extracted from the query.
+        fallback_agent=build_llm_coordinator("SequentialCoordinatorAgent", specialists),
+        max_concurrency=max_concurrency,
+        # Colleges unfinished at INSIGHT_REQUEST_DEADLINE_S are cancelled and reported as not analyzed.
+        request_deadline=request_deadline_seconds(),
+    )
+
+
+def build_internal_coordinator(specialists):
+    """Builds the coordinator for COORDINATOR_MODE, wrapped by the analysis cache when it is enabled."""
+    from .analysis_cache import (
+        CachedCoordinatorAgent,
+        analysis_cache_enabled,
+        analysis_fingerprint,
+        get_default_analysis_cache,
+    )
+    from .compaction import context_compaction_enabled
+    from .entities import college_prefetch_enabled, install_college_prefetch
+    from .fanout import DEFAULT_MAX_CONCURRENT_COLLEGES
+    from .local_retrieval import data_fingerprint
+    from .paths import DATA_DIR
+
+    # Per-college analysis cache (see analysis_cache.py): with INSIGHT_ANALYSIS_CACHE=1 the coordinator is
+    # wrapped so that colleges already analyzed for the same student profile are answered from the cache.
+    cache_enabled = analysis_cache_enabled()
+    if COORDINATOR_MODE == "parallel":
+        coordinator_agent = build_parallel_coordinator(
+            "ParallelCoordinatorAgent" if cache_enabled else "InternalCoordinatorAgent",
+            specialists,
+            max_concurrency=int(os.getenv("INSIGHT_MAX_CONCURRENT_COLLEGES", DEFAULT_MAX_CONCURRENT_COLLEGES)),
+        )
+    else:
+        coordinator_agent = build_llm_coordinator(
+            "SequentialCoordinatorAgent" if cache_enabled else "InternalCoordinatorAgent", specialists
+        )
+    # Retrievals for the colleges resolved in the request start before the coordinator's first model turn
+    # (see entities.py; INSIGHT_COLLEGE_PREFETCH=0 disables it). Cache hits skip the coordinator and the prefetch.
+    if "rag" in specialists and college_prefetch_enabled():
+        install_college_prefetch(coordinator_agent, specialists["rag"])
+    if not cache_enabled:
+        return coordinator_agent
+
+    return CachedCoordinatorAgent(
+        name="InternalCoordinatorAgent",
+        description="Coordinates multiple specialist agents to provide college admission chance analysis.",
+        coordinator_agent=coordinator_agent,
+        cache=get_default_analysis_cache(),
+        # Prompt, model, specialist or corpus changes produce a new fingerprint, so older analyses are never served.
+        fingerprint=analysis_fingerprint(
+            get_internal_coordinator_instructions(),
+            get_context_compaction_note() if context_compaction_enabled() else "",
+            get_search_gating_note() if _search_gating(specialists) else "",
+            get_college_analyst_instructions(),
+            *(agent.instruction for agent in specialists.values()),
+            model_name(),
+            RAG_BACKEND,
+            os.environ.get("RAG_CORPUS", ""),
+        ),
+        corpus=os.environ.get("RAG_CORPUS", "") if RAG_BACKEND != "local" else "local",
+        # The local index is rebuilt whenever data/ changes, so its analyses follow the data fingerprint.
+        data_fingerprint=functools.partial(data_fingerprint, DATA_DIR) if RAG_BACKEND == "local" else None,
+    )
 
 # --- Presenter Agent Definition ---
-presenter_agent = Agent(
-    name="PresenterAgent",
-    model=os.getenv("ADK_MODEL_NAME", "gemini-2.5-flash-preview-04-17"),
-    instruction=get_presenter_agent_instructions(),
-    tools=[
-        AgentTool(agent=internal_coordinator_agent)
-    ]
-    # No special generate_content_config likely needed, default AFC limit is fine for one call.
-)
 
-# The main agent exposed by this module is now the presenter
-root_agent = presenter_agent
+def build_presenter(internal_coordinator_agent):
+    if PRESENTER_MODE == "template":
+        from .presenter import TemplatePresenterAgent
+
+        return TemplatePresenterAgent(
+            name="PresenterAgent",
+            description="Delivers the college admissions analysis report.",
+            coordinator_agent=internal_coordinator_agent,
+        )
+
+    from google.adk.agents import Agent
+    from google.adk.tools.agent_tool import AgentTool
+
+    return Agent(
+        name="PresenterAgent",
+        model=agent_model("presenter"),
+        instruction=get_presenter_agent_instructions(),
+        tools=[
+            AgentTool(agent=internal_coordinator_agent)
+        ]
+        # No special generate_content_config likely needed, default AFC limit is fine for one call.
+    )
+
+
+def build_root_agent():
+    """Builds a fresh agent graph for the current configuration. The main agent is the presenter."""
+    from .tracing import get_default_tracer, tracing_enabled
+
+    from .scheduler import install_session_scope, scheduler_enabled
+
+    specialists = build_specialists(enabled_specialists())
+    root_agent = build_presenter(build_internal_coordinator(specialists))
+    # Each request is its own session in the scheduler's fair queuing (see scheduler.py).
+    if scheduler_enabled():
+        install_session_scope(root_agent)
+
+    # Per-agent tracing (see tracing.py): INSIGHT_TRACE=1 records a span for every agent run, model call
+    # and tool call to INSIGHT_TRACE_PATH (JSONL) and to an in-process aggregator.
+    if tracing_enabled():
+        get_default_tracer().instrument(root_agent)
+    return root_agent
+
+# --- Process-wide Root Agent ---
+
+_root_agent = None
+_root_agent_lock = threading.Lock()
+
+
+def get_root_agent():
+    """Returns the process-wide agent graph, building it on first use."""
+    global _root_agent
+    with _root_agent_lock:
+        if _root_agent is None:
+            _root_agent = build_root_agent()
+        return _root_agent
+
+
+def __getattr__(name):
+    # `root_agent` is what ADK (adk run / adk web) loads from this module.
+    if name == "root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # This section is for local testing if you run 'python insight_agent/agent.py'
     # However, ADK's primary way of running is via 'adk run' or 'adk web'.
+    from google.adk.tools.agent_tool import AgentTool
+    from .analysis_cache import analysis_cache_enabled
+    from .compaction import context_compaction_enabled
+    from .entities import college_prefetch_enabled, entity_resolution_enabled, get_default_entity_index
+    from .resilience import request_deadline_seconds, subagent_timeouts
+    from .scheduler import get_default_scheduler, scheduler_enabled
+    from .tracing import tracing_enabled
+
+    root_agent = get_root_agent()
     print("Project Insight Multi-Agent System Loaded.")
     print(f"Root Agent Name: {root_agent.name}")
-    print(f"Root Agent Model: {root_agent.model}")
-    print(f"Root Agent Tools (Sub-Agents): {[tool.agent.name for tool in root_agent.tools if isinstance(tool, AgentTool)]}")
+    print(f"Presenter Mode: {PRESENTER_MODE}")
+    if PRESENTER_MODE != "template":
+        print(f"Root Agent Model: {getattr(root_agent.model, 'model', root_agent.model)}")
+        print(f"Root Agent Tools (Sub-Agents): {[tool.agent.name for tool in root_agent.tools if isinstance(tool, AgentTool)]}")
+    print(f"Coordinator Mode: {COORDINATOR_MODE} "
+          f"(max concurrent colleges: {os.getenv('INSIGHT_MAX_CONCURRENT_COLLEGES', 'default')})")
+    print(f"Specialists: {', '.join(SPECIALIST_AGENT_NAMES[key] for key in enabled_specialists())}")
+    print(f"Context Compaction: {'enabled' if context_compaction_enabled() else 'disabled (INSIGHT_CONTEXT_COMPACTION=0)'}")
+    print(f"SearchAgent Gating: {'enabled' if _search_gating(enabled_specialists()) else 'disabled'}")
+    print(f"College Entity Resolution: {f'enabled ({len(get_default_entity_index())} colleges)' if entity_resolution_enabled() else 'disabled (INSIGHT_ENTITY_RESOLUTION=0)'}; "
+          f"Retrieval Prefetch: {'enabled' if college_prefetch_enabled() and 'rag' in enabled_specialists() else 'disabled'}")
+    print(f"Analysis Cache: {'enabled' if analysis_cache_enabled() else 'disabled (set INSIGHT_ANALYSIS_CACHE=1)'}")
+    if scheduler_enabled():
+        default_rpm, default_tpm = get_default_scheduler().default_limits
+        print(f"Model Scheduler: enabled ({default_rpm:g} requests/min, {default_tpm:g} tokens/min per model"
+              f"{'; overrides: ' + os.getenv('INSIGHT_MODEL_QUOTAS') if os.getenv('INSIGHT_MODEL_QUOTAS') else ''})")
+    else:
+        print("Model Scheduler: disabled (set INSIGHT_SCHEDULER=1)")
+    timeout, timeout_overrides = subagent_timeouts()
+    print(f"Sub-agent Deadline: {f'{timeout:g} s' if timeout else 'none (set INSIGHT_SUBAGENT_TIMEOUT_S)'}"
+          f"{f' (overrides: {timeout_overrides})' if timeout_overrides else ''}; "
+          f"Request Deadline: {f'{request_deadline_seconds():g} s' if request_deadline_seconds() else 'none'}; "
+          f"Hedging: {'p' + os.getenv('INSIGHT_HEDGE_PERCENTILE') if os.getenv('INSIGHT_HEDGE_PERCENTILE') else 'disabled'}")
+
+    print(f"RAG Backend: {RAG_BACKEND}")
+    print(f"Tracing: {'enabled' if tracing_enabled() else 'disabled (set INSIGHT_TRACE=1)'}")
 
-    if not os.environ.get("RAG_CORPUS"):
+    # The local backend builds its index from data/ on first use and needs no credentials.
+    if "rag" not in enabled_specialists():
+        print("RAGAgent is disabled by INSIGHT_SPECIALISTS.")
+    elif RAG_BACKEND == "local":
+        print("The local retrieval index is built from data/ on first use.")
+    elif not os.environ.get("RAG_CORPUS"):
         print("\nWARNING: RAG_CORPUS environment variable is not set. ")
         print("The 'RAGAgent' and its 'retrieve_rag_documentation' tool will not function without it.")
-    elif not vertex_rag_retrieval_tool.rag_resources: # Check if it was set but list is empty
-        print("\nWARNING: RAG_CORPUS was set, but RAG tool's rag_resources list is empty.")
-        print("The 'RAGAgent' may not function correctly.")
+        print("Set RAG_BACKEND=local to use the offline retrieval index over data/ instead.")
 
     # Note: Direct interaction loop from original single-agent setup is removed
     # as 'adk run' or 'adk web' would be the primary way to interact with the root_agent.
     # The previous loop for direct 'python insight_agent/agent.py' interaction
     # would need significant changes to work with the async nature of multi-agent calls.
     print("\nTo interact with the agent, use 'adk run insight_agent.agent' or 'adk web insight_agent.agent'")
+    print("To analyze a CSV/JSONL file of profiles, use 'python insight_agent/scripts/batch_analyze.py <file>'")
 
     # To interact directly here, you would need to set up a session and run loop,
     # which 'adk run' handles. For example:
@@ -150,4 +480,4 @@ if __name__ == "__main__":
     #             print(f"Agent: {response.text}")
     #
     # import asyncio
-    # asyncio.run(main()) 
\ No newline at end of file
+    # asyncio.run(main())
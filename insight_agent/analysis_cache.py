@@ -0,0 +1,362 @@
+# insight_agent/analysis_cache.py
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from .coordinator_output import (
+    INSUFFICIENT_DATA,
+    extract_college_blocks,
+    fallback_college_block,
+    parse_coordinator_output,
+    render_college_block,
+    render_coordinator_output,
+    render_output_footer,
+    render_output_header,
+)
+from .entities import college_id, distinctive_words, resolve_college_names
+from .fanout import (
+    extract_college_names,
+    extract_profile,
+    restrict_query_to_colleges,
+    strip_college_list,
+    summarize_profile,
+)
+from .paths import index_path
+from .rag_cache import normalize_query
+from .runtime import content_text, iter_agent_events
+
+DEFAULT_ANALYSIS_CACHE_PATH = index_path("analysis_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key TEXT PRIMARY KEY,
+    college_id TEXT NOT NULL,
+    profile_bucket TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    corpus TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    block TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analysis_cache_last_used ON analysis_cache (last_used);
+CREATE INDEX IF NOT EXISTS analysis_cache_corpus ON analysis_cache (corpus);
+"""
+
+
+# --- Keys ---
+
+def profile_bucket(query):
+    """The student's profile as a key label: the exact GPA, SAT and ACT figures in the query plus a
+    digest of the rest of its text (without the college list). Cached blocks quote the student's
+    figures and activities ("your SAT of 1530"), so only the same profile may reuse them."""
+    profile = extract_profile(query)
+    figures = "|".join(f"{label.lower().replace(' ', '_')}:{value:g}" for label, value in sorted(profile.items()))
+    digest = hashlib.sha256(normalize_query(strip_college_list(query)).encode("utf-8")).hexdigest()[:16]
+    return f"{figures or 'no_figures'}|profile:{digest}"
+
+
+def analysis_fingerprint(*parts):
+    """Hashes everything an analysis depends on besides college and profile (prompts, model, corpus)."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def make_analysis_key(college_name, bucket, fingerprint):
+    # Keyed by canonical college id, so "UCB" and "UC Berkeley" share an entry (see entities.py).
+    raw = f"{college_id(college_name)}\x1f{bucket}\x1f{fingerprint}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# --- Store ---
+
+class AnalysisCache:
+    """sqlite store of completed COLLEGE_ANALYSIS_BLOCKs keyed by college, profile bucket and fingerprint.
+
+    Holds at most `max_entries` rows (least recently used rows are evicted) and entries expire
+    after `ttl_seconds`. Without a `db_path` the store is in-memory and per-process.
+    """
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "stores": 0}
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, college_name, bucket, fingerprint):
+        """Returns the cached block, or None on a miss."""
+        key = make_analysis_key(college_name, bucket, fingerprint)
+        with self._lock:
+            now = self._clock()
+            row = self._conn.execute("SELECT created_at, block FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            if self.ttl_seconds is not None and now - row[0] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE analysis_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._counters["hits"] += 1
+            return row[1]
+
+    def put(self, college_name, bucket, fingerprint, block, corpus=""):
+        key = make_analysis_key(college_name, bucket, fingerprint)
+        with self._lock:
+            now = self._clock()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache "
+                "(key, college_id, profile_bucket, fingerprint, corpus, created_at, last_used, block) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, college_id(college_name), bucket, fingerprint, corpus or "", now, now, block),
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM analysis_cache WHERE key IN "
+                    "(SELECT key FROM analysis_cache ORDER BY last_used ASC LIMIT ?)", (excess,)
+                )
+                self._counters["evictions"] += excess
+            self._conn.commit()
+            self._counters["stores"] += 1
+
+    def invalidate(self, corpus=None):
+        """Drops every cached analysis built from `corpus` (or all of them). Returns the number of rows removed."""
+        with self._lock:
+            if corpus is None:
+                cursor = self._conn.execute("DELETE FROM analysis_cache")
+            else:
+                cursor = self._conn.execute("DELETE FROM analysis_cache WHERE corpus = ?", (corpus,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# --- Process-wide Default Cache ---
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def analysis_cache_enabled():
+    return os.getenv("INSIGHT_ANALYSIS_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def get_default_analysis_cache():
+    """Returns the process-wide analysis cache configured from ANALYSIS_CACHE_* environment variables.
+
+    ANALYSIS_CACHE_PATH defaults to .insight_index/analysis_cache.sqlite3; set it to an empty value
+    for an in-memory, per-process cache.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnalysisCache(
+                db_path=os.getenv("ANALYSIS_CACHE_PATH", DEFAULT_ANALYSIS_CACHE_PATH) or None,
+                max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            )
+        return _default_cache
+
+
+def invalidate_analysis_cache(corpus_name, db_path=None):
+    """Drops cached analyses built from `corpus_name` after its contents changed (used by ingestion).
+
+    Returns the number of removed entries, or None when there is no on-disk cache.
+    """
+    db_path = db_path or os.getenv("ANALYSIS_CACHE_PATH", DEFAULT_ANALYSIS_CACHE_PATH)
+    if not db_path or not os.path.exists(db_path):
+        return None
+    cache = AnalysisCache(db_path=db_path)
+    try:
+        return cache.invalidate(corpus_name)
+    finally:
+        cache.close()
+
+
+# --- Caching Coordinator ---
+
+def _parse_block(block):
+    colleges = parse_coordinator_output(block).colleges
+    return colleges[0] if colleges else None
+
+
+def _is_cacheable(block):
+    """Only complete, classified analyses are cached; failures and data gaps are retried next time."""
+    college = _parse_block(block)
+    return college is not None and college.complete and college.classification not in ("", INSUFFICIENT_DATA)
+
+
+def _answered_miss(block, misses, answered):
+    """The requested college (one of `misses` not in `answered`) a returned block analyzes, or None:
+    the one with the block's college id, else one whose distinctive words contain the block's or
+    are contained in them ("Georgetown" for a block about "Georgetown University")."""
+    college = _parse_block(block)
+    if college is None:
+        return None
+    candidates = [miss for miss in misses if miss not in answered]
+    key = college_id(college.college_name)
+    miss = next((miss for miss in candidates if college_id(miss) == key), None)
+    words = set(distinctive_words(college.college_name))
+    if miss is not None or not words:
+        return miss
+    for miss in candidates:
+        miss_words = set(distinctive_words(miss))
+        if miss_words and (miss_words <= words or words <= miss_words):
+            return miss
+    return None
+
+
+class CachedCoordinatorAgent(BaseAgent):
+    """Serves per-college analyses from an AnalysisCache and runs `coordinator_agent` only for misses.
+
+    The query is rewritten so that its college list names only the colleges that missed; the
+    wrapped coordinator (sequential or parallel) runs in its own session, and its blocks are
+    merged with the cached ones in query order. Queries without a recognizable college list are
+    passed through unchanged.
+
+    `data_fingerprint` (optional) is called on every run and mixed into the fingerprint, for
+    sources that can change while the process runs (the local backend's data/ directory).
+    """
+
+    coordinator_agent: BaseAgent
+    cache: AnalysisCache
+    fingerprint: str = ""
+    corpus: str = ""
+    data_fingerprint: Optional[Callable[[], str]] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name, coordinator_agent, cache, fingerprint="", corpus="", data_fingerprint=None,
+                 description=""):
+        super().__init__(name=name, description=description, coordinator_agent=coordinator_agent,
+                         cache=cache, fingerprint=fingerprint, corpus=corpus or "", data_fingerprint=data_fingerprint)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        query = content_text(ctx.user_content)
+        colleges = resolve_college_names(extract_college_names(query))
+        bucket = profile_bucket(query)
+        fingerprint = self.fingerprint
+        if self.data_fingerprint is not None:
+            fingerprint = analysis_fingerprint(fingerprint, await asyncio.to_thread(self.data_fingerprint))
+        blocks = {college: self.cache.get(college, bucket, fingerprint) for college in colleges}
+        misses = [college for college in colleges if blocks[college] is None]
+
+        profile_summary = summarize_profile(query)
+        overall_notes = f"Analyzed {len(colleges)} colleges: {', '.join(colleges)}."
+        # Blocks are streamed in query order, each once every college before it has been streamed.
+        streamable = dict(blocks)
+        streamed = 0
+
+        def ready_blocks():
+            nonlocal streamed
+            while streamed < len(colleges) and streamable[colleges[streamed]] is not None:
+                streamed += 1
+                yield streamable[colleges[streamed - 1]]
+
+        if colleges:
+            yield self._text_event(ctx, render_output_header(profile_summary, overall_notes), partial=True)
+            for block in ready_blocks():
+                yield self._text_event(ctx, render_college_block(block), partial=True)
+
+        if misses or not colleges:
+            coordinator_query = restrict_query_to_colleges(query, misses) if colleges else query
+            streamed_text, final_text, emitted = "", "", 0
+            async for event in iter_agent_events(self.coordinator_agent, coordinator_query,
+                                                 state=dict(ctx.session.state), run_config=ctx.run_config):
+                text = content_text(event.content)
+                if event.partial:
+                    streamed_text += text
+                elif text:
+                    final_text = text
+                    streamed_text = ""
+                if not colleges:
+                    continue
+                # Pass fresh blocks on as soon as they (and the colleges before them) are complete.
+                fresh = extract_college_blocks(streamed_text or final_text)
+                for block in fresh[emitted:]:
+                    miss = _answered_miss(block, misses, [miss for miss in misses if streamable[miss] is not None])
+                    if miss is not None:
+                        streamable[miss] = block
+                emitted = max(emitted, len(fresh))
+                for block in ready_blocks():
+                    yield self._text_event(ctx, render_college_block(block), partial=True)
+            if not colleges:
+                yield self._text_event(ctx, final_text)
+                return
+
+            returned, unmatched = {}, []
+            for block in extract_college_blocks(final_text):
+                miss = _answered_miss(block, misses, returned)
+                if miss is not None:
+                    returned[miss] = block
+                elif _parse_block(block) is not None:
+                    unmatched.append(block)
+            unanswered = [college for college in misses if college not in returned]
+            if len(unanswered) == 1 and len(unmatched) == 1:
+                # The coordinator named the one remaining college differently.
+                returned[unanswered[0]] = unmatched[0]
+            for college in misses:
+                block = returned.get(college)
+                if block is None:
+                    blocks[college] = fallback_college_block(college, "The coordinator returned no analysis for it.")
+                    continue
+                blocks[college] = block
+                if _is_cacheable(block):
+                    self.cache.put(college, bucket, fingerprint, block, corpus=self.corpus)
+            for college in misses:
+                if streamable[college] is None:
+                    streamable[college] = blocks[college]
+            for block in ready_blocks():
+                yield self._text_event(ctx, render_college_block(block), partial=True)
+
+        output = render_coordinator_output(
+            profile_summary=profile_summary,
+            overall_notes=overall_notes + (f" {len(colleges) - len(misses)} served from the analysis cache."
+                                           if len(misses) < len(colleges) else ""),
+            college_blocks=[blocks[college] for college in colleges],
+        )
+        yield self._text_event(ctx, render_output_footer(), partial=True)
+        yield self._text_event(ctx, output)
+
+    def _text_event(self, ctx, text, partial=None):
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            partial=partial,
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]),
+        )
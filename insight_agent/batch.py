@@ -0,0 +1,279 @@
+# insight_agent/batch.py
+#
+# Batch analysis of many student profiles (CSV or JSONL) through the agent graph. Records are
+# streamed from the input, run through a bounded pool of asyncio workers behind a global rate
+# limit, and each result is appended to a JSONL output file as soon as it finishes. The output
+# file doubles as the checkpoint: a restarted job skips every record id already written to it.
+
+import asyncio
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from .coordinator_output import parse_coordinator_output
+from .runtime import iter_agent_tree, run_agent_to_text
+from .scheduler import BATCH, scheduling_scope
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SECONDS = 2.0
+DEFAULT_PROGRESS_INTERVAL_SECONDS = 30.0
+
+OK = "ok"
+ERROR = "error"
+
+# Columns/keys used to build a query when a record has no "query" field.
+_PROFILE_FIELDS = [
+    ("sat", "a {} SAT"),
+    ("act", "a {} ACT"),
+    ("weighted_gpa", "a {} weighted GPA"),
+    ("unweighted_gpa", "a {} unweighted GPA"),
+    ("gpa", "a {} GPA"),
+]
+
+
+# --- Input ---
+
+def iter_profile_records(path):
+    """Yields the records of a CSV (header row required) or JSONL file one at a time."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def record_id(record, index):
+    """The record's "id" field, or its 1-based position in the input."""
+    value = record.get("id")
+    return str(value) if value not in (None, "") else f"row-{index}"
+
+
+def _college_list(colleges):
+    if isinstance(colleges, str):
+        colleges = [college.strip() for college in colleges.replace("|", ";").split(";")]
+    colleges = [college for college in colleges if college]
+    if len(colleges) <= 2:
+        return " and ".join(colleges)
+    return ", ".join(colleges[:-1]) + f", and {colleges[-1]}"
+
+
+def build_profile_query(record):
+    """Returns the record's "query", or a query in the style of 'test prompt.txt' built from its
+    sat/act/gpa/weighted_gpa/unweighted_gpa, activities and colleges (';'-separated in CSV) fields."""
+    if record.get("query"):
+        return str(record["query"])
+    if not record.get("colleges"):
+        raise ValueError("Record has neither a 'query' nor a 'colleges' field.")
+    facts = [template.format(record[key]) for key, template in _PROFILE_FIELDS if record.get(key) not in (None, "")]
+    query = f"I have {', '.join(facts)}." if facts else ""
+    if record.get("activities"):
+        query += f" {str(record['activities']).strip()}"
+    return f"{query} What are my chances of admission into {_college_list(record['colleges'])}?".strip()
+
+
+def iter_batch_queries(path, limit=None):
+    """Yields (record_id, query) for the first `limit` records of `path`. A record that cannot be
+    turned into a query yields its ValueError instead of the query and is recorded as a failure."""
+    for index, record in enumerate(iter_profile_records(path), 1):
+        if limit is not None and index > limit:
+            return
+        try:
+            query = build_profile_query(record)
+        except ValueError as e:
+            query = e
+        yield record_id(record, index), query
+
+
+# --- Checkpoint ---
+
+def load_completed_ids(output_path, retry_failed=False):
+    """Returns the ids already present in an output file (ids whose last result failed are
+    excluded when `retry_failed`). A torn last line from a crash is ignored."""
+    status = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            status[result.get("id")] = result.get("status")
+    return {rid for rid, value in status.items() if not (retry_failed and value != OK)}
+
+
+def _open_output(output_path, restart):
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if restart or not os.path.exists(output_path):
+        return open(output_path, "w", encoding="utf-8")
+    f = open(output_path, "a+", encoding="utf-8")
+    # Terminate a line torn by a crash so the next result starts on its own line.
+    if f.tell() > 0:
+        f.seek(f.tell() - 1)
+        if f.read(1) != "\n":
+            f.write("\n")
+    return f
+
+
+# --- Rate Limiting ---
+
+class RateLimiter:
+    """Spaces request starts evenly so that at most `rate_per_minute` start in any minute (None = unlimited)."""
+
+    def __init__(self, rate_per_minute=None, clock=time.monotonic):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self._clock = clock
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = self._clock()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# --- Runner ---
+
+def find_agent(root_agent, name):
+    for agent in iter_agent_tree(root_agent):
+        if agent.name == name:
+            return agent
+    raise ValueError(f"No agent named '{name}' in the graph under '{root_agent.name}'.")
+
+
+class BatchRunner:
+    """Runs `agent` over a stream of (record_id, query) pairs with bounded concurrency.
+
+    At most `concurrency` requests run at once and at most twice that many records are read ahead
+    of them (the reader blocks until workers catch up). Failed requests are retried with
+    exponential backoff; results, including final failures, are appended to `output_path`.
+    With `structured=True` the agent is expected to return coordinator output, which is parsed
+    into per-college classifications; otherwise its text is stored as the report.
+    """
+
+    def __init__(self, agent, output_path, concurrency=DEFAULT_CONCURRENCY, rate_per_minute=None,
+                 max_retries=DEFAULT_MAX_RETRIES, retry_backoff=DEFAULT_RETRY_BACKOFF_SECONDS,
+                 structured=False, progress_interval=DEFAULT_PROGRESS_INTERVAL_SECONDS):
+        self.agent = agent
+        self.output_path = output_path
+        self.concurrency = max(1, int(concurrency))
+        self.rate_limiter = RateLimiter(rate_per_minute)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.structured = structured
+        self.progress_interval = progress_interval
+        self._counters = {"succeeded": 0, "failed": 0, "skipped": 0, "retries": 0}
+        self._latencies_ms = []
+        self._started = None
+
+    async def run(self, records, restart=False, retry_failed=False):
+        """Processes `records` (an iterable of (record_id, query) pairs) and returns the stats."""
+        completed_ids = set() if restart else load_completed_ids(self.output_path, retry_failed=retry_failed)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._started = time.monotonic()
+        with _open_output(self.output_path, restart) as output:
+            workers = [asyncio.create_task(self._worker(queue, output)) for _ in range(self.concurrency)]
+            progress = asyncio.create_task(self._report_progress()) if self.progress_interval else None
+            try:
+                for rid, query in records:
+                    if rid in completed_ids:
+                        self._counters["skipped"] += 1
+                        continue
+                    await queue.put((rid, query))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers + ([progress] if progress else []):
+                    task.cancel()
+        return self.stats()
+
+    async def _worker(self, queue, output):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            result = await self._process(*item)
+            # Single-threaded event loop: each result line is written whole.
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+    async def _process(self, rid, query):
+        if isinstance(query, Exception):
+            self._counters["failed"] += 1
+            return {"id": rid, "status": ERROR, "error": str(query)}
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                # Batch model calls yield to interactive ones and share the quota fairly per profile.
+                with scheduling_scope(BATCH, session=f"batch-{rid}"):
+                    text = await run_agent_to_text(self.agent, query, user_id=f"batch-{rid}")
+                if not text.strip():
+                    raise RuntimeError(f"{self.agent.name} returned an empty response.")
+                result = self._result(rid, text)
+                latency_ms = (time.perf_counter() - started) * 1000.0
+                self._latencies_ms.append(latency_ms)
+                self._counters["succeeded"] += 1
+                return dict(result, latency_ms=round(latency_ms, 1), attempts=attempt + 1)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._counters["failed"] += 1
+                    return {"id": rid, "status": ERROR, "error": f"{type(e).__name__}: {e}", "attempts": attempt + 1}
+                self._counters["retries"] += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    def _result(self, rid, text):
+        if not self.structured:
+            return {"id": rid, "status": OK, "report": text}
+        output = parse_coordinator_output(text)
+        if not output.colleges:
+            raise ValueError("The coordinator output contains no college analyses.")
+        return {
+            "id": rid,
+            "status": OK,
+            "complete": output.complete,
+            "profile_summary": output.profile_summary,
+            "colleges": [
+                {"college_name": college.college_name, "classification": college.classification,
+                 "key_data_points": college.key_data_points, "rationale": college.rationale,
+                 "data_sources": college.data_sources}
+                for college in output.colleges
+            ],
+        }
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            stats = self.stats()
+            print(f"[batch] {stats['succeeded']} ok, {stats['failed']} failed, {stats['skipped']} skipped - "
+                  f"{stats['profiles_per_minute']:.1f} profiles/min")
+
+    def stats(self):
+        stats = dict(self._counters)
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        processed = stats["succeeded"] + stats["failed"]
+        stats["elapsed_s"] = round(elapsed, 2)
+        # Sustained throughput over the whole run (skipped records excluded).
+        stats["profiles_per_minute"] = processed / elapsed * 60.0 if elapsed > 0 else 0.0
+        if self._latencies_ms:
+            latencies = np.array(self._latencies_ms)
+            stats["latency_ms"] = {
+                "p50": round(float(np.percentile(latencies, 50)), 1),
+                "p95": round(float(np.percentile(latencies, 95)), 1),
+            }
+        return stats
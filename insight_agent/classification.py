@@ -0,0 +1,211 @@
+# insight_agent/classification.py
+
+import json
+
+import numpy as np
+
+from .college_stats import get_default_stats_index
+
+REACH = "Reach"
+TARGET = "Target"
+SAFETY = "Safety"
+INSUFFICIENT_DATA = "Insufficient Data for Classification"
+
+# Heuristics from get_internal_coordinator_instructions():
+#  - admit rates below ~20-25% are a Reach regardless of profile,
+#  - Safety requires a profile above the 75th percentile AND a relatively high admit rate.
+REACH_ACCEPTANCE_RATE = 0.20
+SAFETY_MIN_ACCEPTANCE_RATE = 0.50
+
+# 2018 ACT/SAT concordance (ACT composite -> SAT total).
+_ACT_POINTS = np.array([9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22,
+                        23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36], dtype=float)
+_SAT_POINTS = np.array([590, 630, 670, 710, 760, 800, 850, 890, 930, 970, 1010, 1040, 1080, 1110,
+                        1140, 1180, 1210, 1240, 1280, 1310, 1340, 1370, 1400, 1430, 1460, 1500, 1540, 1590], dtype=float)
+
+# Columns read from each college's stats (names match college_stats.STATS_COLUMNS).
+_COLLEGE_FIELDS = [
+    "acceptance_rate", "sat_composite_25", "sat_composite_75", "act_composite_25", "act_composite_75",
+    "gpa_25", "gpa_75", "gpa_average",
+]
+
+
+# --- Conversions ---
+
+def act_to_sat(act):
+    """Converts ACT composite score(s) to SAT total(s) via the concordance table (NaN passes through)."""
+    act = np.asarray(act, dtype=float)
+    return np.where(np.isnan(act), np.nan, np.interp(act, _ACT_POINTS, _SAT_POINTS))
+
+
+def to_unweighted_gpa(gpa):
+    """Maps a reported GPA onto the unweighted 4.0 scale.
+
+    Weighted GPAs (4.0-5.0) are capped at 4.0 and 100-point averages are mapped linearly from
+    65 (1.0) to 97+ (4.0).
+    """
+    gpa = np.asarray(gpa, dtype=float)
+    percent_scale = np.clip(1.0 + (gpa - 65.0) * 3.0 / 32.0, 0.0, 4.0)
+    return np.where(gpa > 5.0, percent_scale, np.minimum(gpa, 4.0))
+
+
+def _percentile_position(value, p25, p75):
+    """Linear position of `value` within [p25, p75]: 0 at the 25th, 1 at the 75th percentile."""
+    width = p75 - p25
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(width > 0, (value - p25) / width, np.nan)
+
+
+def _estimated_percentile(position):
+    return np.clip(25.0 + 50.0 * position, 0.0, 100.0)
+
+
+# --- Classification Engine ---
+
+def classify_colleges(student_profile, colleges, reach_acceptance_rate=REACH_ACCEPTANCE_RATE,
+                      safety_min_acceptance_rate=SAFETY_MIN_ACCEPTANCE_RATE):
+    """Classifies N colleges for one student in a single vectorized pass.
+
+    `student_profile` may contain `gpa` (any scale), `sat` and `act`; `colleges` is a list of dicts
+    with a `college_name` plus any of the stats columns. Missing values may be omitted or None, and
+    acceptance rates may be given as fractions or percents.
+    Returns a list of per-college result dicts in input order.
+    """
+    student_gpa = _as_float(student_profile.get("gpa"))
+    student_sat = _as_float(student_profile.get("sat"))
+    student_act = _as_float(student_profile.get("act"))
+    # Best available test score on the SAT scale.
+    student_test = np.nanmax([student_sat, float(act_to_sat(student_act))]) \
+        if not (np.isnan(student_sat) and np.isnan(student_act)) else np.nan
+    student_gpa = float(to_unweighted_gpa(student_gpa))
+
+    table = {field: np.array([_FIELD_PARSERS.get(field, _as_float)(c.get(field)) for c in colleges], dtype=float)
+             for field in _COLLEGE_FIELDS}
+
+    # Test ranges on the SAT scale, falling back to converted ACT ranges.
+    sat_25 = np.where(np.isnan(table["sat_composite_25"]), act_to_sat(table["act_composite_25"]), table["sat_composite_25"])
+    sat_75 = np.where(np.isnan(table["sat_composite_75"]), act_to_sat(table["act_composite_75"]), table["sat_composite_75"])
+    test_position = _percentile_position(student_test, sat_25, sat_75)
+
+    # GPA: use the 25th/75th band when reported; otherwise treat +/-0.1 around the average as the mid-50%.
+    gpa_25 = np.where(np.isnan(table["gpa_25"]), table["gpa_average"] - 0.1, table["gpa_25"])
+    gpa_75 = np.where(np.isnan(table["gpa_75"]), table["gpa_average"] + 0.1, table["gpa_75"])
+    gpa_position = _percentile_position(student_gpa, to_unweighted_gpa(gpa_25), to_unweighted_gpa(gpa_75))
+
+    positions = np.vstack([test_position, gpa_position])
+    has_position = ~np.all(np.isnan(positions), axis=0)
+    with np.errstate(invalid="ignore"):
+        academic_position = np.where(has_position, np.nanmean(np.where(has_position, positions, 0.0), axis=0), np.nan)
+
+    acceptance = table["acceptance_rate"]
+    has_acceptance = ~np.isnan(acceptance)
+    with np.errstate(invalid="ignore"):
+        selective = has_acceptance & (acceptance < reach_acceptance_rate)
+        below_range = has_position & (academic_position < 0.0)
+        above_range = has_position & (academic_position > 1.0)
+        safe_rate = has_acceptance & (acceptance >= safety_min_acceptance_rate)
+
+    classification = np.full(len(colleges), TARGET, dtype=object)
+    classification[above_range & safe_rate] = SAFETY
+    classification[selective | below_range] = REACH
+    classification[~has_position & ~selective] = INSUFFICIENT_DATA
+
+    results = []
+    for i, college in enumerate(colleges):
+        results.append({
+            "college_name": college.get("college_name") or college.get("name"),
+            "classification": classification[i],
+            "acceptance_rate": _json_number(acceptance[i]),
+            "test_percentile_estimate": _json_number(_estimated_percentile(test_position[i])),
+            "gpa_percentile_estimate": _json_number(_estimated_percentile(gpa_position[i])),
+            "reasons": _reasons(i, classification[i], acceptance, test_position, gpa_position,
+                                reach_acceptance_rate, safety_min_acceptance_rate),
+        })
+    return results
+
+
+def _reasons(i, classification, acceptance, test_position, gpa_position, reach_rate, safety_rate):
+    reasons = []
+    if not np.isnan(acceptance[i]):
+        if acceptance[i] < reach_rate:
+            reasons.append(f"Acceptance rate {acceptance[i]:.0%} is below the {reach_rate:.0%} selectivity threshold.")
+        elif classification == TARGET and acceptance[i] < safety_rate:
+            reasons.append(f"Acceptance rate {acceptance[i]:.0%} is too low for a Safety classification.")
+    for label, position in (("Test score", test_position[i]), ("GPA", gpa_position[i])):
+        if np.isnan(position):
+            reasons.append(f"{label} comparison unavailable (missing student or college data).")
+        elif position < 0:
+            reasons.append(f"{label} is below the college's 25th percentile.")
+        elif position > 1:
+            reasons.append(f"{label} is above the college's 75th percentile.")
+        else:
+            reasons.append(f"{label} is within the college's middle 50% range.")
+    return reasons
+
+
+def _as_float(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    # Tool callers use 0 for "not provided".
+    return np.nan if value <= 0 else value
+
+
+def _as_rate(value):
+    """An acceptance rate as a fraction. Models often pass percents ("15%", 15): values above 1 are
+    read as percents, and values above 100% are treated as missing."""
+    if isinstance(value, str):
+        value = value.strip().rstrip("%")
+    rate = _as_float(value)
+    if rate > 1.0:
+        rate /= 100.0
+    return rate if rate <= 1.0 else np.nan
+
+
+_FIELD_PARSERS = {"acceptance_rate": _as_rate}
+
+
+def _json_number(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 3)
+
+
+# --- ADK Tool ---
+
+def classify_admission_chances(student_gpa: float, student_sat: int, student_act: int, colleges_json: str) -> dict:
+    """Deterministically classifies colleges as Reach, Target, Safety or Insufficient Data for one student.
+
+    Compares the student's GPA and test scores with each college's 25th/75th percentiles (ACT is
+    converted to the SAT scale, weighted or 100-point GPAs to the unweighted 4.0 scale) and applies
+    the acceptance-rate rules. Statistics missing from `colleges_json` are filled from the
+    pre-extracted college statistics table.
+
+    Args:
+        student_gpa: The student's GPA (any scale); 0 if not provided.
+        student_sat: The student's SAT total; 0 if not provided.
+        student_act: The student's ACT composite; 0 if not provided.
+        colleges_json: JSON array of objects, each with "college_name" and any known statistics:
+            "acceptance_rate" (fraction; percents above 1 are converted), "sat_composite_25", "sat_composite_75", "act_composite_25",
+            "act_composite_75", "gpa_25", "gpa_75", "gpa_average". A plain list of names is also accepted.
+    """
+    try:
+        colleges = json.loads(colleges_json)
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": f"colleges_json is not valid JSON: {e}"}
+    if not isinstance(colleges, list) or not colleges:
+        return {"status": "error", "message": "colleges_json must be a non-empty JSON array."}
+    colleges = [{"college_name": c} if isinstance(c, str) else dict(c) for c in colleges]
+
+    index = get_default_stats_index()
+    if index is not None:
+        for college in colleges:
+            stats = index.lookup(college.get("college_name") or college.get("name") or "")
+            for field, value in (stats or {}).items():
+                if college.get(field) in (None, ""):
+                    college[field] = value
+
+    results = classify_colleges({"gpa": student_gpa, "sat": student_sat, "act": student_act}, colleges)
+    return {"status": "success", "results": results}
@@ -0,0 +1,314 @@
+# insight_agent/college_stats.py
+
+import array
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+
+from .paths import index_path
+
+DEFAULT_STATS_INDEX_PATH = index_path("college_stats.idx")
+
+_MAGIC = b"ICSTATS1"
+_HEADER_LEN_FORMAT = "<I"
+
+# Typed columns of the statistics table: (name, array/struct typecode).
+# 'd' columns use NaN for missing values; 'i' columns use 0.
+STATS_COLUMNS = [
+    ("applications", "d"),
+    ("admitted", "d"),
+    ("acceptance_rate", "d"),
+    ("sat_ebrw_25", "d"),
+    ("sat_ebrw_75", "d"),
+    ("sat_math_25", "d"),
+    ("sat_math_75", "d"),
+    ("sat_composite_25", "d"),
+    ("sat_composite_75", "d"),
+    ("act_composite_25", "d"),
+    ("act_composite_75", "d"),
+    ("gpa_average", "d"),
+    ("gpa_25", "d"),
+    ("gpa_75", "d"),
+    ("gpa_pct_375_plus", "d"),
+    ("gpa_pct_350_374", "d"),
+    ("gpa_pct_below_350", "d"),
+    ("graduation_rate_4yr", "d"),
+    ("graduation_rate_6yr", "d"),
+    ("data_year", "i"),
+]
+_COLUMN_TYPES = dict(STATS_COLUMNS)
+
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+_NAME_NORMALIZE_PATTERN = re.compile(r"[^a-z0-9]+")
+
+# --- Extraction Patterns ---
+
+_CDS_NAME_PATTERN = re.compile(r"^\s*College Name:\s*(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+_CDS_YEAR_PATTERN = re.compile(r"Common Data Set\s+(\d{4})\s*[-–/]\s*(\d{2,4})", re.IGNORECASE)
+_IPEDS_NAME_PATTERN = re.compile(r"^\s*IPEDS Data for\s+(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+_IPEDS_YEAR_PATTERN = re.compile(r"(?:Data Year|Fall|Academic Year|Cohort Year)\s*:?\s*(\d{4})", re.IGNORECASE)
+_PERCENTILE_PATTERN = re.compile(
+    r"25th percentile\s*:?\s*" + _NUMBER + r".*?75th percentile\s*:?\s*" + _NUMBER, re.IGNORECASE
+)
+
+# Single-value CDS/IPEDS fields: column -> pattern whose first group is the value.
+_VALUE_PATTERNS = {
+    "applications": re.compile(r"C1\.?\s*(?:Total\s+)?Applications?[^:\n]*:\s*" + _NUMBER, re.IGNORECASE),
+    "admitted": re.compile(r"C2\.?\s*(?:Total\s+)?Admit(?:ted|s)?[^:\n]*:\s*" + _NUMBER, re.IGNORECASE),
+    "gpa_average": re.compile(r"(?:C12\.?\s*)?Average (?:high school )?GPA[^:\n]*:\s*" + _NUMBER, re.IGNORECASE),
+    "gpa_pct_375_plus": re.compile(r"GPA of 3\.75 and higher[^:\n]*:\s*" + _NUMBER + "%", re.IGNORECASE),
+    "gpa_pct_350_374": re.compile(r"GPA between 3\.50 and 3\.74[^:\n]*:\s*" + _NUMBER + "%", re.IGNORECASE),
+    "graduation_rate_4yr": re.compile(r"Graduation Rate\s*\(4[- ]year\)\s*:\s*" + _NUMBER + "%", re.IGNORECASE),
+    "graduation_rate_6yr": re.compile(r"Graduation Rate\s*\(6[- ]year\)\s*:\s*" + _NUMBER + "%", re.IGNORECASE),
+    "acceptance_rate": re.compile(r"(?:Acceptance|Admissions?) Rate\s*:\s*" + _NUMBER + "%", re.IGNORECASE),
+}
+
+# Lines carrying 25th/75th percentile pairs: column prefix -> line pattern.
+_PERCENTILE_LINE_PATTERNS = [
+    ("sat_ebrw", re.compile(r"SAT Evidence-Based Reading and Writing", re.IGNORECASE)),
+    ("sat_math", re.compile(r"SAT Math", re.IGNORECASE)),
+    ("sat_composite", re.compile(r"SAT Composite", re.IGNORECASE)),
+    ("act_composite", re.compile(r"ACT Composite", re.IGNORECASE)),
+    ("gpa", re.compile(r"\bGPA\b", re.IGNORECASE)),
+]
+
+_PERCENT_COLUMNS = {
+    "acceptance_rate", "gpa_pct_375_plus", "gpa_pct_350_374", "gpa_pct_below_350",
+    "graduation_rate_4yr", "graduation_rate_6yr",
+}
+
+
+def normalize_college_name(name):
+    """Canonical lookup key for a college name (case/punctuation-insensitive)."""
+    key = _NAME_NORMALIZE_PATTERN.sub(" ", (name or "").lower()).strip()
+    return key[4:] if key.startswith("the ") else key
+
+
+def _to_float(raw):
+    return float(raw.replace(",", ""))
+
+
+# --- Extraction ---
+
+def extract_college_name(text):
+    """The college a source document describes (its CDS "College Name:" or IPEDS header), or None."""
+    name_match = _CDS_NAME_PATTERN.search(text) or _IPEDS_NAME_PATTERN.search(text)
+    return name_match.group(1) if name_match else None
+
+
+def extract_college_stats(text):
+    """Parses CDS section codes / IPEDS fields from one source document.
+
+    Returns (college_name, {column: value}) or (None, {}) when the document names no college.
+    Percentages are stored as fractions (60% -> 0.6).
+    """
+    name = extract_college_name(text)
+    if not name:
+        return None, {}
+
+    values = {}
+    for column, pattern in _VALUE_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            value = _to_float(match.group(1))
+            values[column] = value / 100.0 if column in _PERCENT_COLUMNS else value
+
+    for line in text.splitlines():
+        percentile_match = _PERCENTILE_PATTERN.search(line)
+        if not percentile_match:
+            continue
+        for prefix, line_pattern in _PERCENTILE_LINE_PATTERNS:
+            if line_pattern.search(line):
+                values.setdefault(f"{prefix}_25", _to_float(percentile_match.group(1)))
+                values.setdefault(f"{prefix}_75", _to_float(percentile_match.group(2)))
+                break
+
+    if "acceptance_rate" not in values and values.get("applications") and "admitted" in values:
+        values["acceptance_rate"] = values["admitted"] / values["applications"]
+    if "sat_composite_25" not in values and "sat_ebrw_25" in values and "sat_math_25" in values:
+        # Section sums approximate the composite range when the CDS only reports sections.
+        values["sat_composite_25"] = values["sat_ebrw_25"] + values["sat_math_25"]
+        values["sat_composite_75"] = values["sat_ebrw_75"] + values["sat_math_75"]
+    if "gpa_pct_375_plus" in values and "gpa_pct_350_374" in values:
+        values["gpa_pct_below_350"] = max(0.0, 1.0 - values["gpa_pct_375_plus"] - values["gpa_pct_350_374"])
+
+    year_match = _CDS_YEAR_PATTERN.search(text) or _IPEDS_YEAR_PATTERN.search(text)
+    if year_match:
+        values["data_year"] = int(year_match.group(1))
+    return name, values
+
+
+def extract_stats_from_files(file_paths):
+    """Extracts and merges per-college statistics from source files.
+
+    Returns {normalized_name: (display_name, {column: value})}. When several documents describe the
+    same college, values from the most recent data year win.
+    """
+    records = {}
+    for file_path in file_paths:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            name, values = extract_college_stats(f.read())
+        if not name or not values:
+            continue
+        key = normalize_college_name(name)
+        display_name, merged = records.get(key, (name, {}))
+        if values.get("data_year", 0) >= merged.get("data_year", 0):
+            merged.update(values)
+        else:
+            for column, value in values.items():
+                merged.setdefault(column, value)
+        records[key] = (display_name, merged)
+    return records
+
+
+# --- Columnar Table ---
+
+def write_stats_index(records, path=DEFAULT_STATS_INDEX_PATH):
+    """Writes records from extract_stats_from_files() as a column-major, memory-mappable table.
+
+    Layout: magic | header length | JSON header (columns, names, row index) | one contiguous,
+    8-byte aligned array per column.
+    """
+    keys = sorted(records)
+    columns = {}
+    for column, typecode in STATS_COLUMNS:
+        missing = float("nan") if typecode == "d" else 0
+        columns[column] = array.array(typecode, (records[key][1].get(column, missing) for key in keys))
+
+    header = {
+        "columns": [],
+        "names": [records[key][0] for key in keys],
+        "rows": {key: row for row, key in enumerate(keys)},
+    }
+    # Column offsets are relative to the start of the data section.
+    offset = 0
+    for column, typecode in STATS_COLUMNS:
+        header["columns"].append({"name": column, "type": typecode, "offset": offset})
+        offset += _aligned(len(columns[column]) * columns[column].itemsize)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack(_HEADER_LEN_FORMAT, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+        for column, _ in STATS_COLUMNS:
+            data = columns[column].tobytes()
+            f.write(data)
+            f.write(b"\0" * (_aligned(len(data)) - len(data)))
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+class CollegeStatsIndex:
+    """Read-only, memory-mapped view of the statistics table with O(1) lookups by college name."""
+
+    def __init__(self, path=DEFAULT_STATS_INDEX_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"Not a college statistics index: {path}")
+        (header_len,) = struct.unpack_from(_HEADER_LEN_FORMAT, self._mm, len(_MAGIC))
+        header_start = len(_MAGIC) + struct.calcsize(_HEADER_LEN_FORMAT)
+        header = json.loads(self._mm[header_start:header_start + header_len])
+        data_start = _aligned(header_start + header_len)
+        self.names = header["names"]
+        self._rows = header["rows"]
+        # (name, struct format, absolute offset, item size) per column.
+        self._columns = [
+            (c["name"], "<" + c["type"], data_start + c["offset"], struct.calcsize(c["type"]))
+            for c in header["columns"]
+        ]
+
+    def __len__(self):
+        return len(self.names)
+
+    def row_for(self, college_name):
+        """Returns the row number for a college, or None."""
+        return self._rows.get(normalize_college_name(college_name))
+
+    def lookup(self, college_name):
+        """Returns {column: value} for a college (missing values omitted), or None if unknown."""
+        row = self.row_for(college_name)
+        if row is None:
+            return None
+        stats = {"college_name": self.names[row]}
+        for name, fmt, offset, size in self._columns:
+            (value,) = struct.unpack_from(fmt, self._mm, offset + row * size)
+            if (fmt == "<d" and math.isnan(value)) or (fmt == "<i" and value == 0):
+                continue
+            stats[name] = value
+        return stats
+
+    def column(self, name):
+        """Zero-copy memoryview over one column (useful for vectorized scans)."""
+        for column_name, fmt, offset, size in self._columns:
+            if column_name == name:
+                return memoryview(self._mm)[offset:offset + size * len(self.names)].cast(fmt[1:])
+        raise KeyError(name)
+
+    def close(self):
+        """Unmaps the table. While column() views of it are still alive the mapping stays open and
+        is released when the last view is garbage-collected."""
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+
+
+# --- Process-wide Index ---
+
+_default_index = None
+_default_index_mtime = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_stats_index():
+    """Returns the index at COLLEGE_STATS_INDEX_PATH, reopening it after ingestion rewrites it."""
+    global _default_index, _default_index_mtime
+    path = os.getenv("COLLEGE_STATS_INDEX_PATH") or DEFAULT_STATS_INDEX_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _default_index_lock:
+        if _default_index is None or _default_index.path != path or _default_index_mtime != mtime:
+            # The previous index is not closed: other threads may still be looking colleges up in it.
+            # Its mapping is released once the last reference to it is garbage-collected.
+            _default_index = CollegeStatsIndex(path)
+            _default_index_mtime = mtime
+        return _default_index
+
+
+def lookup_college_stats(college_name: str) -> dict:
+    """Looks up exact admission statistics for a college from the pre-extracted CDS/IPEDS statistics table.
+
+    Returns acceptance rate, SAT/ACT 25th/75th percentiles, GPA figures, graduation rates and the
+    data year when available. Rates are fractions (0.25 means 25%).
+
+    Args:
+        college_name: The college's name, e.g. "Stanford University".
+    """
+    index = get_default_stats_index()
+    if index is None:
+        return {"status": "unavailable", "message": "The college statistics index has not been built yet."}
+    stats = index.lookup(college_name)
+    if stats is None:
+        # "UC Berkeley", "Cal" and other aliases resolve to the name the table is keyed by (see entities.py).
+        from .entities import canonical_college_name
+        canonical = canonical_college_name(college_name)
+        stats = index.lookup(canonical) if canonical != college_name else None
+    if stats is None:
+        return {"status": "not_found", "message": f"No structured statistics found for '{college_name}'."}
+    return {"status": "success", "stats": stats}
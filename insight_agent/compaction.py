@@ -0,0 +1,253 @@
+# insight_agent/compaction.py
+#
+# Bounded context for the sequential LLM coordinator. Without it, every specialist call, response
+# and status statement for every college stays in the conversation, so the prompt (and the cost and
+# latency of each turn) grows with the number of colleges already processed. With compaction, the
+# coordinator calls `record_college_analysis` once a college is finished; the code keeps the
+# college's processing record in session state, and a before_model_callback replaces the finished
+# colleges' turns with their final COLLEGE_ANALYSIS_BLOCKs. The recorded blocks are also what ends up
+# in the final output: an after_model_callback puts them there in place of the model's copies.
+
+import collections
+import os
+import threading
+
+from google.adk.tools import ToolContext
+from google.genai import types as genai_types
+
+from .coordinator_output import (
+    OUTPUT_START,
+    extract_college_block,
+    parse_coordinator_output,
+    render_college_block,
+    split_college_blocks,
+)
+from .entities import college_id
+from .tracing import current_span, estimate_tokens
+
+RECORD_TOOL_NAME = "record_college_analysis"
+
+# Session state keys: finished colleges (name -> record) and the specialist calls made for the
+# college in progress, which are moved into its record when it is finished.
+COLLEGE_RECORDS_KEY = "insight_college_records"
+PENDING_CALLS_KEY = "insight_pending_calls"
+
+# Starts the text that stands in for the compacted turns.
+COMPACTED_CONTEXT_MARKER = "COMPACTED_COLLEGE_RECORDS"
+
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+
+
+# --- Coordinator Tool ---
+
+def record_college_analysis(college_name: str, analysis_block: str, tool_context: ToolContext) -> dict:
+    """Records the final analysis of one finished college and frees the working context used for it.
+
+    Call this exactly once per college, after its classification and rationale are final and before
+    starting the next college. Afterwards your notes and sub-agent results for this college are
+    replaced by the recorded block, which you must copy unchanged into the final structured output
+    (the recorded block is used there even if your copy differs).
+
+    Args:
+        college_name: The full name of the college that was analyzed.
+        analysis_block: The college's complete block, from COLLEGE_ANALYSIS_BLOCK_START to
+            COLLEGE_ANALYSIS_BLOCK_END, in the format of the final structured output.
+    """
+    block = extract_college_block(analysis_block)
+    if block is None:
+        return {"status": "error", "message": "analysis_block must be one complete block from "
+                "COLLEGE_ANALYSIS_BLOCK_START to COLLEGE_ANALYSIS_BLOCK_END. Fix it and call this tool again."}
+    parsed = parse_coordinator_output(block).colleges
+    records = dict(tool_context.state.get(COLLEGE_RECORDS_KEY) or {})
+    records[college_name] = {
+        "college_name": college_name,
+        "classification": parsed[0].classification if parsed else "",
+        "calls": list(tool_context.state.get(PENDING_CALLS_KEY) or []),
+        "block": block,
+    }
+    tool_context.state[COLLEGE_RECORDS_KEY] = records
+    tool_context.state[PENDING_CALLS_KEY] = []
+    return {"status": "success", "recorded": college_name, "colleges_finished": len(records),
+            "message": "Recorded. Continue with the next college, or output the final structured block if all are finished."}
+
+
+def track_college_calls(tool, args, tool_context, tool_response):
+    """after_tool_callback: appends each specialist/tool call and its status to the college in progress."""
+    if tool.name == RECORD_TOOL_NAME:
+        return None
+    status = tool_response.get("status", "success") if isinstance(tool_response, dict) else "success"
+    tool_context.state[PENDING_CALLS_KEY] = list(tool_context.state.get(PENDING_CALLS_KEY) or []) + [
+        {"tool": tool.name, "status": status}]
+    return None
+
+
+def reset_college_records(callback_context):
+    """before_agent_callback: starts every coordinator run without records from an earlier request.
+    (AgentTool runs copy the caller's state in and their state changes back out.)"""
+    if callback_context.state.get(COLLEGE_RECORDS_KEY) or callback_context.state.get(PENDING_CALLS_KEY):
+        callback_context.state[COLLEGE_RECORDS_KEY] = {}
+        callback_context.state[PENDING_CALLS_KEY] = []
+    return None
+
+
+# --- Context Compaction ---
+
+def _recorded_blocks(contents):
+    """Blocks from the successful record_college_analysis calls in `contents`, in call order."""
+    succeeded, calls = set(), []
+    for content in contents:
+        for part in content.parts or ():
+            if part.function_response and part.function_response.name == RECORD_TOOL_NAME:
+                if (part.function_response.response or {}).get("status") == "success":
+                    succeeded.add(part.function_response.id)
+            elif part.function_call and part.function_call.name == RECORD_TOOL_NAME:
+                calls.append(part.function_call)
+    blocks = []
+    for call in calls:
+        block = extract_college_block((call.args or {}).get("analysis_block", ""))
+        if block and (call.id in succeeded or call.id is None):
+            blocks.append(block)
+    return blocks
+
+
+def compact_coordinator_context(callback_context, llm_request):
+    """before_model_callback: replaces the turns of finished colleges with their recorded blocks.
+
+    Everything after the request and up to the last record_college_analysis response is dropped,
+    except function calls (and their responses) made in the same turn as that record call. The
+    session itself is untouched; the compaction is reapplied to the request built for every turn.
+    """
+    contents = list(llm_request.contents or [])
+    cut = None
+    for i, content in enumerate(contents):
+        if any(part.function_response and part.function_response.name == RECORD_TOOL_NAME
+               for part in content.parts or ()):
+            cut = i
+    if cut is None:
+        return None
+    head = 0
+    while head < len(contents) and contents[head].role == "user":
+        head += 1
+    if head == 0 or head > cut:
+        return None
+
+    blocks = _recorded_blocks(contents[head:cut + 1])
+    summary = (f"{COMPACTED_CONTEXT_MARKER}: {len(blocks)} colleges are finished and recorded. Their working notes "
+               "have been removed; these final blocks are authoritative. Do not analyze these colleges again, and "
+               "copy the blocks unchanged into the final structured output.\n\n" + "\n\n".join(blocks))
+    request = contents[head - 1]
+    compacted = contents[:head - 1] + [genai_types.Content(role=request.role, parts=list(request.parts or []) + [
+        genai_types.Part(text=summary)])]
+
+    # Calls issued in the same turn as the last record call are still awaiting use; keep them paired.
+    if cut > head and contents[cut - 1].role == "model":
+        kept_calls = [part for part in contents[cut - 1].parts or ()
+                      if part.function_call and part.function_call.name != RECORD_TOOL_NAME]
+        kept_responses = [part for part in contents[cut].parts or ()
+                          if part.function_response and part.function_response.name != RECORD_TOOL_NAME]
+        if kept_calls and kept_responses:
+            compacted += [genai_types.Content(role="model", parts=kept_calls),
+                          genai_types.Content(role="user", parts=kept_responses)]
+    compacted += contents[cut + 1:]
+
+    before, after = estimate_tokens(contents), estimate_tokens(compacted)
+    llm_request.contents = compacted
+    with _stats_lock:
+        _stats["compactions"] += 1
+        _stats["estimated_tokens_removed"] += max(0, before - after)
+    span = current_span()
+    if span is not None:
+        span.attributes.update(compacted_colleges=len(blocks), context_tokens_before_compaction=before,
+                               context_tokens_after_compaction=after)
+    return None
+
+
+# --- Final Output Assembly ---
+
+def _block_college_id(block, default=""):
+    parsed = parse_coordinator_output(block).colleges
+    return college_id(parsed[0].college_name if parsed and parsed[0].college_name else default)
+
+
+def merge_recorded_blocks(text, records):
+    """`text` (the coordinator's final output) with the blocks of recorded colleges taken from
+    `records` (state[COLLEGE_RECORDS_KEY], in recording order).
+
+    A recorded college's block in `text` is replaced by its recorded block; a recorded block that
+    `text` lacks is inserted after the blocks of the colleges recorded before it. Blocks of colleges
+    that were never recorded are kept as the model wrote them. Returns (text, restored), where
+    `restored` counts the recorded blocks that were missing from or altered in `text`.
+    """
+    recorded = {}
+    for record in records.values():
+        recorded[_block_college_id(record["block"], record.get("college_name", ""))] = record["block"]
+    rank = {key: i for i, key in enumerate(recorded)}
+
+    head, model_blocks, tail = split_college_blocks(text)
+    merged, restored = [], 0  # [(college id if recorded else None, block)]
+    for block in model_blocks:
+        key = _block_college_id(block)
+        if key not in recorded:
+            merged.append((None, block))
+        elif all(other != key for other, _ in merged):
+            restored += block.strip() != recorded[key].strip()
+            merged.append((key, recorded[key]))
+    for key, block in recorded.items():
+        if any(other == key for other, _ in merged):
+            continue
+        position = 0
+        for i, (other, _) in enumerate(merged):
+            if other is not None and rank[other] < rank[key]:
+                position = i + 1
+        merged.insert(position, (key, block))
+        restored += 1
+    return head + "".join(render_college_block(block) for _, block in merged) + tail, restored
+
+
+def assemble_recorded_blocks(callback_context, llm_response):
+    """after_model_callback: builds the final output's college blocks from the recorded records, so
+    the output does not depend on the model copying them unchanged."""
+    records = callback_context.state.get(COLLEGE_RECORDS_KEY)
+    content = llm_response.content
+    if not records or llm_response.partial or content is None or not content.parts:
+        return None
+    text_parts = [part for part in content.parts if part.text and not part.thought]
+    text = "".join(part.text for part in text_parts)
+    if OUTPUT_START not in text:
+        return None
+    merged, restored = merge_recorded_blocks(text, records)
+    with _stats_lock:
+        _stats["final_outputs_assembled"] += 1
+        _stats["blocks_restored"] += restored
+    if merged == text:
+        return None
+    # The merged text takes the place of the first text part; other parts (e.g. thoughts) are kept.
+    first = next(i for i, part in enumerate(content.parts) if part is text_parts[0])
+    parts = [part for part in content.parts if all(part is not text_part for text_part in text_parts)]
+    parts.insert(first, genai_types.Part(text=merged))
+    return llm_response.model_copy(update={"content": genai_types.Content(role=content.role, parts=parts)})
+
+
+def install_context_compaction(agent):
+    """Adds the record tool and the compaction/call-tracking/assembly callbacks to a sequential coordinator."""
+    from .tracing import chain_callbacks
+
+    agent.tools = list(agent.tools) + [record_college_analysis]
+    agent.before_agent_callback = chain_callbacks(agent.before_agent_callback, reset_college_records)
+    agent.before_model_callback = chain_callbacks(agent.before_model_callback, compact_coordinator_context)
+    agent.after_model_callback = chain_callbacks(agent.after_model_callback, assemble_recorded_blocks)
+    agent.after_tool_callback = chain_callbacks(agent.after_tool_callback, track_college_calls)
+    return agent
+
+
+def get_compaction_stats():
+    """Process-wide counts of compacted model requests, the (estimated) prompt tokens they saved, and
+    the final outputs assembled from recorded blocks (with the blocks the model had dropped or altered)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def context_compaction_enabled():
+    """INSIGHT_CONTEXT_COMPACTION=0 keeps the full per-college history in the coordinator's context."""
+    return os.getenv("INSIGHT_CONTEXT_COMPACTION", "1").lower() not in ("0", "false", "no")
@@ -0,0 +1,296 @@
+# insight_agent/coordinator_output.py
+
+import dataclasses
+import datetime
+import re
+
+# --- Block Grammar Markers ---
+# These must stay in sync with the format described in get_internal_coordinator_instructions().
+
+OUTPUT_START = "INTERNAL_COORDINATOR_OUTPUT_START"
+OUTPUT_END = "INTERNAL_COORDINATOR_OUTPUT_END"
+COLLEGE_BLOCK_START = "COLLEGE_ANALYSIS_BLOCK_START"
+COLLEGE_BLOCK_END = "COLLEGE_ANALYSIS_BLOCK_END"
+
+INSUFFICIENT_DATA = "Insufficient Data for Classification"
+
+QUALITATIVE_SECTION_TEXT = (
+    "College admissions are often holistic and consider many factors beyond GPA and test scores, such as essays, "
+    "recommendations, extracurricular activities, and individual circumstances. This analysis focuses primarily on "
+    "academic statistical alignment."
+)
+
+LIMITATIONS_SECTION_TEXT = (
+    "This analysis is based on the data available up to {date} from automated agents and publicly accessible "
+    "information. Admission statistics can change, and individual college policies may vary."
+)
+
+DISCLAIMER_SECTION_TEXT = (
+    "This AI-generated report is for informational purposes only and not a guarantee of admission. Always consult "
+    "official college sources and admissions counselors for the most current advice."
+)
+
+# Simple (non-college) sections: marker prefix -> CoordinatorOutput attribute.
+SECTION_ATTRIBUTES = {
+    "USER_PROFILE_SUMMARY": "profile_summary",
+    "OVERALL_ANALYSIS_NOTES": "overall_notes",
+    "QUALITATIVE_SECTION_CONTENT": "qualitative",
+    "LIMITATIONS_SECTION_CONTENT": "limitations",
+    "DISCLAIMER_SECTION_CONTENT": "disclaimer",
+}
+
+# College block fields: key -> CollegeAnalysis attribute.
+COLLEGE_FIELDS = {
+    "COLLEGE_NAME": "college_name",
+    "CLASSIFICATION": "classification",
+    "KEY_COMPARATIVE_DATA_POINTS": "key_data_points",
+    "DETAILED_RATIONALE": "rationale",
+    "DATA_SOURCES_SUMMARY": "data_sources",
+    "INTERNAL_PROCESSING_NOTES": "processing_notes",
+}
+
+_FIELD_PATTERN = re.compile(r"^(?:[*\-\s]*)([A-Z_]+)\s*:\s*(.*)$")
+
+_COLLEGE_BLOCK_PATTERN = re.compile(
+    re.escape(COLLEGE_BLOCK_START) + r".*?" + re.escape(COLLEGE_BLOCK_END),
+    re.DOTALL,
+)
+
+
+# --- Helper Functions ---
+
+def extract_college_block(text):
+    """Returns the first complete COLLEGE_ANALYSIS_BLOCK found in `text`, or None."""
+    if not text:
+        return None
+    match = _COLLEGE_BLOCK_PATTERN.search(text)
+    return match.group(0) if match else None
+
+
+def extract_college_blocks(text):
+    """Returns every complete COLLEGE_ANALYSIS_BLOCK found in `text`, in order."""
+    return _COLLEGE_BLOCK_PATTERN.findall(text or "")
+
+
+def split_college_blocks(text):
+    """Splits `text` into (head, blocks, tail): the text before the first complete college block,
+    the blocks, and the text after the last one. Without blocks, the split is where they belong
+    (before the qualitative section, or else before OUTPUT_END)."""
+    text = text or ""
+    matches = list(_COLLEGE_BLOCK_PATTERN.finditer(text))
+    if matches:
+        head, tail = text[:matches[0].start()], text[matches[-1].end():]
+    else:
+        cut = len(text)
+        for marker in ("QUALITATIVE_SECTION_CONTENT_START", OUTPUT_END):
+            if marker in text:
+                cut = text.index(marker)
+                break
+        head, tail = text[:cut], text[cut:]
+    head = head.rstrip() + "\n\n" if head.strip() else ""
+    return head, [match.group(0) for match in matches], tail.lstrip()
+
+
+def fallback_college_block(college_name, reason):
+    """Builds an 'Insufficient Data' block for a college whose analysis could not be completed."""
+    return "\n".join([
+        COLLEGE_BLOCK_START,
+        f"COLLEGE_NAME: {college_name}",
+        f"CLASSIFICATION: {INSUFFICIENT_DATA}",
+        "KEY_COMPARATIVE_DATA_POINTS: Not available.",
+        f"DETAILED_RATIONALE: A classification could not be produced for {college_name}. {reason}",
+        "DATA_SOURCES_SUMMARY: None.",
+        f"INTERNAL_PROCESSING_NOTES: {reason}",
+        COLLEGE_BLOCK_END,
+    ])
+
+
+def render_output_header(profile_summary, overall_notes):
+    """Renders everything up to (not including) the first COLLEGE_ANALYSIS_BLOCK."""
+    return "\n".join([
+        OUTPUT_START,
+        "",
+        "USER_PROFILE_SUMMARY_START",
+        profile_summary,
+        "USER_PROFILE_SUMMARY_END",
+        "",
+        "OVERALL_ANALYSIS_NOTES_START",
+        overall_notes,
+        "OVERALL_ANALYSIS_NOTES_END",
+        "",
+    ]) + "\n"
+
+
+def render_output_footer(as_of=None):
+    """Renders the standard sections that follow the college blocks, through OUTPUT_END."""
+    as_of = as_of or datetime.date.today().isoformat()
+    return "\n".join([
+        "QUALITATIVE_SECTION_CONTENT_START",
+        QUALITATIVE_SECTION_TEXT,
+        "QUALITATIVE_SECTION_CONTENT_END",
+        "",
+        "LIMITATIONS_SECTION_CONTENT_START",
+        LIMITATIONS_SECTION_TEXT.format(date=as_of),
+        "LIMITATIONS_SECTION_CONTENT_END",
+        "",
+        "DISCLAIMER_SECTION_CONTENT_START",
+        DISCLAIMER_SECTION_TEXT,
+        "DISCLAIMER_SECTION_CONTENT_END",
+        "",
+        OUTPUT_END,
+    ])
+
+
+def render_college_block(block):
+    """Normalizes one college block for placement between the header and the footer."""
+    return block.strip() + "\n\n"
+
+
+def render_coordinator_output(profile_summary, overall_notes, college_blocks, as_of=None):
+    """Assembles the full INTERNAL_COORDINATOR_OUTPUT block from per-college analysis blocks."""
+    return (render_output_header(profile_summary, overall_notes)
+            + "".join(render_college_block(block) for block in college_blocks)
+            + render_output_footer(as_of))
+
+
+# --- Typed Records ---
+
+@dataclasses.dataclass
+class CollegeAnalysis:
+    """One parsed COLLEGE_ANALYSIS_BLOCK."""
+    college_name: str = ""
+    classification: str = ""
+    key_data_points: str = ""
+    rationale: str = ""
+    data_sources: str = ""
+    processing_notes: str = ""
+    complete: bool = True  # False when the block was cut off before COLLEGE_ANALYSIS_BLOCK_END
+
+
+@dataclasses.dataclass
+class CoordinatorOutput:
+    """Everything parsed from an INTERNAL_COORDINATOR_OUTPUT block."""
+    profile_summary: str = ""
+    overall_notes: str = ""
+    colleges: list = dataclasses.field(default_factory=list)
+    qualitative: str = ""
+    limitations: str = ""
+    disclaimer: str = ""
+    started: bool = False
+    complete: bool = False
+    warnings: list = dataclasses.field(default_factory=list)
+
+
+# --- Streaming Parser ---
+
+class CoordinatorOutputParser:
+    """Incremental parser for the coordinator's block grammar.
+
+    Text may be fed in arbitrary pieces (e.g. streamed model deltas). `feed()` returns the events
+    completed by that piece, in order:
+      ("section", attribute_name)  a simple section finished (its text is on `self.output`)
+      ("college", CollegeAnalysis) a college block finished
+      ("end", CoordinatorOutput)   INTERNAL_COORDINATOR_OUTPUT_END was reached
+    Text outside the markers (e.g. trace statements) is ignored. The parser is lenient: a college
+    block without a preceding OUTPUT_START is still accepted, with a warning.
+    """
+
+    def __init__(self):
+        self.output = CoordinatorOutput()
+        self._pending = ""
+        self._section = None  # (marker prefix, [lines]) while inside a simple section
+        self._college = None  # (CollegeAnalysis, last field attribute) while inside a college block
+
+    @property
+    def finished(self):
+        return self.output.complete
+
+    def feed(self, text):
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        events = []
+        for line in lines:
+            events.extend(self._process_line(line))
+        return events
+
+    def close(self):
+        """Flushes buffered text and closes any unterminated block. Returns the final events."""
+        events = self._process_line(self._pending) if self._pending else []
+        self._pending = ""
+        if self._college is not None:
+            record = self._college[0]
+            self._college = None
+            if record.college_name:
+                record.complete = False
+                self.output.colleges.append(record)
+                self.output.warnings.append(f"College block for '{record.college_name}' was not terminated.")
+                events.append(("college", record))
+        if self._section is not None:
+            self._finish_section()
+            self.output.warnings.append("A section was not terminated.")
+        if self.output.started and not self.output.complete:
+            self.output.warnings.append(f"{OUTPUT_END} was not found.")
+        return events
+
+    def _process_line(self, raw_line):
+        line = raw_line.strip().strip("`").strip()
+        if self.output.complete:
+            return []
+
+        if self._section is not None:
+            if line == f"{self._section[0]}_END":
+                return [self._finish_section()]
+            self._section[1].append(raw_line.rstrip())
+            return []
+
+        if self._college is not None:
+            if line == COLLEGE_BLOCK_END:
+                record = self._college[0]
+                self._college = None
+                if not record.college_name:
+                    self.output.warnings.append("Dropped a college block without COLLEGE_NAME.")
+                    return []
+                self.output.colleges.append(record)
+                return [("college", record)]
+            self._college_line(line)
+            return []
+
+        if line == OUTPUT_START:
+            self.output.started = True
+        elif line == OUTPUT_END:
+            self.output.complete = True
+            return [("end", self.output)]
+        elif line == COLLEGE_BLOCK_START:
+            if not self.output.started:
+                self.output.started = True
+                self.output.warnings.append(f"{COLLEGE_BLOCK_START} appeared before {OUTPUT_START}.")
+            self._college = (CollegeAnalysis(), None)
+        elif line.endswith("_START") and line[:-len("_START")] in SECTION_ATTRIBUTES and self.output.started:
+            self._section = (line[:-len("_START")], [])
+        return []
+
+    def _college_line(self, line):
+        record, last_attribute = self._college
+        match = _FIELD_PATTERN.match(line)
+        if match and match.group(1) in COLLEGE_FIELDS:
+            attribute = COLLEGE_FIELDS[match.group(1)]
+            setattr(record, attribute, match.group(2).strip())
+            self._college = (record, attribute)
+        elif last_attribute and line:
+            # Continuation of a multi-line field.
+            setattr(record, last_attribute, f"{getattr(record, last_attribute)}\n{line}".strip())
+
+    def _finish_section(self):
+        prefix, lines = self._section
+        self._section = None
+        attribute = SECTION_ATTRIBUTES[prefix]
+        setattr(self.output, attribute, "\n".join(lines).strip())
+        return ("section", attribute)
+
+
+def parse_coordinator_output(text):
+    """Parses a complete coordinator response in one go."""
+    parser = CoordinatorOutputParser()
+    parser.feed(text)
+    parser.close()
+    return parser.output
@@ -0,0 +1,436 @@
+# insight_agent/entities.py
+#
+# College entity resolution. Users name the same college in many ways ("Cal", "UCB", "UC Berkeley",
+# "University of California, Berkeley"), and each variant used to become its own RAGAgent query,
+# retrieval cache key, single-flight key and analysis cache entry. The entity index maps such
+# mentions to one canonical college id: the normalized canonical name, which is also the key of the
+# statistics table. It is built at ingestion time from the colleges the corpus names (CDS
+# "College Name:" lines, IPEDS headers) plus an alias table, and matched with a token trie, with
+# fuzzy matching as the fallback for whole names. The coordinators use it to prefetch each
+# resolved college's retrieval results while their first model turn is still running.
+
+import asyncio
+import collections
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+
+from .college_stats import extract_college_name, normalize_college_name
+from .paths import index_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENTITY_INDEX_PATH = index_path("college_entities.json")
+
+# Query prefetched for every resolved college; RAGAgent is asked to start with the same query.
+PREFETCH_QUERY_TEMPLATE = "Admission statistics for {college}"
+
+# Minimum difflib similarity for a misspelled name ("Standford University") to resolve.
+FUZZY_CUTOFF = 0.88
+# Resolved names remembered per index before the memo is cleared.
+MAX_MEMOIZED_NAMES = 10000
+
+# Nicknames and abbreviations the generated aliases miss; extended by the JSON file at COLLEGE_ALIASES_PATH.
+COLLEGE_ALIASES = {
+    "University of California, Berkeley": ["Cal", "Berkeley", "UCB", "UC Berkeley"],
+    "University of California, Los Angeles": ["UCLA"],
+    "University of California, San Diego": ["UCSD"],
+    "California Institute of Technology": ["Caltech", "Cal Tech"],
+    "Massachusetts Institute of Technology": ["MIT"],
+    "University of Pennsylvania": ["Penn", "UPenn"],
+    "Pennsylvania State University": ["Penn State", "PSU"],
+    "Georgia Institute of Technology": ["Georgia Tech"],
+    "Carnegie Mellon University": ["CMU"],
+    "University of Michigan": ["UMich", "Michigan"],
+    "University of North Carolina at Chapel Hill": ["UNC", "UNC Chapel Hill"],
+    "University of Southern California": ["USC"],
+    "New York University": ["NYU"],
+    "Washington University in St. Louis": ["WashU", "WUSTL"],
+    "Case Western Reserve University": ["Case Western", "CWRU"],
+    "University of Texas at Austin": ["UT Austin"],
+    "University of Virginia": ["UVA"],
+    "Virginia Polytechnic Institute and State University": ["Virginia Tech"],
+    "Johns Hopkins University": ["JHU", "Johns Hopkins"],
+    "University of Chicago": ["UChicago"],
+    "Texas A&M University": ["Texas A&M"],
+    "College of William & Mary": ["William & Mary", "William and Mary"],
+    "Harvard University": [],
+    "Stanford University": [],
+    "Yale University": [],
+    "Princeton University": [],
+    "Columbia University": [],
+    "Brown University": [],
+    "Cornell University": [],
+    "Dartmouth College": [],
+    "Duke University": [],
+    "Northwestern University": [],
+    "Rice University": [],
+    "Vanderbilt University": [],
+}
+
+# State systems whose campuses are usually called "<prefix> <campus>" ("UC Davis", "UT Dallas").
+SYSTEM_PREFIXES = {
+    "university of california": "uc",
+    "university of texas": "ut",
+    "university of north carolina": "unc",
+    "university of massachusetts": "umass",
+    "university of wisconsin": "uw",
+    "california state university": "cal state",
+    "state university of new york": "suny",
+}
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+_STOP_WORDS = frozenset(("of", "at", "the", "and", "in", "for"))
+_GENERIC_WORDS = _STOP_WORDS | {"university", "college"}
+# Words that, after a one-word alias, make it part of another college's name ("Michigan State", "Cal Poly").
+_NAME_CONTINUATIONS = frozenset(("state", "tech", "poly", "polytechnic"))
+_TERMINAL = ""
+
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+# --- Alias Generation ---
+
+def distinctive_words(name):
+    """The words that tell a college name apart ("stanford" in "The Stanford University")."""
+    return [token for token in normalize_college_name(name).split() if token not in _GENERIC_WORDS]
+
+
+def generate_aliases(name):
+    """Common short forms of a college name: its distinctive word ("Stanford"), acronym ("NYU",
+    "UCLA"), campus ("Berkeley") and state-system form ("UC Berkeley")."""
+    key = normalize_college_name(name)
+    tokens = key.split()
+    aliases = []
+    distinctive = distinctive_words(name)
+    if len(distinctive) == 1 and distinctive[0] != "state":
+        aliases.append(distinctive[0])
+    significant = [token for token in tokens if token not in _STOP_WORDS]
+    if len(significant) >= 3:
+        aliases.append("".join(token[0] for token in significant))
+    for system, prefix in SYSTEM_PREFIXES.items():
+        if key.startswith(system + " ") and key != system:
+            campus = key[len(system) + 1:]
+            aliases.append(f"{prefix} {campus}")
+            if len(campus.split()) == 1:
+                aliases.append(campus)
+    return aliases
+
+
+def load_alias_table(path=None):
+    """COLLEGE_ALIASES merged with the optional JSON file ({"canonical name": ["alias", ...]}) at `path`."""
+    table = {name: list(aliases) for name, aliases in COLLEGE_ALIASES.items()}
+    path = path or os.getenv("COLLEGE_ALIASES_PATH")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for name, aliases in json.load(f).items():
+                table.setdefault(name, []).extend(aliases)
+    return table
+
+
+def _continues_name(text, tokens, i):
+    """Whether the word after tokens[i] continues a longer name: a continuation word or a capitalized
+    (not all-caps) word right after it. "Michigan State University" and "Cal Poly" are other colleges
+    than "Michigan" and "Cal", while "MIT SAT scores" still mentions MIT."""
+    if i + 1 >= len(tokens) or text[tokens[i][1]:tokens[i + 1][0]].strip():
+        return False
+    start, end, word = tokens[i + 1]
+    raw = text[start:end]
+    return word in _NAME_CONTINUATIONS or (raw[0].isupper() and not raw.isupper())
+
+
+def _covers_name(text, mentions):
+    """Whether `mentions` span every distinctive (non-generic) word of `text`."""
+    return all(any(start <= match.start() and match.end() <= end for start, end, _ in mentions)
+               for match in _WORD_PATTERN.finditer(text) if match.group().lower() not in _GENERIC_WORDS)
+
+
+# --- Entity Index ---
+
+class CollegeEntityIndex:
+    """Maps free-text college mentions to canonical college ids.
+
+    `entities` is {college_id: {"name": canonical name, "aliases": [...], "sources": [...]}}. An
+    alias claimed by several colleges (e.g. "example" for Example University and Example College)
+    is dropped unless it is one college's full name.
+    """
+
+    def __init__(self, entities):
+        self.entities = entities
+        self._aliases = {}
+        self._trie = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        ranked = {}
+        for college_id, entity in entities.items():
+            for rank, alias in [(0, entity["name"])] + [(1, alias) for alias in entity.get("aliases", ())]:
+                key = normalize_college_name(alias)
+                if not key:
+                    continue
+                current = ranked.get(key)
+                if current is None or rank < current[0]:
+                    ranked[key] = (rank, college_id)
+                elif rank == current[0] and current[1] != college_id:
+                    ranked[key] = (rank, None)
+        for key, (_, college_id) in ranked.items():
+            if college_id is None:
+                continue
+            self._aliases[key] = college_id
+            node = self._trie
+            for token in key.split():
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = college_id
+
+    def __len__(self):
+        return len(self.entities)
+
+    def name(self, college_id):
+        entity = self.entities.get(college_id)
+        return entity["name"] if entity else None
+
+    def lookup(self, name):
+        """The college id whose name or alias is exactly `name` (after normalization), or None."""
+        return self._aliases.get(normalize_college_name(name))
+
+    def find_mentions(self, text):
+        """[(start, end, college_id)] of the longest alias matches in `text`, left to right.
+        One-word aliases only match capitalized words ("Cal" and "MIT", not "cal") that do not start
+        a longer name ("Michigan" in "Michigan State University")."""
+        tokens = [(match.start(), match.end(), match.group().lower()) for match in _WORD_PATTERN.finditer(text or "")]
+        mentions, i = [], 0
+        while i < len(tokens):
+            node, match = self._trie, None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j][2])
+                if node is None:
+                    break
+                if _TERMINAL in node and (j > i or (text[tokens[i][0]].isupper()
+                                                    and not _continues_name(text, tokens, i))):
+                    match = (j, node[_TERMINAL])
+            if match is None:
+                i += 1
+                continue
+            mentions.append((tokens[i][0], tokens[match[0]][1], match[1]))
+            i = match[0] + 1
+        return mentions
+
+    def resolve(self, name):
+        """The college id for a college name or alias, or None. Tries an exact alias, then a single
+        college whose mentions in `name` cover all of its distinctive words ("the Massachusetts
+        Institute of Technology (MIT)", but not "Western Michigan University"), then the closest
+        alias by spelling."""
+        key = normalize_college_name(name)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        college_id, method = self._aliases.get(key), "exact"
+        if college_id is None:
+            mentions = self.find_mentions(name)
+            found = {mention[2] for mention in mentions}
+            if len(found) == 1 and _covers_name(name, mentions):
+                college_id, method = found.pop(), "mention"
+        if college_id is None:
+            candidates = [alias for alias in self._aliases if alias[0] == key[0] and " " in alias]
+            close = difflib.get_close_matches(key, candidates, n=1, cutoff=FUZZY_CUTOFF)
+            if close:
+                college_id, method = self._aliases[close[0]], "fuzzy"
+        _count(f"resolved_{method}" if college_id else "unresolved")
+        with self._lock:
+            if len(self._memo) >= MAX_MEMOIZED_NAMES:
+                self._memo.clear()
+            self._memo[key] = college_id
+        return college_id
+
+    def canonicalize(self, text, ids=False):
+        """`text` with every college mention replaced by its canonical name (or, with `ids`, its id)."""
+        mentions = self.find_mentions(text)
+        for start, end, college_id in reversed(mentions):
+            text = text[:start] + (college_id if ids else self.entities[college_id]["name"]) + text[end:]
+        return text
+
+
+def build_entities(file_paths, alias_table=None):
+    """Entities for the colleges named in `file_paths` and in the alias table, with their aliases
+    and the source files that describe them."""
+    entities = {}
+
+    def add(name, aliases=(), source=None):
+        college_id = normalize_college_name(name)
+        if not college_id:
+            return
+        entity = entities.setdefault(college_id, {"name": name, "aliases": [], "sources": []})
+        for alias in list(aliases) + generate_aliases(name):
+            if normalize_college_name(alias) != college_id and alias not in entity["aliases"]:
+                entity["aliases"].append(alias)
+        if source and source not in entity["sources"]:
+            entity["sources"].append(source)
+
+    for file_path in file_paths:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            name = extract_college_name(f.read())
+        if name:
+            add(name, source=os.path.basename(file_path))
+    for name, aliases in (alias_table if alias_table is not None else load_alias_table()).items():
+        add(name, aliases)
+    return entities
+
+
+def write_entity_index(entities, path=DEFAULT_ENTITY_INDEX_PATH):
+    """Writes build_entities() output as JSON (atomically, so readers never see a partial file)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"entities": entities}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    return len(entities)
+
+
+def load_entity_index(path=DEFAULT_ENTITY_INDEX_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return CollegeEntityIndex(json.load(f)["entities"])
+
+
+# --- Process-wide Index ---
+
+_default_index = None
+_default_index_key = None
+_default_index_lock = threading.Lock()
+
+
+def entity_resolution_enabled():
+    """INSIGHT_ENTITY_RESOLUTION=0 keys caches and queries by the college names exactly as written."""
+    return os.getenv("INSIGHT_ENTITY_RESOLUTION", "1").lower() not in ("0", "false", "no")
+
+
+def get_default_entity_index():
+    """The index at COLLEGE_ENTITY_INDEX_PATH, reloaded after ingestion rewrites it. Until ingestion
+    has built one, an index of the alias table alone is used."""
+    global _default_index, _default_index_key
+    path = os.getenv("COLLEGE_ENTITY_INDEX_PATH") or DEFAULT_ENTITY_INDEX_PATH
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        key = (None, None)
+    with _default_index_lock:
+        if _default_index is None or _default_index_key != key:
+            _default_index = load_entity_index(path) if key[0] else CollegeEntityIndex(build_entities([]))
+            _default_index_key = key
+        return _default_index
+
+
+def resolve_college_id(name):
+    """The canonical id of a college name or alias, or None if it is unknown (or resolution is off)."""
+    return get_default_entity_index().resolve(name) if entity_resolution_enabled() else None
+
+
+def college_id(name):
+    """Cache key for a college: its canonical id, or its normalized name if it cannot be resolved."""
+    return resolve_college_id(name) or normalize_college_name(name)
+
+
+def canonical_college_name(name):
+    """The canonical name of a college name or alias ("UCB" -> "University of California, Berkeley")."""
+    resolved = resolve_college_id(name)
+    return get_default_entity_index().name(resolved) if resolved else name
+
+
+def resolve_college_names(names):
+    """Canonical names for `names`, in order, with aliases of the same college merged. Names that a
+    college list split at a comma ("University of California", "Berkeley") are joined again when
+    only together they name a college."""
+    names, resolved, seen = list(names), [], set()
+    index = get_default_entity_index() if entity_resolution_enabled() else None
+    i = 0
+    while i < len(names):
+        name = names[i]
+        if index is not None and i + 1 < len(names) and not index.lookup(name):
+            joined = f"{name}, {names[i + 1]}"
+            if index.lookup(joined):
+                name = joined
+                i += 1
+        i += 1
+        key = college_id(name)
+        if key not in seen:
+            seen.add(key)
+            resolved.append(canonical_college_name(name))
+    return resolved
+
+
+def canonicalize_mentions(text, ids=False):
+    """Replaces the college mentions in free text with canonical names (or ids)."""
+    return get_default_entity_index().canonicalize(text, ids=ids) if entity_resolution_enabled() and text else text
+
+
+def get_entity_stats():
+    """Process-wide counts of resolutions by method (exact, mention, fuzzy), misses and prefetches
+    (completed, failed and cancelled)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+# --- Retrieval Prefetch ---
+
+def college_prefetch_enabled():
+    """INSIGHT_COLLEGE_PREFETCH=0 leaves all retrievals to RAGAgent."""
+    return os.getenv("INSIGHT_COLLEGE_PREFETCH", "1").lower() not in ("0", "false", "no")
+
+
+async def prefetch_college(tool, college):
+    """Runs the standard retrieval for `college` so that RAGAgent's identical request is a cache hit
+    (or joins the call in flight with INSIGHT_SINGLEFLIGHT=1)."""
+    try:
+        await tool.run_async(args={"query": PREFETCH_QUERY_TEMPLATE.format(college=college)}, tool_context=None)
+        _count("prefetched")
+    except Exception as e:
+        _count("prefetch_failed")
+        logger.warning("Retrieval prefetch for %s failed: %s", college, e)
+
+
+def install_college_prefetch(agent, rag_agent, tool_name="retrieve_rag_documentation"):
+    """Makes every run of `agent` (a coordinator) start background retrievals, through `rag_agent`'s
+    retrieval tool, for each college resolved in its request. Retrievals still running when the run
+    ends are cancelled."""
+    from .fanout import extract_college_names
+    from .runtime import content_text
+    from .tracing import chain_callbacks
+
+    tool = next((tool for tool in rag_agent.tools if getattr(tool, "name", None) == tool_name), None)
+    if tool is None:
+        return agent
+    in_flight = {}  # invocation_id -> prefetch tasks still running
+
+    def forget(invocation_id, tasks, task):
+        tasks.discard(task)
+        if not tasks and in_flight.get(invocation_id) is tasks:
+            del in_flight[invocation_id]
+
+    def before_agent(callback_context):
+        invocation_id = callback_context.invocation_id
+        for college in resolve_college_names(extract_college_names(content_text(callback_context.user_content))):
+            tasks = in_flight.setdefault(invocation_id, set())
+            task = asyncio.ensure_future(prefetch_college(tool, college))
+            tasks.add(task)
+            task.add_done_callback(lambda task, tasks=tasks: forget(invocation_id, tasks, task))
+        return None
+
+    def after_agent(callback_context):
+        for task in list(in_flight.pop(callback_context.invocation_id, ())):
+            if not task.done():
+                task.cancel()
+                _count("prefetch_cancelled")
+        return None
+
+    agent.before_agent_callback = chain_callbacks(agent.before_agent_callback, before_agent)
+    agent.after_agent_callback = chain_callbacks(agent.after_agent_callback, after_agent)
+    return agent
@@ -0,0 +1,297 @@
+# insight_agent/fanout.py
+
+import asyncio
+import re
+import time
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from .coordinator_output import (
+    extract_college_block,
+    fallback_college_block,
+    render_college_block,
+    render_coordinator_output,
+    render_output_footer,
+    render_output_header,
+)
+from .entities import entity_resolution_enabled, get_default_entity_index, resolve_college_names
+from .resilience import request_deadline_scope
+from .runtime import content_text, run_agent_to_text
+from .tracing import college_scope
+
+DEFAULT_MAX_CONCURRENT_COLLEGES = 4
+
+# Phrases that usually introduce the list of colleges in a free-text query,
+# e.g. "What are my chances of admission into Caltech, Stanford, and UC Berkeley?"
+_LIST_INTRO_PATTERN = re.compile(
+    r"\b(?:admission|admitted|accepted|getting|get|applying|apply)\s+(?:in)?to\s+(?P<list>[^?.!\n]+)"
+    r"|\b(?:chances|odds)\s+(?:at|for|of)\s+(?P<list2>[^?.!\n]+)"
+    r"|\bcolleges?\s*(?:list)?\s*:\s*(?P<list3>[^\n]+)",
+    re.IGNORECASE,
+)
+_INTO_PATTERN = re.compile(r"\b(?:into|to)\s+")
+# "&" only separates when it stands alone ("Stanford & MIT", not "Texas A&M").
+_LIST_SPLIT_PATTERN = re.compile(r"\s*(?:,|;|\band\b|\bor\b|(?<=\s)&(?=\s))\s*", re.IGNORECASE)
+_LEADING_WORDS_PATTERN = re.compile(r"^(?:(?:and|or|the colleges?|the)\s+)+", re.IGNORECASE)
+_BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(?P<name>.+?)\s*$", re.MULTILINE)
+_MAX_WORDS_PER_COLLEGE = 8
+
+_PROFILE_PATTERNS = [
+    ("Unweighted GPA", re.compile(r"(\d\.\d{1,2})\s+unweighted", re.IGNORECASE)),
+    ("Weighted GPA", re.compile(r"(\d\.\d{1,2})\s+weighted", re.IGNORECASE)),
+    ("GPA", re.compile(r"(\d\.\d{1,2})\s*(?:/\s*\d\.\d+)?\s+GPA|GPA\s*(?:of|:)?\s*(\d\.\d{1,2})", re.IGNORECASE)),
+    ("SAT Score", re.compile(r"(\d{3,4})\s+SAT|SAT\s*(?:score)?\s*(?:of|:)?\s*(\d{3,4})", re.IGNORECASE)),
+    ("ACT Score", re.compile(r"(\d{2})\s+ACT|ACT\s*(?:score)?\s*(?:of|:)?\s*(\d{2})", re.IGNORECASE)),
+]
+
+
+# --- Query Parsing Helpers ---
+
+def _clean_college_name(raw):
+    name = raw.strip().strip("\"'").rstrip(".?!").strip()
+    return _LEADING_WORDS_PATTERN.sub("", name)
+
+
+def _looks_like_college(name):
+    return bool(name) and name[0].isupper() and len(name.split()) <= _MAX_WORDS_PER_COLLEGE
+
+
+def _split_college_list(raw_list):
+    """Splits a college list at its separators, except inside a known college name ("University of
+    California, Berkeley", "Virginia Polytechnic Institute and State University")."""
+    names = []
+    if entity_resolution_enabled():
+        names = [(start, end) for start, end, _ in get_default_entity_index().find_mentions(raw_list)]
+    parts, start = [], 0
+    for match in _LIST_SPLIT_PATTERN.finditer(raw_list):
+        if not any(name_start < match.start() < name_end for name_start, name_end in names):
+            parts.append(raw_list[start:match.start()])
+            start = match.end()
+    return parts + [raw_list[start:]]
+
+
+def _locate_college_list(query):
+    """Returns (raw candidate names, (start, end) span of the list in `query`), or ([], None)."""
+    bullets = list(_BULLET_PATTERN.finditer(query))
+    if bullets:
+        return [match.group("name") for match in bullets], (bullets[0].start(), bullets[-1].end())
+    candidates, span = [], None
+    for match in _LIST_INTRO_PATTERN.finditer(query):
+        group = next(name for name in ("list", "list2", "list3") if match.group(name))
+        raw_list = match.group(group)
+        # "chances of admission into X, Y" -> keep only what follows the last "into"/"to".
+        last_part = _INTO_PATTERN.split(raw_list)[-1]
+        candidates = _split_college_list(last_part)
+        span = (match.end(group) - len(last_part), match.end(group))
+        # Keep the last matching phrase: the college list normally ends the question.
+    return candidates, span
+
+
+def extract_college_names(query):
+    """Pulls the list of target colleges out of a free-text user query.
+
+    Returns an empty list when the list cannot be identified with confidence, in which case
+    callers should fall back to the LLM coordinator. That includes lists with an entry that does
+    not look like a college name ("Stanford, MIT, or some state school"): dropping it would leave a
+    college unanalyzed without telling the user.
+    """
+    if not query:
+        return []
+
+    candidates, _ = _locate_college_list(query)
+    colleges = []
+    seen = set()
+    for raw in candidates:
+        name = _clean_college_name(raw)
+        if not name:
+            continue
+        if not _looks_like_college(name):
+            return []
+        key = name.lower()
+        if key not in seen:
+            seen.add(key)
+            colleges.append(name)
+    return colleges
+
+
+def restrict_query_to_colleges(query, colleges):
+    """Rewrites `query` so that its college list names only `colleges` (the rest of the text is kept)."""
+    candidates, span = _locate_college_list(query or "")
+    if span is None:
+        return f"{query}\n\nColleges to analyze: {', '.join(colleges)}"
+    start, end = span
+    if _BULLET_PATTERN.match(query, start):
+        college_list = "\n".join(f"- {college}" for college in colleges)
+    elif len(colleges) == 1:
+        college_list = colleges[0]
+    elif len(colleges) == 2:
+        college_list = f"{colleges[0]} and {colleges[1]}"
+    else:
+        college_list = ", ".join(colleges[:-1]) + f", and {colleges[-1]}"
+    return query[:start] + college_list + query[end:]
+
+
+def strip_college_list(query):
+    """`query` without its college list: the text that describes the student and the question."""
+    _, span = _locate_college_list(query or "")
+    return query if span is None else query[:span[0]] + query[span[1]:]
+
+
+def extract_profile(query):
+    """Returns the academic fields found in the query as numbers, keyed by summary label."""
+    profile = {}
+    for label, pattern in _PROFILE_PATTERNS:
+        match = pattern.search(query or "")
+        if match:
+            profile[label] = float(next(group for group in match.groups() if group))
+    return profile
+
+
+def summarize_profile(query):
+    """Builds a short USER_PROFILE_SUMMARY line from the academic fields found in the query."""
+    parts = []
+    for label, pattern in _PROFILE_PATTERNS:
+        match = pattern.search(query or "")
+        if not match:
+            continue
+        value = next(group for group in match.groups() if group)
+        if label == "GPA" and any(part.startswith(("Unweighted GPA", "Weighted GPA")) for part in parts):
+            continue
+        parts.append(f"{label}: {value}")
+    if not parts:
+        return "No GPA or standardized test scores were identified in the user's query."
+    return ". ".join(parts) + "."
+
+
+def build_college_request(query, college_name):
+    """Builds the request sent to the per-college analysis pipeline."""
+    return (
+        f"Student query (verbatim):\n{query}\n\n"
+        f"Analyze ONLY this college: {college_name}.\n"
+        "Return exactly one COLLEGE_ANALYSIS_BLOCK for it."
+    )
+
+
+# --- Parallel Coordinator Agent ---
+
+class ParallelCoordinatorAgent(BaseAgent):
+    """Coordinator that analyzes every college in the query as its own concurrent asyncio task.
+
+    Each task drives `college_agent` (an LLM agent with the RAG/Search/Coding specialists as tools)
+    through the single-college workflow. Results are merged into the standard
+    INTERNAL_COORDINATOR_OUTPUT block. If no college list can be extracted, the query is delegated
+    to `fallback_agent` (the sequential LLM coordinator).
+
+    With `request_deadline` (seconds), colleges still unfinished when it passes are cancelled and
+    reported with a fallback block, so the output holds partial results instead of stalling.
+    """
+
+    college_agent: BaseAgent
+    fallback_agent: BaseAgent
+    max_concurrency: int = DEFAULT_MAX_CONCURRENT_COLLEGES
+    request_deadline: Optional[float] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name, college_agent, fallback_agent, max_concurrency=DEFAULT_MAX_CONCURRENT_COLLEGES,
+                 request_deadline=None, description=""):
+        super().__init__(
+            name=name,
+            description=description,
+            college_agent=college_agent,
+            fallback_agent=fallback_agent,
+            max_concurrency=max(1, int(max_concurrency)),
+            request_deadline=request_deadline or None,
+            sub_agents=[fallback_agent],
+        )
+
+    async def _analyze_college(self, semaphore, query, college_name):
+        async with semaphore:
+            try:
+                response_text = await run_agent_to_text(self.college_agent, build_college_request(query, college_name))
+            except Exception as e:
+                return fallback_college_block(college_name, f"The analysis pipeline failed: {e}")
+        block = extract_college_block(response_text)
+        if block is None:
+            return fallback_college_block(college_name, "The analysis pipeline returned malformed output.")
+        return block
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        query = content_text(ctx.user_content)
+        # "Cal" and "UC Berkeley" are one college, analyzed once under its canonical name.
+        colleges = resolve_college_names(extract_college_names(query))
+        if not colleges:
+            async for event in self.fallback_agent.run_async(ctx):
+                yield event
+            return
+
+        profile_summary = summarize_profile(query)
+        overall_notes = f"Analyzed {len(colleges)} colleges: {', '.join(colleges)}."
+        # Partial events stream the output as colleges finish, so a streaming consumer such as the
+        # template presenter can render early. A block that finishes before an earlier college's is
+        # held back until that one is emitted, so the stream is in query order and ends with the
+        # footer, like the final event, which is the only one persisted to the session.
+        yield self._text_event(ctx, render_output_header(profile_summary, overall_notes), partial=True)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def analyze(position, college_name):
+            with college_scope(college_name):
+                return position, await self._analyze_college(semaphore, query, college_name)
+
+        # Tasks copy the context when they are created, so their sub-agent calls see the deadline too.
+        with request_deadline_scope(self.request_deadline) as deadline:
+            pending = {asyncio.ensure_future(analyze(i, name)): i for i, name in enumerate(colleges)}
+
+        college_blocks = [None] * len(colleges)
+        next_position = 0
+
+        def ready_blocks():
+            nonlocal next_position
+            while next_position < len(colleges) and college_blocks[next_position] is not None:
+                next_position += 1
+                yield college_blocks[next_position - 1]
+
+        while pending:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                del pending[task]
+                position, block = task.result()
+                college_blocks[position] = block
+            for block in ready_blocks():
+                yield self._text_event(ctx, render_college_block(block), partial=True)
+
+        if pending:
+            for task, position in pending.items():
+                task.cancel()
+                college_blocks[position] = fallback_college_block(
+                    colleges[position], "The analysis did not finish within the request deadline.")
+            for block in ready_blocks():
+                yield self._text_event(ctx, render_college_block(block), partial=True)
+            await asyncio.wait(pending, timeout=1.0)
+            overall_notes += (f" {len(pending)} of {len(colleges)} colleges did not finish within the request "
+                              "deadline; results for them are missing.")
+
+        output = render_coordinator_output(
+            profile_summary=profile_summary,
+            overall_notes=overall_notes,
+            college_blocks=college_blocks,
+        )
+        yield self._text_event(ctx, render_output_footer(), partial=True)
+        yield self._text_event(ctx, output)
+
+    def _text_event(self, ctx, text, partial=None):
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            partial=partial,
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]),
+        )
@@ -0,0 +1,363 @@
+# insight_agent/freshness.py
+#
+# Deterministic SearchAgent gating. Step B2 of the coordinator prompt leaves "is a web search
+# needed?" to the model, which in practice searches for nearly every selective college. Here the
+# decision is made from recorded metadata instead: the data year of the college's CDS/IPEDS data
+# (from retrieved chunks and the stats table), when a search last verified the college, and whether
+# the college is volatile (a recent search found changes, or it is listed in INSIGHT_VOLATILE_COLLEGES).
+# Search results update the table, so a recent verification is reused instead of searching again.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from google.adk.tools import ToolContext
+
+from .college_stats import extract_college_stats, get_default_stats_index, normalize_college_name
+from .entities import canonicalize_mentions, college_id
+from .paths import index_path
+
+DEFAULT_FRESHNESS_DB_PATH = index_path("freshness.sqlite3")
+
+DAY_SECONDS = 24 * 60 * 60
+# A verification is reused for this long (shorter for volatile colleges and explicit recency requests).
+DEFAULT_VERIFICATION_TTL_DAYS = 30
+DEFAULT_VOLATILE_TTL_DAYS = 7
+DEFAULT_RECENT_REQUEST_TTL_DAYS = 1
+# Data for admission cycles older than this many years before the current one is stale.
+DEFAULT_MAX_DATA_AGE_YEARS = 1
+# A college whose last search found changes stays volatile for this long.
+DEFAULT_VOLATILITY_WINDOW_DAYS = 180
+# Reused search summaries are cut to this length.
+MAX_SUMMARY_CHARS = 1000
+
+SEARCH = "search"
+SKIP = "skip"
+
+# State key holding the last gating decision of the session, read by the SearchAgent callbacks.
+SEARCH_DECISION_KEY = "insight_search_decision"
+
+_NO_CHANGE_PATTERN = re.compile(
+    r"\bno\s+(?:major\s+|relevant\s+|significant\s+|new\s+)?(?:recent\s+)?(?:admissions?\s+)?(?:policy\s+)?"
+    r"(?:changes?|updates?|information|news|info)\b", re.IGNORECASE)
+# Explicit signals that a college's admission policy or figures changed. An ordinary factual answer
+# ("Stanford's acceptance rate is 3.9%") matches none of them and is not a change.
+_CHANGE_PATTERN = re.compile(
+    r"\bnew\s+(?:\w+\s+){0,2}polic(?:y|ies)\b"
+    r"|\bpolicy\s+(?:change|shift|update)[sd]?\b"
+    r"|\b(?:now|no\s+longer)\s+(?:be\s+)?(?:requires?|required|accepts?|considers?|superscores?|test[- ](?:optional|blind|required))\b"
+    r"|\bwill\s+(?:be\s+|become\s+)?test[- ](?:optional|blind|required)\b"
+    r"|\b(?:became|become|becomes|went|switch(?:ed|es)?\s+to|move[ds]?\s+to|return(?:ed|s)?\s+to)\s+(?:being\s+)?test[- ](?:optional|blind|required)\b"
+    r"|\b(?:reinstat|announc|adopt|introduc|eliminat|discontinu|suspend)(?:ed|es|ing|e)?\b"
+    r"|\b(?:ended|dropped|removed|scrapped)\s+(?:its\s+|the\s+)?(?:\w+[- ]){0,2}(?:polic(?:y|ies)|requirements?|admissions?|option|test[- ]optional)\b"
+    r"|\b(?:effective|starting|beginning)\s+(?:with\s+|in\s+|for\s+)?(?:the\s+)?(?:fall|class\s+of|\d{4}(?:[-–]\d{2,4})?\s+(?:admissions?\s+)?cycle)\b",
+    re.IGNORECASE)
+_FAILED_PATTERN = re.compile(r"\bsearch failed\b", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS college_freshness (
+    college_id TEXT PRIMARY KEY,
+    college_name TEXT NOT NULL,
+    data_year INTEGER,
+    data_seen_at REAL,
+    verified_at REAL,
+    verification_outcome TEXT,
+    verification_summary TEXT,
+    volatile_until REAL
+);
+"""
+
+
+def admission_cycle(now):
+    """Start year of the admission cycle in progress at `now` (cycles start in August)."""
+    local = time.localtime(now)
+    return local.tm_year if local.tm_mon >= 8 else local.tm_year - 1
+
+
+def _env_list(name):
+    return [item.strip() for item in os.getenv(name, "").split(";") if item.strip()]
+
+
+# --- Store ---
+
+class FreshnessStore:
+    """sqlite table of per-college recency metadata: newest data year seen, last search verification
+    (time, outcome, summary) and volatility. Rows are keyed by entities.college_id, so "MIT" and
+    "Massachusetts Institute of Technology" share one. Without a `db_path` the table is in-memory."""
+
+    def __init__(self, db_path=None, clock=time.time):
+        self.db_path = db_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, college_name):
+        """Returns the college's row as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM college_freshness WHERE college_id = ?",
+                                     (college_id(college_name),)).fetchone()
+        return dict(row) if row else None
+
+    def record_data_year(self, college_name, data_year):
+        """Notes that data for `data_year` was seen for the college; the newest year is kept."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO college_freshness (college_id, college_name, data_year, data_seen_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(college_id) DO UPDATE SET data_year = MAX(COALESCE(data_year, 0), excluded.data_year), "
+                "data_seen_at = excluded.data_seen_at",
+                (college_id(college_name), college_name, int(data_year), self._clock()),
+            )
+            self._conn.commit()
+
+    def record_verification(self, college_name, outcome, summary="", volatility_window_days=DEFAULT_VOLATILITY_WINDOW_DAYS):
+        """Records a search verification. An outcome of "changed" marks the college volatile for a while."""
+        now = self._clock()
+        volatile_until = now + volatility_window_days * DAY_SECONDS if outcome == "changed" else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO college_freshness (college_id, college_name, verified_at, verification_outcome, "
+                "verification_summary, volatile_until) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(college_id) DO UPDATE SET verified_at = excluded.verified_at, "
+                "verification_outcome = excluded.verification_outcome, "
+                "verification_summary = excluded.verification_summary, "
+                "volatile_until = COALESCE(excluded.volatile_until, volatile_until)",
+                (college_id(college_name), college_name, now, outcome,
+                 (summary or "")[:MAX_SUMMARY_CHARS], volatile_until),
+            )
+            self._conn.commit()
+
+    def invalidate_verifications(self, college_name=None):
+        """Forgets search verifications (for one college or all), forcing the next check to search."""
+        with self._lock:
+            if college_name is None:
+                cursor = self._conn.execute("UPDATE college_freshness SET verified_at = NULL")
+            else:
+                cursor = self._conn.execute("UPDATE college_freshness SET verified_at = NULL WHERE college_id = ?",
+                                            (college_id(college_name),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# --- Policy ---
+
+class SearchPolicy:
+    """Decides whether a SearchAgent call is needed for a college, from the FreshnessStore.
+
+    A search is needed when the student asked for recent information, key statistics are missing,
+    the newest data is stale (or its year unknown), or the college is volatile - unless a search
+    verified the college recently enough for that reason, in which case the verification is reused.
+    """
+
+    def __init__(self, store, verification_ttl_days=DEFAULT_VERIFICATION_TTL_DAYS,
+                 volatile_ttl_days=DEFAULT_VOLATILE_TTL_DAYS, recent_request_ttl_days=DEFAULT_RECENT_REQUEST_TTL_DAYS,
+                 max_data_age_years=DEFAULT_MAX_DATA_AGE_YEARS, volatile_colleges=(), clock=time.time):
+        self.store = store
+        self.verification_ttl = verification_ttl_days * DAY_SECONDS
+        self.volatile_ttl = volatile_ttl_days * DAY_SECONDS
+        self.recent_request_ttl = recent_request_ttl_days * DAY_SECONDS
+        self.max_data_age_years = max_data_age_years
+        self.volatile_colleges = {college_id(name) for name in volatile_colleges}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "searches": 0, "skips": 0, "reused_verifications": 0}
+
+    def decide(self, college_name, user_requested_recent=False, key_data_missing=False, rag_data_year=None):
+        now = self._clock()
+        row = self.store.get(college_name) or {}
+        stats = None
+        index = get_default_stats_index()
+        if index is not None:
+            stats = index.lookup(college_name)
+        years = [year for year in (row.get("data_year"), (stats or {}).get("data_year"), rag_data_year) if year]
+        data_year = max(years) if years else None
+        oldest_current_year = admission_cycle(now) - 1 - self.max_data_age_years
+
+        volatile = (college_id(college_name) in self.volatile_colleges
+                    or (row.get("volatile_until") or 0) > now)
+        verified_at = row.get("verified_at")
+        verification_age = now - verified_at if verified_at else None
+
+        # (reason, how recent a verification must be to stand in for a search), strictest first.
+        reasons = []
+        if user_requested_recent:
+            reasons.append(("the student asked for recent information", self.recent_request_ttl))
+        if volatile:
+            reasons.append(("the college is volatile (recent policy changes)", self.volatile_ttl))
+        if key_data_missing:
+            reasons.append(("key statistics are missing from the RAG data", self.verification_ttl))
+        if data_year is None:
+            reasons.append(("the data year of the RAG data is unknown", self.verification_ttl))
+        elif data_year < oldest_current_year:
+            reasons.append((f"the newest data is from {data_year}-{data_year + 1}, older than the "
+                            f"{oldest_current_year}-{oldest_current_year + 1} cycle", self.verification_ttl))
+
+        decision = {"college_name": college_name, "data_year": data_year, "volatile": volatile,
+                    "last_verified_days_ago": round(verification_age / DAY_SECONDS, 1) if verification_age is not None else None}
+        required_age = min((ttl for _, ttl in reasons), default=None)
+        if not reasons:
+            decision.update(decision=SKIP, reason=f"The data is current (data year {data_year}) and the college is not volatile.")
+        elif verification_age is not None and verification_age <= required_age and row.get("verification_outcome") != "failed":
+            decision.update(
+                decision=SKIP,
+                reason=f"A search {decision['last_verified_days_ago']} days ago verified the college recently enough "
+                       f"(needed because {reasons[0][0]}); its findings are reused.",
+                reused_verification=row.get("verification_summary") or "",
+            )
+        else:
+            decision.update(decision=SEARCH, reason="Search needed because " + "; ".join(r for r, _ in reasons) + ".")
+
+        with self._lock:
+            self._counters["checks"] += 1
+            self._counters["searches" if decision["decision"] == SEARCH else "skips"] += 1
+            self._counters["reused_verifications"] += "reused_verification" in decision
+        return decision
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+# --- Recording From Agent Traffic ---
+
+def record_chunk_years(texts, store=None):
+    """Records the data year of every retrieved chunk that names its college (CDS/IPEDS headers)."""
+    store = store or get_default_freshness_store()
+    for text in texts if isinstance(texts, list) else ():
+        if not isinstance(text, str):
+            continue
+        name, values = extract_college_stats(text)
+        if name and values.get("data_year"):
+            store.record_data_year(name, values["data_year"])
+
+
+def verification_outcome(summary):
+    """Classifies a SearchAgent answer as "failed", "changed" (an explicit change signal such as "new
+    policy", "now requires" or "reinstated"), "no_change" (it says there are no changes) or "unknown".
+    Only "changed" makes the college volatile; "unknown" verifications are reused like "no_change"."""
+    if _FAILED_PATTERN.search(summary):
+        return "failed"
+    # "No policy changes" is not a change signal: no-change phrases are removed before looking for one.
+    if _CHANGE_PATTERN.search(_NO_CHANGE_PATTERN.sub(" ", summary)):
+        return "changed"
+    return "no_change" if _NO_CHANGE_PATTERN.search(summary) else "unknown"
+
+
+def check_search_freshness(college_name: str, user_requested_recent: bool, key_data_missing: bool,
+                           rag_data_year: int, tool_context: ToolContext) -> dict:
+    """Decides deterministically whether SearchAgent must be called for a college (Step B).
+
+    Uses the recorded data year of the college's CDS/IPEDS data, when a search last verified the
+    college and whether it is volatile. Returns {"decision": "search" | "skip", "reason", ...};
+    when a recent verification is reused, "reused_verification" holds its findings.
+
+    Args:
+        college_name: The full name of the college.
+        user_requested_recent: True if the student explicitly asked for very recent information or news.
+        key_data_missing: True if RAGAgent did not return key data (acceptance rate, test score or GPA ranges).
+        rag_data_year: Start year of the admission cycle of the RAG data (2023 for "2023-2024"); 0 if unknown.
+    """
+    decision = get_default_search_policy().decide(college_name, user_requested_recent=user_requested_recent,
+                                                  key_data_missing=key_data_missing, rag_data_year=rag_data_year or None)
+    tool_context.state[SEARCH_DECISION_KEY] = {"college_name": college_name, "decision": decision["decision"],
+                                               "reason": decision["reason"],
+                                               "reused_verification": decision.get("reused_verification")}
+    return {"status": "success", **decision}
+
+
+def _decision_for_call(tool, args, tool_context):
+    """The session's last gating decision, if this is a SearchAgent call about the same college."""
+    if tool.name != "SearchAgent":
+        return None
+    decision = tool_context.state.get(SEARCH_DECISION_KEY)
+    if not decision or college_id(decision["college_name"]) not in \
+            normalize_college_name(canonicalize_mentions(str(args), ids=True)):
+        return None
+    return decision
+
+
+def gate_search_calls(tool, args, tool_context):
+    """before_tool_callback: answers a SearchAgent call from the table when the last check said "skip"."""
+    decision = _decision_for_call(tool, args, tool_context)
+    if not decision or decision["decision"] != SKIP:
+        return None
+    tool_context.state[SEARCH_DECISION_KEY] = None
+    result = {"status": "skipped", "agent": tool.name, "college_name": decision["college_name"],
+              "message": f"Search not needed for {decision['college_name']}: {decision['reason']}"}
+    if decision.get("reused_verification"):
+        result["reused_verification"] = decision["reused_verification"]
+    return result
+
+
+def record_search_results(tool, args, tool_context, tool_response):
+    """after_tool_callback: stores a completed SearchAgent call as the college's latest verification."""
+    decision = _decision_for_call(tool, args, tool_context)
+    if not decision or decision["decision"] != SEARCH:
+        return None
+    if isinstance(tool_response, dict) and tool_response.get("status") in ("timed_out", "deadline_exceeded", "failed", "skipped"):
+        return None
+    summary = tool_response if isinstance(tool_response, str) else str(tool_response.get("result", tool_response))
+    get_default_freshness_store().record_verification(decision["college_name"], verification_outcome(summary), summary)
+    tool_context.state[SEARCH_DECISION_KEY] = None
+    return None
+
+
+def install_search_gating(agent):
+    """Adds the freshness check tool and the SearchAgent gating/recording callbacks to a coordinator."""
+    from .tracing import chain_callbacks
+
+    agent.tools = list(agent.tools) + [check_search_freshness]
+    agent.before_tool_callback = chain_callbacks(agent.before_tool_callback, gate_search_calls)
+    agent.after_tool_callback = chain_callbacks(agent.after_tool_callback, record_search_results)
+    return agent
+
+
+# --- Process-wide Defaults ---
+
+_default_store = None
+_default_policy = None
+_default_lock = threading.Lock()
+
+
+def search_gating_enabled():
+    """INSIGHT_SEARCH_GATING=0 leaves the SearchAgent decision to the model (prompt Step B2)."""
+    return os.getenv("INSIGHT_SEARCH_GATING", "1").lower() not in ("0", "false", "no")
+
+
+def get_default_freshness_store():
+    """The process-wide freshness table at FRESHNESS_DB_PATH (default .insight_index/freshness.sqlite3;
+    an empty value keeps it in memory)."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = FreshnessStore(db_path=os.getenv("FRESHNESS_DB_PATH", DEFAULT_FRESHNESS_DB_PATH) or None)
+        return _default_store
+
+
+def get_default_search_policy():
+    """The process-wide SearchPolicy, configured from SEARCH_VERIFICATION_TTL_DAYS, SEARCH_VOLATILE_TTL_DAYS,
+    FRESHNESS_MAX_DATA_AGE_YEARS and INSIGHT_VOLATILE_COLLEGES (";"-separated names)."""
+    global _default_policy
+    store = get_default_freshness_store()
+    with _default_lock:
+        if _default_policy is None:
+            _default_policy = SearchPolicy(
+                store,
+                verification_ttl_days=float(os.getenv("SEARCH_VERIFICATION_TTL_DAYS", DEFAULT_VERIFICATION_TTL_DAYS)),
+                volatile_ttl_days=float(os.getenv("SEARCH_VOLATILE_TTL_DAYS", DEFAULT_VOLATILE_TTL_DAYS)),
+                max_data_age_years=int(os.getenv("FRESHNESS_MAX_DATA_AGE_YEARS", DEFAULT_MAX_DATA_AGE_YEARS)),
+                volatile_colleges=_env_list("INSIGHT_VOLATILE_COLLEGES"),
+            )
+        return _default_policy
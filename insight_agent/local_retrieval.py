@@ -0,0 +1,238 @@
+# insight_agent/local_retrieval.py
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from .paths import DATA_DIR, index_path
+from .preprocess import MinHashDeduper, iter_unique_chunks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_INDEX_DIR = index_path("local_rag")
+DEFAULT_EMBEDDING_DIM = 512
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_META_FILE = "meta.json"
+_VECTORS_FILE = "vectors.f32"
+_TEXTS_FILE = "texts.bin"
+_OFFSETS_FILE = "offsets.u64"
+
+
+# --- Embedders ---
+
+class HashingEmbedder:
+    """CPU-only embedder using the hashing trick over word unigrams and bigrams.
+
+    No model download and fully deterministic, which makes it suitable for dev, edge deployments
+    and reproducible benchmarks. Any object with `name`, `dim` and `embed(texts) -> (n, dim) array`
+    can be used instead.
+    """
+
+    def __init__(self, dim=DEFAULT_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                # Low bits pick the bucket, one high bit picks the sign (reduces collision bias).
+                vectors[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        # Sublinear term frequency, so repeated boilerplate words don't dominate.
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class LlamaIndexEmbedderAdapter:
+    """Adapts a llama-index BaseEmbedding (e.g. a local HuggingFace model) to the embedder interface."""
+
+    def __init__(self, embed_model):
+        self.embed_model = embed_model
+        self.name = f"llama-index:{getattr(embed_model, 'model_name', type(embed_model).__name__)}"
+        self.dim = len(embed_model.get_text_embedding("dimension probe"))
+
+    def embed(self, texts):
+        vectors = np.asarray(self.embed_model.get_text_embedding_batch(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def load_embedder(spec=None):
+    """Builds the embedder named by LOCAL_RAG_EMBEDDER: "hashing" (default) or "package.module:factory".
+
+    The factory is called without arguments; llama-index embedding models are wrapped automatically.
+    """
+    spec = spec or os.getenv("LOCAL_RAG_EMBEDDER", "hashing")
+    if spec == "hashing":
+        return HashingEmbedder()
+    module_name, _, attribute = spec.partition(":")
+    embedder = getattr(importlib.import_module(module_name), attribute)()
+    if not hasattr(embedder, "embed") and hasattr(embedder, "get_text_embedding_batch"):
+        embedder = LlamaIndexEmbedderAdapter(embedder)
+    return embedder
+
+
+# --- Index Build ---
+
+def _iter_source_files(data_dir):
+    for dir_path, dir_names, file_names in os.walk(data_dir):
+        dir_names[:] = sorted(d for d in dir_names if not d.startswith("."))
+        for name in sorted(file_names):
+            if not name.startswith("."):
+                yield os.path.join(dir_path, name)
+
+
+def data_fingerprint(data_dir):
+    """Cheap fingerprint of the source tree (paths, sizes, mtimes) used to detect a stale index."""
+    digest = hashlib.sha256()
+    for file_path in _iter_source_files(data_dir):
+        stat = os.stat(file_path)
+        digest.update(f"{os.path.relpath(file_path, data_dir)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_local_index(data_dir=DATA_DIR, index_dir=DEFAULT_LOCAL_INDEX_DIR, embedder=None, batch_size=256):
+    """Chunks and embeds every file under data_dir and persists the index as flat, mmap-able arrays.
+
+    Vectors are written batch by batch, so memory use is bounded by `batch_size` chunks.
+    Returns the number of indexed chunks.
+    """
+    embedder = embedder or load_embedder()
+    os.makedirs(index_dir, exist_ok=True)
+    fingerprint = data_fingerprint(data_dir)
+    deduper = MinHashDeduper()
+    count = 0
+    text_offset = 0
+    sources = []
+
+    def flush(batch, vectors_file, texts_file, offsets_file):
+        nonlocal count, text_offset
+        vectors_file.write(np.ascontiguousarray(embedder.embed([c.text for c in batch]), dtype=np.float32).tobytes())
+        for chunk in batch:
+            encoded = json.dumps({"source": chunk.source, "section": chunk.section, "text": chunk.text}).encode("utf-8")
+            offsets_file.write(np.uint64(text_offset).tobytes())
+            texts_file.write(encoded)
+            text_offset += len(encoded)
+        count += len(batch)
+
+    paths = {name: os.path.join(index_dir, name + ".tmp") for name in (_VECTORS_FILE, _TEXTS_FILE, _OFFSETS_FILE)}
+    with open(paths[_VECTORS_FILE], "wb") as vectors_file, open(paths[_TEXTS_FILE], "wb") as texts_file, \
+            open(paths[_OFFSETS_FILE], "wb") as offsets_file:
+        batch = []
+        for file_path in _iter_source_files(data_dir):
+            source = os.path.relpath(file_path, data_dir)
+            sources.append(source)
+            for chunk in iter_unique_chunks(file_path, deduper, source=source):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    flush(batch, vectors_file, texts_file, offsets_file)
+                    batch = []
+        if batch:
+            flush(batch, vectors_file, texts_file, offsets_file)
+        offsets_file.write(np.uint64(text_offset).tobytes())
+
+    for name, tmp_path in paths.items():
+        os.replace(tmp_path, os.path.join(index_dir, name))
+    meta = {"embedder": embedder.name, "dim": embedder.dim, "count": count,
+            "data_fingerprint": fingerprint, "sources": sources}
+    with open(os.path.join(index_dir, _META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return count
+
+
+# --- Query ---
+
+class LocalVectorIndex:
+    """Memory-mapped vector index answering top-k cosine similarity queries in-process."""
+
+    def __init__(self, index_dir=DEFAULT_LOCAL_INDEX_DIR, embedder=None):
+        with open(os.path.join(index_dir, _META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.index_dir = index_dir
+        self.embedder = embedder or load_embedder()
+        if self.embedder.name != self.meta["embedder"]:
+            raise ValueError(f"Index was built with embedder '{self.meta['embedder']}', not '{self.embedder.name}'.")
+        count, dim = self.meta["count"], self.meta["dim"]
+        self._vectors = (np.memmap(os.path.join(index_dir, _VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+                         if count else np.zeros((0, dim), dtype=np.float32))
+        self._offsets = np.memmap(os.path.join(index_dir, _OFFSETS_FILE), dtype=np.uint64, mode="r")
+        self._texts = np.memmap(os.path.join(index_dir, _TEXTS_FILE), dtype=np.uint8, mode="r") \
+            if self._offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    @property
+    def fingerprint(self):
+        return self.meta["data_fingerprint"]
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def chunk(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._texts[start:end].tobytes())
+
+    def query(self, text, top_k=5):
+        """Returns up to top_k chunk dicts (source, section, text, score), best first."""
+        if not len(self):
+            return []
+        query_vector = self.embedder.embed([text])[0]
+        scores = self._vectors @ query_vector
+        top_k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [dict(self.chunk(row), score=float(scores[row])) for row in ranked]
+
+
+# How often (seconds) get_local_index() re-walks the data directory to detect changes.
+FINGERPRINT_CHECK_INTERVAL = 30.0
+
+_default_index = None
+_default_index_checked_at = 0.0
+_default_index_lock = threading.Lock()
+
+
+def get_local_index(data_dir=DATA_DIR, index_dir=None):
+    """Opens the persisted local index, (re)building it first if it is missing or the data changed.
+
+    Blocking (it walks the data directory and may embed the whole corpus); async callers run it in a
+    worker thread.
+    """
+    global _default_index, _default_index_checked_at
+    index_dir = index_dir or os.getenv("LOCAL_RAG_INDEX_DIR") or DEFAULT_LOCAL_INDEX_DIR
+    with _default_index_lock:
+        now = time.monotonic()
+        if (_default_index is not None and _default_index.index_dir == index_dir
+                and now - _default_index_checked_at < FINGERPRINT_CHECK_INTERVAL):
+            return _default_index
+        _default_index_checked_at = now
+        fingerprint = data_fingerprint(data_dir)
+        if _default_index is not None and _default_index.index_dir == index_dir and _default_index.fingerprint == fingerprint:
+            return _default_index
+        embedder = load_embedder()
+        try:
+            index = LocalVectorIndex(index_dir, embedder)
+            if index.fingerprint != fingerprint:
+                index = None
+        except (FileNotFoundError, ValueError):
+            index = None
+        if index is None:
+            count = build_local_index(data_dir, index_dir, embedder)
+            logger.info("Built local retrieval index with %d chunks in '%s'.", count, index_dir)
+            index = LocalVectorIndex(index_dir, embedder)
+        _default_index = index
+        return index
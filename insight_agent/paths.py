@@ -0,0 +1,14 @@
+# insight_agent/paths.py
+
+import os
+
+# Project layout: <project_root>/insight_agent/paths.py, <project_root>/data/
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.getenv("INSIGHT_DATA_DIR") or os.path.join(PROJECT_ROOT_DIR, 'data')
+# Local artifacts derived from the corpus at ingestion time (indexes, manifests, caches).
+INDEX_DIR = os.getenv("INSIGHT_INDEX_DIR") or os.path.join(PROJECT_ROOT_DIR, '.insight_index')
+
+
+def index_path(filename):
+    """Returns the path of a derived artifact inside INDEX_DIR."""
+    return os.path.join(INDEX_DIR, filename)
@@ -0,0 +1,244 @@
+# insight_agent/preprocess.py
+
+import collections
+import hashlib
+import mmap
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+DEFAULT_MAX_CHUNK_CHARS = 2000
+DEFAULT_NUM_PERMUTATIONS = 64
+DEFAULT_LSH_BANDS = 16
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+DEFAULT_SHINGLE_WORDS = 5
+
+# CDS documents are organized in lettered sections ("Section C: First-Time, First-Year Admission").
+_SECTION_HEADER_PATTERN = re.compile(r"^Section\s+([A-J])\b\s*[:.\-]?\s*(.*)$", re.IGNORECASE)
+# Lines that identify the document; they are repeated at the top of every chunk for context.
+_TITLE_PATTERN = re.compile(r"^(?:College Name\s*:|IPEDS Data for|Common Data Set)", re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Universal hashing modulo a prime just above 2**32. Multipliers stay below 2**31 so that
+# a * h + b never overflows uint64 for 32-bit shingle hashes.
+_MINHASH_PRIME = np.uint64(4294967311)
+
+Chunk = collections.namedtuple("Chunk", ["source", "section", "index", "text"])
+
+
+# --- Streaming Reader ---
+
+def iter_lines(file_path):
+    """Yields decoded lines from a file through mmap, without reading the whole file into memory."""
+    if os.path.getsize(file_path) == 0:
+        return
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for raw_line in iter(mm.readline, b""):
+            yield raw_line.decode("utf-8", errors="replace")
+
+
+def normalize_line(line):
+    """NFKC-normalizes a line and collapses whitespace (also turns non-breaking spaces etc. into spaces)."""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", line)).strip()
+
+
+# --- Section-Aware Chunking ---
+
+def iter_chunks(lines, source, max_chars=DEFAULT_MAX_CHUNK_CHARS):
+    """Groups normalized lines into chunks that never span a CDS section boundary.
+
+    Document title lines (college name, data set year) are prepended to every chunk so each chunk
+    stays attributable to its college after retrieval.
+    """
+    title_lines = []
+    section = ""
+    buffer = []
+    buffer_chars = 0
+    index = 0
+
+    def flush():
+        nonlocal buffer, buffer_chars, index
+        if not buffer:
+            return None
+        chunk = Chunk(source, section, index, "\n".join(title_lines + buffer))
+        buffer, buffer_chars = [], 0
+        index += 1
+        return chunk
+
+    for raw_line in lines:
+        line = normalize_line(raw_line)
+        if not line:
+            continue
+        if not buffer and index == 0 and _TITLE_PATTERN.match(line) and len(title_lines) < 3:
+            title_lines.append(line)
+            continue
+        header = _SECTION_HEADER_PATTERN.match(line)
+        if header or buffer_chars + len(line) > max_chars:
+            chunk = flush()
+            if chunk:
+                yield chunk
+            if header:
+                section = f"Section {header.group(1).upper()}"
+        buffer.append(line)
+        buffer_chars += len(line) + 1
+
+    chunk = flush()
+    if chunk:
+        yield chunk
+    elif title_lines and index == 0:
+        # A document made only of title lines is still worth keeping.
+        yield Chunk(source, section, 0, "\n".join(title_lines))
+
+
+# --- Near-Duplicate Detection ---
+
+def chunk_body(text):
+    """The chunk text without the document title lines iter_chunks repeats at its top (a chunk made
+    only of title lines is its own body)."""
+    lines = text.split("\n")
+    start = 0
+    while start < len(lines) and start < 3 and _TITLE_PATTERN.match(lines[start]):
+        start += 1
+    return "\n".join(lines[start:]) if start < len(lines) else text
+
+
+def near_duplicate_key(text):
+    """Pre-key that near-duplicates must share: the chunk body's first line, its section header
+    lines, and its numbers, in order. Two years of the same CDS section differ mostly in their
+    figures and must never be collapsed into one. `text` is a chunk body (see chunk_body)."""
+    lines = text.split("\n")
+    headers = [lines[0]] + [line for line in lines[1:] if _SECTION_HEADER_PATTERN.match(line)]
+    key = "\n".join(" ".join(_WORD_PATTERN.findall(line.lower())) for line in headers)
+    key += "\0" + " ".join(_NUMBER_PATTERN.findall(text))
+    return hashlib.sha1(key.encode("utf-8")).digest()
+
+
+class MinHashDeduper:
+    """MinHash + LSH index that flags chunks whose word shingles nearly match an earlier chunk.
+
+    Chunks are compared by their body: the title lines repeated at the top of every chunk identify
+    the document, not its content, so they are left out of the key and the signature. Only chunks
+    with the same near_duplicate_key are compared, so near-duplicate removal is limited to text that
+    differs in wording or formatting, never in its figures or section. Memory grows with the number
+    of *unique* chunks kept (one small signature and its source each), not with the size of the
+    input corpus.
+    """
+
+    def __init__(self, num_permutations=DEFAULT_NUM_PERMUTATIONS, bands=DEFAULT_LSH_BANDS,
+                 threshold=DEFAULT_SIMILARITY_THRESHOLD, shingle_words=DEFAULT_SHINGLE_WORDS, seed=1):
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=num_permutations, dtype=np.uint64)
+        self.bands = bands
+        self.rows_per_band = num_permutations // bands
+        self.threshold = threshold
+        self.shingle_words = shingle_words
+        self._buckets = {}  # (pre-key, band, band_hash) -> [(signature, source), ...]
+        self._exact = {}  # sha1 of the body -> source
+        self._lock = threading.Lock()
+        self.seen = 0
+        self.duplicates = 0
+
+    def signature(self, text):
+        words = _WORD_PATTERN.findall(text.lower())
+        width = min(self.shingle_words, max(1, len(words)))
+        shingles = {" ".join(words[i:i + width]) for i in range(max(1, len(words) - width + 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        )
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+    def is_duplicate(self, text, source=""):
+        """Returns True if `text` nearly duplicates an indexed chunk; otherwise indexes it and returns False."""
+        return self.duplicate_source(text, source) is not None
+
+    def duplicate_source(self, text, source=""):
+        """Returns the source of the indexed chunk that `text` nearly duplicates, or None after
+        indexing `text` under `source`."""
+        body = chunk_body(text)
+        exact_key = hashlib.sha1(body.encode("utf-8")).digest()
+        pre_key = near_duplicate_key(body)
+        signature = self.signature(body)
+        band_keys = [
+            (pre_key, band, signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+            for band in range(self.bands)
+        ]
+        with self._lock:
+            self.seen += 1
+            match = self._exact.get(exact_key)
+            if match is None:
+                match = self._similar_source(band_keys, signature)
+            if match is not None:
+                self.duplicates += 1
+                return match
+            self._exact[exact_key] = source
+            for key in band_keys:
+                self._buckets.setdefault(key, []).append((signature, source))
+            return None
+
+    def _similar_source(self, band_keys, signature):
+        for key in band_keys:
+            for candidate, source in self._buckets.get(key, ()):
+                if np.mean(candidate == signature) >= self.threshold:
+                    return source
+        return None
+
+
+# --- Pipeline ---
+
+def iter_unique_chunks(file_path, deduper, source=None, max_chars=DEFAULT_MAX_CHUNK_CHARS, duplicate_of=None):
+    """Streams the chunks of one file, skipping near-duplicates of anything seen before.
+
+    If given, the set `duplicate_of` collects the sources of the chunks that skipped ones matched.
+    """
+    source = source or file_path
+    for chunk in iter_chunks(iter_lines(file_path), source, max_chars=max_chars):
+        match = deduper.duplicate_source(chunk.text, source)
+        if match is None:
+            yield chunk
+        elif duplicate_of is not None:
+            duplicate_of.add(match)
+
+
+def stage_preprocessed_file(file_path, staging_dir, deduper, source=None, max_chars=DEFAULT_MAX_CHUNK_CHARS):
+    """Writes the unique chunks of `file_path` to a staging file, chunk by chunk.
+
+    Returns (staged_path, stats), or (None, stats) when every chunk was a duplicate.
+    `stats["duplicate_of"]` lists the other sources that dropped chunks duplicate: the staged file
+    relies on them for that content.
+    """
+    source = source or file_path
+    os.makedirs(staging_dir, exist_ok=True)
+    staged_path = os.path.join(staging_dir, hashlib.sha1(source.encode("utf-8")).hexdigest() + ".txt")
+    stats = {"bytes_in": os.path.getsize(file_path), "bytes_out": 0, "chunks_kept": 0}
+    duplicate_of = set()
+    duplicates_before = deduper.duplicates
+    with open(staged_path, "w", encoding="utf-8") as out:
+        for chunk in iter_unique_chunks(file_path, deduper, source=source, max_chars=max_chars, duplicate_of=duplicate_of):
+            text = chunk.text + "\n\n"
+            out.write(text)
+            stats["bytes_out"] += len(text.encode("utf-8"))
+            stats["chunks_kept"] += 1
+    # Approximate under concurrency: other files may be deduplicated at the same time.
+    stats["chunks_dropped"] = deduper.duplicates - duplicates_before
+    stats["duplicate_of"] = sorted(duplicate_of - {source})
+    if stats["chunks_kept"] == 0:
+        os.remove(staged_path)
+        return None, stats
+    return staged_path, stats
+
+
+def iter_staged_files(file_paths, staging_dir, deduper=None, max_chars=DEFAULT_MAX_CHUNK_CHARS):
+    """Generator stage between file discovery and upload: yields (source_path, staged_path, stats)."""
+    deduper = deduper or MinHashDeduper()
+    for file_path in file_paths:
+        staged_path, stats = stage_preprocessed_file(file_path, staging_dir, deduper, max_chars=max_chars)
+        yield file_path, staged_path, stats
@@ -0,0 +1,119 @@
+# insight_agent/presenter.py
+
+import collections
+import logging
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from .coordinator_output import CoordinatorOutputParser
+from .report import (
+    PRESENTER_ERROR_MESSAGE,
+    render_college_section,
+    render_report_footer,
+    render_report_header,
+)
+from .runtime import content_text, iter_agent_events
+
+logger = logging.getLogger(__name__)
+
+
+class TemplatePresenterAgent(BaseAgent):
+    """Presenter that formats the coordinator's output with templates instead of an LLM call.
+
+    The coordinator runs in its own session (as it would behind an AgentTool) with SSE streaming,
+    and its text is fed through CoordinatorOutputParser as it arrives. Report sections are emitted
+    as partial events as soon as they can be rendered - each college when its
+    COLLEGE_ANALYSIS_BLOCK_END is parsed - and the final event carries the complete report.
+    Malformed or cut-off output still reports every college that was parsed, with a note that the
+    analysis is incomplete; only if no college block can be parsed does the user get the
+    presenter's polite error message.
+    """
+
+    coordinator_agent: BaseAgent
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name, coordinator_agent, description=""):
+        super().__init__(name=name, description=description, coordinator_agent=coordinator_agent)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        parser = CoordinatorOutputParser()
+        sections = []
+        streamed = False  # Whether the current model turn arrived as partial deltas.
+
+        def render(parse_events):
+            # Nothing is shown until the first college is parsed, so malformed output never leaves
+            # a dangling header in front of the error message.
+            for kind, value in parse_events:
+                if kind != "college":
+                    continue
+                if not sections:
+                    sections.append(render_report_header(parser.output))
+                    yield sections[-1]
+                sections.append(render_college_section(value))
+                yield sections[-1]
+
+        try:
+            async for event in iter_agent_events(
+                self.coordinator_agent,
+                content_text(ctx.user_content),
+                state=dict(ctx.session.state),
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+            ):
+                text = content_text(event.content)
+                if event.partial:
+                    streamed = True
+                    parse_events = parser.feed(text)
+                elif streamed and text and not parser.finished:
+                    # The partials did not carry the whole output (e.g. a coordinator that streamed
+                    # only its college blocks), so the final event's complete text is parsed instead.
+                    # Colleges already rendered from the partials are not rendered again.
+                    rendered = collections.Counter(college.college_name for college in parser.output.colleges)
+                    parser = CoordinatorOutputParser()
+                    parse_events = []
+                    for kind, value in parser.feed(text + "\n"):
+                        if kind == "college" and rendered[value.college_name] > 0:
+                            rendered[value.college_name] -= 1
+                            continue
+                        parse_events.append((kind, value))
+                    streamed = False
+                elif text or streamed:
+                    # A final event repeats the text of the partial events that preceded it.
+                    parse_events = parser.feed("\n" if streamed else text + "\n")
+                    streamed = False
+                else:
+                    continue
+                for section in render(parse_events):
+                    yield self._text_event(ctx, section, partial=True)
+            for section in render(parser.close()):
+                yield self._text_event(ctx, section, partial=True)
+        except Exception as e:
+            logger.exception("%s: coordinator run failed: %s", self.name, e)
+            # Colleges parsed before the failure are still reported, under the incomplete-analysis note.
+            parser.output.warnings.append(f"The coordinator run failed: {type(e).__name__}.")
+            for section in render(parser.close()):
+                yield self._text_event(ctx, section, partial=True)
+
+        # `sections` rather than parser.output.colleges: after a re-parse of a malformed final event
+        # the colleges rendered from the partials are only recorded there.
+        if not sections:
+            logger.warning("%s: coordinator output could not be parsed; warnings: %s", self.name, parser.output.warnings)
+            yield self._text_event(ctx, PRESENTER_ERROR_MESSAGE)
+            return
+        footer = render_report_footer(parser.output)
+        yield self._text_event(ctx, footer, partial=True)
+        yield self._text_event(ctx, "".join(sections) + footer)
+
+    def _text_event(self, ctx, text, partial=None):
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            partial=partial,
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]),
+        )
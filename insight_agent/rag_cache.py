@@ -0,0 +1,236 @@
+# insight_agent/rag_cache.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+# How often (seconds) the corpus generation is re-read from the on-disk tier, so that
+# invalidations made by the ingestion script in another process are picked up.
+DEFAULT_GENERATION_CHECK_INTERVAL = 30.0
+
+_NORMALIZE_PATTERN = re.compile(r"[^a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retrieval_cache (
+    key TEXT PRIMARY KEY,
+    corpus TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS corpus_generation (
+    corpus TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+def normalize_query(query):
+    """Lower-cases the query and collapses punctuation/whitespace so trivial variants share a key."""
+    return _NORMALIZE_PATTERN.sub(" ", (query or "").lower()).strip()
+
+
+def make_cache_key(query, corpus, top_k):
+    """Builds the cache key for a retrieval: normalized query + corpus + top_k."""
+    raw = f"{corpus or ''}\x1f{top_k}\x1f{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RetrievalCache:
+    """Two-tier (in-process LRU + optional sqlite) cache for RAG retrieval results.
+
+    Entries expire after `ttl_seconds` and are tagged with the corpus generation they were
+    fetched under; bumping the generation via `invalidate()` makes all older entries stale.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, db_path=None,
+                 generation_check_interval=DEFAULT_GENERATION_CHECK_INTERVAL, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.generation_check_interval = generation_check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (corpus, generation, created_at, value)
+        self._generations = {}  # corpus -> (generation, checked_at)
+        self._counters = {
+            "hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0,
+            "evictions": 0, "expirations": 0, "stale": 0,
+        }
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    # --- Generation tracking ---
+
+    def _generation(self, corpus):
+        now = self._clock()
+        cached = self._generations.get(corpus)
+        if cached is not None and (self._conn is None or now - cached[1] < self.generation_check_interval):
+            return cached[0]
+        generation = cached[0] if cached else 0
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT generation FROM corpus_generation WHERE corpus = ?", (corpus or "",)
+            ).fetchone()
+            generation = row[0] if row else 0
+        self._generations[corpus] = (generation, now)
+        return generation
+
+    def invalidate(self, corpus=None):
+        """Drops cached results for `corpus` (or every corpus) and bumps its generation."""
+        with self._lock:
+            if corpus is None:
+                self._memory.clear()
+                corpora = list(self._generations)
+                if self._conn is not None:
+                    corpora += [row[0] for row in self._conn.execute("SELECT DISTINCT corpus FROM retrieval_cache")]
+                    self._conn.execute("DELETE FROM retrieval_cache")
+            else:
+                for key in [k for k, entry in self._memory.items() if entry[0] == corpus]:
+                    del self._memory[key]
+                corpora = [corpus]
+                if self._conn is not None:
+                    self._conn.execute("DELETE FROM retrieval_cache WHERE corpus = ?", (corpus,))
+            for name in set(corpora):
+                self._generations.pop(name, None)  # force a fresh read before bumping
+                generation = self._generation(name) + 1
+                self._generations[name] = (generation, self._clock())
+                if self._conn is not None:
+                    self._conn.execute(
+                        "INSERT INTO corpus_generation (corpus, generation) VALUES (?, ?) "
+                        "ON CONFLICT(corpus) DO UPDATE SET generation = excluded.generation",
+                        (name or "", generation),
+                    )
+            if self._conn is not None:
+                self._conn.commit()
+
+    # --- Lookup / Store ---
+
+    def get(self, query, corpus, top_k):
+        """Returns the cached value, or None on a miss."""
+        key = make_cache_key(query, corpus, top_k)
+        with self._lock:
+            now = self._clock()
+            generation = self._generation(corpus)
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[1], entry[2], generation, now):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return entry[3]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT generation, created_at, value FROM retrieval_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if self._is_fresh(row[0], row[1], generation, now):
+                        value = json.loads(row[2])
+                        self._remember(key, corpus, row[0], row[1], value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._conn.execute("DELETE FROM retrieval_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, query, corpus, top_k, value):
+        """Stores a retrieval result under the current corpus generation."""
+        key = make_cache_key(query, corpus, top_k)
+        with self._lock:
+            now = self._clock()
+            generation = self._generation(corpus)
+            self._remember(key, corpus, generation, now, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO retrieval_cache (key, corpus, generation, created_at, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, corpus or "", generation, now, json.dumps(value)),
+                )
+                self._conn.commit()
+
+    def _is_fresh(self, entry_generation, created_at, generation, now):
+        if entry_generation != generation:
+            self._counters["stale"] += 1
+            return False
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            self._counters["expirations"] += 1
+            return False
+        return True
+
+    def _remember(self, key, corpus, generation, created_at, value):
+        self._memory[key] = (corpus, generation, created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def close(self):
+        """Closes the on-disk tier, if any."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        """Returns hit/miss counters plus the current in-memory size and hit ratio."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# --- Process-wide Default Cache ---
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Returns the process-wide retrieval cache configured from RAG_CACHE_* environment variables.
+
+    RAG_CACHE_PATH enables the sqlite tier (shared across processes and restarts).
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RetrievalCache(
+                max_entries=int(os.getenv("RAG_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.getenv("RAG_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                db_path=os.getenv("RAG_CACHE_PATH") or None,
+            )
+        return _default_cache
+
+
+def invalidate_corpus(corpus_name, db_path=None):
+    """Invalidates cached retrievals for a corpus after its contents changed (used by ingestion).
+
+    Returns False when no on-disk tier is configured, since in-process caches of other
+    processes cannot be reached in that case.
+    """
+    db_path = db_path or os.getenv("RAG_CACHE_PATH")
+    if not db_path:
+        return False
+    cache = RetrievalCache(db_path=db_path)
+    try:
+        cache.invalidate(corpus_name)
+    finally:
+        cache.close()
+    return True
@@ -0,0 +1,74 @@
+# insight_agent/report.py
+
+import datetime
+
+from .coordinator_output import (
+    DISCLAIMER_SECTION_TEXT,
+    LIMITATIONS_SECTION_TEXT,
+    QUALITATIVE_SECTION_TEXT,
+)
+
+# Same wording the LLM presenter is instructed to use (see get_presenter_agent_instructions()).
+PRESENTER_ERROR_MESSAGE = (
+    "I encountered an issue while processing your request with my internal analysis system. "
+    "Please try again later or rephrase your query."
+)
+
+INCOMPLETE_ANALYSIS_NOTE = (
+    "Note: part of the analysis could not be completed, so this report may be missing some colleges or sections."
+)
+
+
+# --- Report Sections ---
+# The report follows the structure described in get_presenter_agent_instructions(). Sections are
+# rendered independently so they can be streamed to the user as soon as their data is parsed.
+
+def render_report_header(output):
+    """Executive summary and user profile, followed by the heading of the per-college analysis."""
+    lines = ["# College Admissions Analysis", ""]
+    if output.overall_notes:
+        lines.extend(["## Executive Summary", "", output.overall_notes, ""])
+    if output.profile_summary:
+        lines.extend(["## User Profile Summary", "", output.profile_summary, ""])
+    lines.extend(["## Detailed College-by-College Analysis", "", ""])
+    return "\n".join(lines)
+
+
+def render_college_section(college):
+    """One college's section. INTERNAL_PROCESSING_NOTES are never shown to the user."""
+    lines = [f"### {college.college_name}", ""]
+    for label, value in (
+        ("Classification", college.classification),
+        ("Key Comparative Data", college.key_data_points),
+        ("Detailed Rationale", college.rationale),
+        ("Data Sources Summary", college.data_sources),
+    ):
+        if value:
+            lines.extend([f"**{label}:** {value}", ""])
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_report_footer(output, as_of=None):
+    """General notes and disclaimers; standard texts are used for any section the output lacks."""
+    as_of = as_of or datetime.date.today().isoformat()
+    lines = ["## General Notes & Disclaimers", ""]
+    if not output.complete or output.warnings:
+        lines.extend([f"*{INCOMPLETE_ANALYSIS_NOTE}*", ""])
+    lines.extend([
+        output.qualitative or QUALITATIVE_SECTION_TEXT,
+        "",
+        output.limitations or LIMITATIONS_SECTION_TEXT.format(date=as_of),
+        "",
+        f"*{output.disclaimer or DISCLAIMER_SECTION_TEXT}*",
+    ])
+    return "\n".join(lines)
+
+
+def render_report(output, as_of=None):
+    """Renders a fully parsed CoordinatorOutput, or the polite error message if nothing usable was parsed."""
+    if not output.colleges:
+        return PRESENTER_ERROR_MESSAGE
+    return (render_report_header(output)
+            + "".join(render_college_section(college) for college in output.colleges)
+            + render_report_footer(output, as_of))
@@ -0,0 +1,277 @@
+# insight_agent/resilience.py
+#
+# Hard deadlines, cancellation and hedged retries for specialist sub-agent calls. The prompts'
+# "Stuck/Timeout Protocol" only asks the model to assume a call is unresponsive; DeadlineAgentTool
+# actually cancels a call that exceeds its deadline and hands the model a structured result
+# ({"status": "timed_out", ...}) it can act on. A per-request deadline bounds the whole analysis.
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from google.adk.tools.agent_tool import AgentTool
+
+from .singleflight import DEFAULT_COALESCED_AGENTS, get_default_singleflight, request_intent_key, singleflight_enabled
+from .tracing import current_span
+
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+# Latency samples kept per agent for the hedging percentile.
+DEFAULT_LATENCY_WINDOW = 200
+# Hedges are never launched sooner than this, however fast the agent usually is.
+MIN_HEDGE_DELAY_SECONDS = 0.05
+# How long cancelled attempts get to unwind before the result is returned.
+CANCEL_GRACE_SECONDS = 1.0
+
+TIMED_OUT = "timed_out"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+FAILED = "failed"
+
+# Monotonic time by which the current request must finish (None = no deadline). Context variables
+# are copied into AgentTool runners and fan-out tasks, so nested calls see the request's deadline.
+_request_deadline = contextvars.ContextVar("insight_request_deadline", default=None)
+
+
+# --- Request Deadline ---
+
+def request_time_remaining():
+    """Seconds left until the current request's deadline, or None without one."""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextlib.contextmanager
+def request_deadline_scope(seconds):
+    """Sets a deadline `seconds` from now for everything run inside the block (in this task and the
+    tasks it starts). An enclosing, earlier deadline is kept. `seconds=None` leaves it unchanged."""
+    deadline = _request_deadline.get()
+    if seconds:
+        candidate = time.monotonic() + seconds
+        deadline = candidate if deadline is None else min(deadline, candidate)
+    token = _request_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _request_deadline.reset(token)
+
+
+def install_request_deadline(agent, seconds):
+    """Gives every run of `agent` (e.g. the sequential LLM coordinator) a request deadline via agent callbacks."""
+    from .tracing import chain_callbacks
+
+    previous = {}
+
+    def before_agent(callback_context):
+        previous[callback_context.invocation_id] = _request_deadline.get()
+        candidate = time.monotonic() + seconds
+        deadline = previous[callback_context.invocation_id]
+        _request_deadline.set(candidate if deadline is None else min(deadline, candidate))
+        return None
+
+    def after_agent(callback_context):
+        if callback_context.invocation_id in previous:
+            _request_deadline.set(previous.pop(callback_context.invocation_id))
+        return None
+
+    agent.before_agent_callback = chain_callbacks(agent.before_agent_callback, before_agent)
+    agent.after_agent_callback = chain_callbacks(agent.after_agent_callback, after_agent)
+    return agent
+
+
+# --- Latency Tracking ---
+
+class LatencyTracker:
+    """Recent successful call latencies of one agent, used to pick the hedging delay."""
+
+    def __init__(self, window=DEFAULT_LATENCY_WINDOW):
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile, min_samples=DEFAULT_HEDGE_MIN_SAMPLES):
+        """The latency percentile in seconds, or None until `min_samples` calls have been seen."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            samples = np.array(self._samples)
+        return float(np.percentile(samples, percentile))
+
+
+_latency_trackers = collections.defaultdict(LatencyTracker)
+_stats = collections.Counter()
+_stats_lock = threading.Lock()
+
+
+def get_latency_tracker(agent_name):
+    return _latency_trackers[agent_name]
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_resilience_stats():
+    """Process-wide counts of calls, timeouts, hedges launched and hedges that won."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+# --- Deadline Agent Tool ---
+
+class DeadlineAgentTool(AgentTool):
+    """AgentTool with a hard per-call deadline, cancellation and optional hedging.
+
+    A call is cancelled after `timeout` seconds (or when the request deadline passes, whichever
+    is sooner) and returns {"status": "timed_out", ...} instead of stalling the caller. With
+    `hedge_percentile`, a second identical attempt starts once the call has been running longer
+    than that percentile of the agent's recent latencies; the first attempt to finish wins and the
+    other is cancelled. A sub-agent exception becomes {"status": "failed", ...}.
+
+    With a `singleflight` (see singleflight.py), concurrent calls with the same request intent
+    share one sub-agent run; hedges always run on their own. Only the caller whose call ran the
+    sub-agent receives its state changes.
+    """
+
+    def __init__(self, agent, timeout=None, hedge_percentile=None,
+                 hedge_min_samples=DEFAULT_HEDGE_MIN_SAMPLES, singleflight=None, skip_summarization=False):
+        super().__init__(agent=agent, skip_summarization=skip_summarization)
+        self.timeout = timeout or None
+        self.hedge_percentile = hedge_percentile or None
+        self.hedge_min_samples = hedge_min_samples
+        self.singleflight = singleflight
+        self.latency = get_latency_tracker(agent.name)
+
+    def _attempt(self, args, tool_context, coalesce=True):
+        run = lambda: AgentTool.run_async(self, args=args, tool_context=tool_context)
+        if self.singleflight is None or not coalesce:
+            return asyncio.ensure_future(run())
+        key = (self.name, request_intent_key(args.get("request") or json.dumps(args, sort_keys=True, default=str)))
+        return asyncio.ensure_future(self.singleflight.do(key, run, group=self.name))
+
+    def _call_timeout(self):
+        remaining = request_time_remaining()
+        if remaining is None:
+            return self.timeout
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def _result(self, status, message, **details):
+        _count(status)
+        span = current_span()
+        if span is not None:
+            span.attributes[status] = True
+        return {"status": status, "agent": self.name, "message": message, **details}
+
+    async def run_async(self, *, args, tool_context):
+        _count("calls")
+        timeout = self._call_timeout()
+        if timeout is not None and timeout <= 0:
+            return self._result(DEADLINE_EXCEEDED, "The request deadline has passed, so this call was not made. "
+                                "Do not call any more specialist agents; finish with the data you already have.")
+
+        hedge_delay = None
+        if self.hedge_percentile:
+            hedge_delay = self.latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+            hedge_delay = None if hedge_delay is None else max(hedge_delay, MIN_HEDGE_DELAY_SECONDS)
+
+        started = time.monotonic()
+        attempts = [self._attempt(args, tool_context)]
+        hedge, error = None, None
+        try:
+            while attempts:
+                elapsed = time.monotonic() - started
+                waits = [timeout - elapsed] if timeout is not None else []
+                hedge_due = hedge_delay is not None and hedge is None and error is None
+                if hedge_due:
+                    waits.append(hedge_delay - elapsed)
+                done, _ = await asyncio.wait(attempts, timeout=max(0.0, min(waits)) if waits else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    attempts.remove(attempt)
+                    if attempt.exception() is None:
+                        self.latency.record(time.monotonic() - started)
+                        if attempt is hedge:
+                            _count("hedge_wins")
+                        return attempt.result()
+                    error = attempt.exception()
+                if done:
+                    continue
+                elapsed = time.monotonic() - started
+                if timeout is not None and elapsed >= timeout:
+                    deadline_hit = request_time_remaining() is not None and request_time_remaining() <= 0
+                    return self._result(
+                        DEADLINE_EXCEEDED if deadline_hit else TIMED_OUT,
+                        f"{self.name} did not respond within {timeout:.0f} seconds and the call was cancelled. "
+                        "Treat it as unresponsive, do not retry it, and continue with the data you have.",
+                        timeout_seconds=round(timeout, 1),
+                    )
+                if hedge_due and elapsed >= hedge_delay:
+                    _count("hedges")
+                    span = current_span()
+                    if span is not None:
+                        span.attributes["hedged"] = True
+                    hedge = self._attempt(args, tool_context, coalesce=False)
+                    attempts.append(hedge)
+            return self._result(FAILED, f"{self.name} failed: {type(error).__name__}: {error}. "
+                                "Do not retry it; continue with the data you have.")
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            if attempts:
+                await asyncio.wait(attempts, timeout=CANCEL_GRACE_SECONDS)
+
+
+# --- Configuration ---
+
+def _env_float(name, default=None):
+    value = os.getenv(name, "")
+    return float(value) if value.strip() else default
+
+
+def subagent_timeouts():
+    """Per-call deadlines in seconds: INSIGHT_SUBAGENT_TIMEOUT_S (unset or 0 = none) for every
+    specialist, overridden per agent by INSIGHT_SUBAGENT_TIMEOUTS, e.g. "SearchAgent=45,CodingAgent=60"."""
+    default = _env_float("INSIGHT_SUBAGENT_TIMEOUT_S") or None
+    overrides = {}
+    for item in os.getenv("INSIGHT_SUBAGENT_TIMEOUTS", "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            overrides[name.strip()] = float(value)
+    return default, overrides
+
+
+def build_specialist_tool(agent):
+    """Wraps a specialist agent in a DeadlineAgentTool configured from the environment.
+
+    INSIGHT_HEDGE_PERCENTILE (e.g. 95; unset disables hedging) starts a second attempt once a call
+    is slower than that percentile of the agent's last calls (after INSIGHT_HEDGE_MIN_SAMPLES calls).
+    INSIGHT_SINGLEFLIGHT=1 coalesces concurrent identical RAGAgent/SearchAgent requests. Without a
+    sub-agent timeout, request deadline, hedging or single-flight the plain AgentTool is returned.
+    """
+    default, overrides = subagent_timeouts()
+    timeout = overrides.get(agent.name, default) or None
+    hedge_percentile = _env_float("INSIGHT_HEDGE_PERCENTILE")
+    singleflight = get_default_singleflight() \
+        if singleflight_enabled() and agent.name in DEFAULT_COALESCED_AGENTS else None
+    if timeout is None and not hedge_percentile and singleflight is None and not request_deadline_seconds():
+        return AgentTool(agent=agent)
+    return DeadlineAgentTool(
+        agent=agent,
+        timeout=timeout,
+        hedge_percentile=hedge_percentile,
+        hedge_min_samples=int(_env_float("INSIGHT_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES)),
+        singleflight=singleflight,
+    )
+
+
+def request_deadline_seconds():
+    """INSIGHT_REQUEST_DEADLINE_S: overall deadline per analysis request (unset or 0 = none)."""
+    return _env_float("INSIGHT_REQUEST_DEADLINE_S") or None
@@ -0,0 +1,63 @@
+# insight_agent/runtime.py
+
+import inspect
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+
+def content_text(content):
+    """Joins the text parts of a genai Content object (None-safe)."""
+    if not content or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts)
+
+
+def iter_agent_tree(agent):
+    """Yields `agent` and every agent below it once: sub-agents, AgentTool-wrapped agents and agents
+    held in fields of custom agents (e.g. the parallel coordinator's college agent)."""
+    from google.adk.agents import BaseAgent
+    from google.adk.tools.agent_tool import AgentTool
+
+    seen = set()
+    pending = [agent]
+    while pending:
+        current = pending.pop(0)
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        pending.extend(current.sub_agents)
+        pending.extend(tool.agent for tool in getattr(current, "tools", ()) if isinstance(tool, AgentTool))
+        for field_name in type(current).model_fields:
+            value = getattr(current, field_name, None)
+            if field_name != "parent_agent" and isinstance(value, BaseAgent):
+                pending.append(value)
+
+
+async def iter_agent_events(agent, text, state=None, user_id="insight_user", run_config=None):
+    """Runs `agent` on a single user message in a throwaway session and yields its events as they arrive.
+
+    This mirrors what AgentTool does internally, but can be driven from plain asyncio code.
+    """
+    session_service = InMemorySessionService()
+    runner = Runner(app_name=agent.name, agent=agent, session_service=session_service)
+    session = session_service.create_session(app_name=agent.name, user_id=user_id, state=state or {})
+    if inspect.isawaitable(session):
+        # Newer google-adk releases made session creation async.
+        session = await session
+
+    message = genai_types.Content(role="user", parts=[genai_types.Part(text=text)])
+    kwargs = {"run_config": run_config} if run_config is not None else {}
+    async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message, **kwargs):
+        yield event
+
+
+async def run_agent_to_text(agent, text, state=None, user_id="insight_user"):
+    """Runs `agent` on a single user message in a throwaway session and returns its final text."""
+    final_text = ""
+    async for event in iter_agent_events(agent, text, state=state, user_id=user_id):
+        if event.is_final_response() and event.content:
+            final_text = content_text(event.content)
+    return final_text
@@ -0,0 +1,557 @@
+# insight_agent/scheduler.py
+#
+# Process-wide scheduling of model calls (and quota-limited tool calls). Every agent in the graph
+# calls the same model against one project quota, but each used to send its request as soon as it
+# was ready: bursts from batch jobs and the parallel fan-out ran into 429s, and the retries made the
+# storm worse. With the scheduler, a call first waits for its model's token buckets (requests/min
+# and tokens/min). Waiting calls are granted by priority class (interactive before batch work;
+# presenter and coordinator turns before analysts, specialists and, last, speculative SearchAgent
+# calls) and round-robin across sessions within a class. All scheduled Gemini agents share one
+# pooled API client.
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import itertools
+import os
+import threading
+import time
+from functools import cached_property
+from typing import Any
+
+import numpy as np
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.genai import errors as genai_errors
+
+from .tracing import current_span, estimate_tokens
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+WORKLOAD_PRIORITY = {INTERACTIVE: 0, BATCH: 1}
+
+# Agent roles, most urgent first. SearchAgent only verifies data the other agents already have.
+ROLE_PRIORITY = {"presenter": 0, "coordinator": 0, "analyst": 1, "specialist": 2, "search": 3}
+_ROLE_CLASSES = max(ROLE_PRIORITY.values()) + 1
+
+# Per-model defaults (the Gemini API's paid tier 1 quotas for Flash models).
+DEFAULT_MODEL_RPM = 1000
+DEFAULT_MODEL_TPM = 1000000
+# Share of a quota that may be spent in one burst. The rest refills evenly over the minute, so no
+# sliding minute ever admits more than the quota itself.
+BURST_FRACTION = 0.1
+# Output tokens reserved for a request without max_output_tokens, until its actual size is known.
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 512
+# A waiting call moves up one priority class for every this many seconds it has waited, so batch
+# work is delayed by interactive traffic but never starved.
+DEFAULT_AGING_SECONDS = 30.0
+# Times a call rejected with 429 is queued again before the error is passed on.
+DEFAULT_MAX_RETRIES = 3
+# Wait-time samples kept per resource and priority class.
+DEFAULT_WAIT_WINDOW = 5000
+
+# Resource name for Vertex AI RAG retrievals (limited by INSIGHT_RAG_RPM).
+RAG_RESOURCE = "vertex-rag"
+
+# Workload class and fairness key of the current request. Context variables are copied into
+# AgentTool runners and fan-out tasks, so nested model calls inherit them.
+_workload = contextvars.ContextVar("insight_workload", default=INTERACTIVE)
+_session = contextvars.ContextVar("insight_session", default=None)
+
+
+# --- Scheduling Scope ---
+
+@contextlib.contextmanager
+def scheduling_scope(workload=None, session=None):
+    """Runs the block's model calls in `workload` (INTERACTIVE or BATCH) on behalf of `session`.
+    Arguments left as None keep the enclosing values."""
+    tokens = []
+    if workload is not None:
+        if workload not in WORKLOAD_PRIORITY:
+            raise ValueError(f"Unknown workload '{workload}' (expected one of {', '.join(WORKLOAD_PRIORITY)}).")
+        tokens.append((_workload, _workload.set(workload)))
+    if session is not None:
+        tokens.append((_session, _session.set(str(session))))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def install_session_scope(agent):
+    """Makes every run of `agent` (the root agent) its own session for fair queuing, unless the
+    caller (e.g. BatchRunner) already set one."""
+    from .tracing import chain_callbacks
+
+    owned = set()
+
+    def before_agent(callback_context):
+        if _session.get() is None:
+            _session.set(callback_context.invocation_id)
+            owned.add(callback_context.invocation_id)
+        return None
+
+    def after_agent(callback_context):
+        if callback_context.invocation_id in owned:
+            owned.discard(callback_context.invocation_id)
+            _session.set(None)
+        return None
+
+    agent.before_agent_callback = chain_callbacks(agent.before_agent_callback, before_agent)
+    agent.after_agent_callback = chain_callbacks(agent.after_agent_callback, after_agent)
+    return agent
+
+
+# --- Token Buckets ---
+
+class TokenBucket:
+    """Holds up to `capacity` units and refills at `rate_per_minute` (per `period` seconds).
+
+    The level may go below zero when a call turns out to be larger than reserved; later calls
+    then wait until the debt is paid off.
+    """
+
+    def __init__(self, rate_per_minute, capacity, period=60.0, clock=time.monotonic):
+        self.rate = rate_per_minute / period
+        self.capacity = max(1.0, float(capacity))
+        self.clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount):
+        """Seconds until `amount` (at most the capacity) is available; 0 if it is now."""
+        self._refill()
+        missing = min(amount, self.capacity) - self._level
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount):
+        self._refill()
+        self._level -= amount
+
+    def drain(self):
+        self._refill()
+        self._level = min(self._level, 0.0)
+
+    def level(self):
+        self._refill()
+        return self._level
+
+
+def _limit_bucket(limit, period, clock):
+    if not limit:
+        return None
+    burst = max(1.0, limit * BURST_FRACTION)
+    return TokenBucket(max(limit - burst, limit / 2.0), burst, period=period, clock=clock)
+
+
+class Quota:
+    """Requests/min and tokens/min limits of one resource; a limit of 0 is unlimited."""
+
+    def __init__(self, rpm=0, tpm=0, period=60.0, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = _limit_bucket(rpm, period, clock)
+        self._tokens = _limit_bucket(tpm, period, clock)
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self):
+        return self._requests is None and self._tokens is None
+
+    def reserve(self, tokens):
+        """Takes one request and `tokens` if both are available and returns 0; otherwise takes
+        nothing and returns the seconds until they will be."""
+        with self._lock:
+            delay = max(self._requests.delay(1) if self._requests else 0.0,
+                        self._tokens.delay(tokens) if self._tokens and tokens else 0.0)
+            if delay == 0:
+                if self._requests:
+                    self._requests.take(1)
+                if self._tokens and tokens:
+                    self._tokens.take(tokens)
+            return delay
+
+    def settle(self, reserved, actual):
+        """Charges (or refunds) the difference between a call's reserved and actual tokens."""
+        if self._tokens is not None and actual is not None:
+            with self._lock:
+                self._tokens.take(actual - reserved)
+
+    def throttled(self):
+        """After a 429 the buckets are emptied: the endpoint's view of the quota is authoritative."""
+        with self._lock:
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket.drain()
+
+
+# --- Scheduler ---
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "rank", "label", "session", "enqueued", "seq")
+
+    def __init__(self, future, tokens, rank, label, session, enqueued, seq):
+        self.future = future
+        self.tokens = tokens
+        self.rank = rank
+        self.label = label
+        self.session = session
+        self.enqueued = enqueued
+        self.seq = seq
+
+
+class _Lane:
+    """Waiters for one resource on one event loop: rank -> session -> FIFO of waiters."""
+
+    def __init__(self):
+        self.classes = collections.defaultdict(collections.OrderedDict)
+        self.size = 0
+        self.dispatcher = None
+
+    def push(self, waiter):
+        self.classes[waiter.rank].setdefault(waiter.session, collections.deque()).append(waiter)
+        self.size += 1
+
+    def peek(self, now, aging_seconds):
+        """The waiter to grant next: the head of the least recently served session in the most
+        urgent class, where waiting time raises a head's class by one per `aging_seconds`."""
+        best, best_key = None, None
+        for rank, sessions in self.classes.items():
+            head = next(iter(sessions.values()))[0]
+            effective = rank - int((now - head.enqueued) / aging_seconds) if aging_seconds else rank
+            key = (effective, head.seq)
+            if best_key is None or key < best_key:
+                best, best_key = head, key
+        return best
+
+    def remove(self, waiter, rotate=False):
+        sessions = self.classes.get(waiter.rank)
+        queue = sessions.get(waiter.session) if sessions else None
+        if not queue or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.size -= 1
+        if not queue:
+            del sessions[waiter.session]
+        elif rotate:
+            sessions.move_to_end(waiter.session)
+        if not sessions:
+            del self.classes[waiter.rank]
+
+
+class CallScheduler:
+    """Grants model and tool calls within per-resource quotas, by priority and fairly across sessions.
+
+    `await acquire(resource, tokens, role)` returns once the call may be sent. Resources without a
+    configured quota use `default_limits` ((rpm, tpm), None = unlimited); calls to an unlimited
+    resource are never queued. Queues are kept per event loop (futures are bound to their loop);
+    the quotas themselves are shared by the whole process.
+    """
+
+    def __init__(self, quotas=None, default_limits=None, period=60.0, aging_seconds=DEFAULT_AGING_SECONDS,
+                 max_retries=DEFAULT_MAX_RETRIES, clock=time.monotonic):
+        self._limits = dict(quotas or {})
+        self.default_limits = default_limits
+        self.period = period
+        self.aging_seconds = aging_seconds
+        self.max_retries = max_retries
+        self.clock = clock
+        self._quotas = {}
+        self._lanes = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(collections.Counter)
+        self._waits = collections.defaultdict(lambda: collections.deque(maxlen=DEFAULT_WAIT_WINDOW))
+        self._max_depth = collections.Counter()
+
+    def quota(self, resource):
+        with self._lock:
+            quota = self._quotas.get(resource)
+            if quota is None:
+                rpm, tpm = self._limits.get(resource, self.default_limits) or (0, 0)
+                quota = self._quotas[resource] = Quota(rpm, tpm, period=self.period, clock=self.clock)
+            return quota
+
+    def _lane(self, resource):
+        key = (id(asyncio.get_running_loop()), resource)
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane()
+            return lane
+
+    async def acquire(self, resource, tokens=0, role="specialist"):
+        """Waits until `resource` has capacity for one call of `tokens` and returns the seconds waited."""
+        workload = _workload.get()
+        label = f"{workload}/{role}"
+        quota = self.quota(resource)
+        if quota.unlimited:
+            self._record(resource, label, 0.0)
+            return 0.0
+        lane = self._lane(resource)
+        if lane.size == 0 and quota.reserve(tokens) == 0:
+            self._record(resource, label, 0.0)
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        rank = WORKLOAD_PRIORITY[workload] * _ROLE_CLASSES + ROLE_PRIORITY.get(role, ROLE_PRIORITY["specialist"])
+        waiter = _Waiter(loop.create_future(), tokens, rank, label, _session.get() or "default",
+                         self.clock(), next(self._seq))
+        lane.push(waiter)
+        with self._lock:
+            self._max_depth[resource] = max(self._max_depth[resource], lane.size)
+        if lane.dispatcher is None or lane.dispatcher.done():
+            lane.dispatcher = loop.create_task(self._dispatch(lane, quota))
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            lane.remove(waiter)
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Cancelled after the grant: the call is never sent, so its tokens are refunded.
+                quota.settle(tokens, 0)
+            raise
+        waited = self.clock() - waiter.enqueued
+        self._record(resource, label, waited)
+        return waited
+
+    async def _dispatch(self, lane, quota):
+        while lane.size:
+            waiter = lane.peek(self.clock(), self.aging_seconds)
+            if waiter.future.done():
+                lane.remove(waiter)
+                continue
+            delay = quota.reserve(waiter.tokens)
+            if delay:
+                # A more urgent call that arrives meanwhile is picked when the capacity is there.
+                await asyncio.sleep(delay)
+                continue
+            lane.remove(waiter, rotate=True)
+            waiter.future.set_result(None)
+
+    def settle(self, resource, reserved, actual):
+        self.quota(resource).settle(reserved, actual)
+
+    def throttled(self, resource, retrying=False):
+        """Records a 429 from `resource` (and whether the call is queued again) and pauses the
+        resource until its buckets refill."""
+        self.quota(resource).throttled()
+        with self._lock:
+            self._counters[resource]["throttled"] += 1
+            if retrying:
+                self._counters[resource]["retries"] += 1
+
+    def _record(self, resource, label, waited):
+        with self._lock:
+            self._counters[resource]["granted"] += 1
+            self._counters[(resource, label)]["granted"] += 1
+            self._waits[(resource, label)].append(waited)
+
+    def queue_depth(self, resource=None):
+        with self._lock:
+            return sum(lane.size for (_, name), lane in self._lanes.items() if resource in (None, name))
+
+    def stats(self):
+        """Per resource: quota, calls granted, 429s seen, retries, current and maximum queue depth
+        and wait-time percentiles, overall and per priority class ("<workload>/<role>")."""
+        with self._lock:
+            counters = {key: dict(counts) for key, counts in self._counters.items()}
+            waits = {key: np.array(samples) for key, samples in self._waits.items()}
+            quotas = dict(self._quotas)
+            max_depth = dict(self._max_depth)
+        resources = {}
+        for resource, quota in quotas.items():
+            samples = [waits[key] for key in waits if key[0] == resource]
+            resources[resource] = dict(
+                counters.get(resource, {}), rpm=quota.rpm, tpm=quota.tpm, queue_depth=self.queue_depth(resource),
+                max_queue_depth=max_depth.get(resource, 0), wait_ms=_wait_percentiles(np.concatenate(samples)) if samples else {},
+                classes={key[1]: dict(counters.get(key, {}), wait_ms=_wait_percentiles(waits[key]))
+                         for key in sorted(waits) if key[0] == resource})
+        return {"resources": resources, "clients": get_client_pool_stats()}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._waits.clear()
+            self._max_depth.clear()
+
+
+def _wait_percentiles(samples):
+    if not len(samples):
+        return {}
+    return {"p50": round(float(np.percentile(samples, 50)) * 1000.0, 1),
+            "p95": round(float(np.percentile(samples, 95)) * 1000.0, 1),
+            "max": round(float(samples.max()) * 1000.0, 1)}
+
+
+# --- Client Pool ---
+
+_clients = {}
+_client_factory = None
+_client_stats = collections.Counter()
+_client_lock = threading.Lock()
+
+
+def _create_client(headers):
+    from google.genai import Client, types
+
+    return Client(http_options=types.HttpOptions(headers=headers))
+
+
+def get_genai_client(headers=None):
+    """The process-wide google.genai Client for `headers`, created on first use. Gemini otherwise
+    creates one client (and connection pool) per agent."""
+    key = tuple(sorted((headers or {}).items()))
+    with _client_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = (_client_factory or _create_client)(dict(headers or {}))
+            _client_stats["created"] += 1
+        _client_stats["requests"] += 1
+        return client
+
+
+def set_client_factory(factory):
+    """Replaces how pooled clients are created (e.g. with a local fake endpoint) and empties the pool."""
+    global _client_factory
+    with _client_lock:
+        _client_factory = factory
+        _clients.clear()
+
+
+def get_client_pool_stats():
+    with _client_lock:
+        return dict(_client_stats, pooled=len(_clients))
+
+
+class PooledGemini(Gemini):
+    """Gemini that uses the process-wide pooled API client."""
+
+    @cached_property
+    def api_client(self):
+        return get_genai_client(self._tracking_headers)
+
+
+# --- Scheduled Model ---
+
+def estimate_request_tokens(llm_request):
+    """Tokens to reserve for a request: its estimated prompt plus max_output_tokens (or a default)."""
+    config = llm_request.config
+    prompt = estimate_tokens(llm_request.contents)
+    if config is not None and isinstance(config.system_instruction, str):
+        prompt += (len(config.system_instruction) + 3) // 4
+    output = getattr(config, "max_output_tokens", None) or DEFAULT_OUTPUT_TOKEN_ESTIMATE
+    return prompt + output
+
+
+def _response_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and usage.total_token_count:
+        return usage.total_token_count, True
+    return estimate_tokens([response.content] if response.content else []), False
+
+
+def _is_rate_limited(error):
+    return isinstance(error, genai_errors.APIError) and error.code == 429
+
+
+class ScheduledLlm(BaseLlm):
+    """Sends every request of the wrapped model through the process-wide CallScheduler.
+
+    `model` names the quota the calls are charged to and `role` (see ROLE_PRIORITY) their priority.
+    A request rejected with 429 before any response arrived empties the quota's buckets and is
+    queued again, up to the scheduler's max_retries.
+    """
+
+    llm: BaseLlm
+    role: str = "specialist"
+    scheduler: Any = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        scheduler = self.scheduler or get_default_scheduler()
+        reserved = estimate_request_tokens(llm_request)
+        prompt = reserved - (getattr(llm_request.config, "max_output_tokens", None) or DEFAULT_OUTPUT_TOKEN_ESTIMATE)
+        for attempt in itertools.count():
+            waited = await scheduler.acquire(self.model, reserved, role=self.role)
+            span = current_span()
+            if span is not None:
+                span.attributes["scheduler_wait_ms"] = round(span.attributes.get("scheduler_wait_ms", 0.0)
+                                                             + waited * 1000.0, 1)
+            actual, yielded, rate_limited = None, False, False
+            try:
+                async for response in self.llm.generate_content_async(llm_request, stream):
+                    yielded = True
+                    tokens, total = _response_tokens(response)
+                    if not response.partial:
+                        actual = tokens if total else prompt + tokens
+                    yield response
+            except Exception as e:
+                if _is_rate_limited(e):
+                    rate_limited = True
+                    retrying = not yielded and attempt < scheduler.max_retries
+                    scheduler.throttled(self.model, retrying=retrying)
+                    if retrying:
+                        continue
+                raise
+            finally:
+                # Every granted call settles its reservation, including failed and cancelled ones: a call
+                # that produced no usage is refunded (or charged its prompt once the model had started
+                # answering). After a 429 the emptied buckets stand.
+                if not rate_limited:
+                    scheduler.settle(self.model, reserved, actual if actual is not None else prompt if yielded else 0)
+            return
+
+
+def scheduled_model(name, role):
+    """A ScheduledLlm for `name` that calls Gemini through the pooled client."""
+    return ScheduledLlm(model=name, llm=PooledGemini(model=name), role=role)
+
+
+# --- Process-wide Default ---
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def scheduler_enabled():
+    return os.getenv("INSIGHT_SCHEDULER", "").lower() in ("1", "true", "yes")
+
+
+def parse_quotas(text):
+    """Parses INSIGHT_MODEL_QUOTAS ("model=rpm/tpm;model=rpm/tpm"; a tpm of 0 is unlimited)."""
+    quotas = {}
+    for entry in (text or "").split(";"):
+        if not entry.strip():
+            continue
+        name, _, limits = entry.partition("=")
+        rpm, _, tpm = limits.partition("/")
+        quotas[name.strip()] = (float(rpm or 0), float(tpm or 0))
+    return quotas
+
+
+def get_default_scheduler():
+    """The process-wide CallScheduler. Models are limited to INSIGHT_MODEL_RPM / INSIGHT_MODEL_TPM
+    unless INSIGHT_MODEL_QUOTAS names them; Vertex AI RAG retrievals to INSIGHT_RAG_RPM (0 = unlimited).
+    INSIGHT_QUOTA_PERIOD_S shortens the quota minute, only for tests against a fake endpoint."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            quotas = {RAG_RESOURCE: (float(os.getenv("INSIGHT_RAG_RPM", "0")), 0)}
+            quotas.update(parse_quotas(os.getenv("INSIGHT_MODEL_QUOTAS", "")))
+            _default_scheduler = CallScheduler(
+                quotas=quotas,
+                default_limits=(float(os.getenv("INSIGHT_MODEL_RPM", DEFAULT_MODEL_RPM)),
+                                float(os.getenv("INSIGHT_MODEL_TPM", DEFAULT_MODEL_TPM))),
+                period=float(os.getenv("INSIGHT_QUOTA_PERIOD_S", "60")),
+                aging_seconds=float(os.getenv("INSIGHT_SCHEDULER_AGING_S", DEFAULT_AGING_SECONDS)),
+                max_retries=int(os.getenv("INSIGHT_SCHEDULER_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            )
+        return _default_scheduler
@@ -0,0 +1,135 @@
+# insight_agent/scripts/batch_analyze.py
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Ensure the insight_agent package root is in the Python path
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze many student profiles (CSV or JSONL) with the Project Insight agent graph. "
+                    "Each record needs a 'query' field, or 'colleges' plus sat/act/gpa fields; an 'id' field is "
+                    "used to resume interrupted jobs.")
+    parser.add_argument("input", help="CSV (with header row) or JSONL file of student profiles.")
+    parser.add_argument("--output", help="JSONL results file (default: <input>.results.jsonl). Also the checkpoint.")
+    parser.add_argument("--target", choices=["presenter", "coordinator"], default="presenter",
+                        help="Run the full graph and store the report, or run the InternalCoordinatorAgent directly "
+                             "and store per-college classifications (one model call less per profile).")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("INSIGHT_BATCH_CONCURRENCY", "8")),
+                        help="Profiles analyzed at once.")
+    parser.add_argument("--rate-per-minute", type=float, default=float(os.getenv("INSIGHT_BATCH_RATE_PER_MINUTE", "0")),
+                        help="Maximum profiles started per minute across all workers (0 = unlimited).")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per profile after a failure.")
+    parser.add_argument("--limit", type=int, help="Only process the first N input records.")
+    parser.add_argument("--restart", action="store_true", help="Overwrite the output instead of resuming from it.")
+    parser.add_argument("--retry-failed", action="store_true", help="When resuming, run failed profiles again.")
+    parser.add_argument("--progress-interval", type=float, default=30.0, help="Seconds between progress lines.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Replace models and external tools with the offline stand-ins from testing/fakes.py.")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="With --offline: multiplier for the simulated model/tool latencies.")
+    parser.add_argument("--recordings", help="With --offline: JSON file with recorded responses.")
+    parser.add_argument("--quota-rpm", type=float, default=0,
+                        help="With --offline: requests per quota period each model accepts before answering 429.")
+    parser.add_argument("--quota-tpm", type=float, default=0,
+                        help="With --offline: tokens per quota period each model accepts before answering 429.")
+    parser.add_argument("--quota-period", type=float, default=60.0,
+                        help="With --offline: length of the simulated quota minute in seconds.")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """With --offline, keeps the real retrieval backend from building a local index or opening caches.
+    Must run before insight_agent.agent is imported."""
+    if args.offline:
+        os.environ["RAG_BACKEND"] = "vertex"
+        os.environ.pop("RAG_CACHE_PATH", None)
+        os.environ["ANALYSIS_CACHE_PATH"] = ""
+        os.environ["FRESHNESS_DB_PATH"] = ""
+        if args.quota_rpm or args.quota_tpm:
+            # The scheduler (INSIGHT_SCHEDULER=1) gets the simulated quota unless it is configured explicitly.
+            os.environ["INSIGHT_QUOTA_PERIOD_S"] = str(args.quota_period)
+            os.environ.setdefault("INSIGHT_MODEL_RPM", str(args.quota_rpm))
+            os.environ.setdefault("INSIGHT_MODEL_TPM", str(args.quota_tpm))
+
+
+def load_target_agent(args, endpoint=None):
+    from insight_agent.agent import get_root_agent
+    from insight_agent.batch import find_agent
+
+    root_agent = get_root_agent()
+    if args.offline:
+        from insight_agent.testing.fakes import install_standins, load_recordings, scaled_latency
+        install_standins(root_agent, load_recordings(args.recordings), scaled_latency(args.latency_scale), endpoint)
+    return find_agent(root_agent, "InternalCoordinatorAgent") if args.target == "coordinator" else root_agent
+
+
+async def run_batch(args, output_path, endpoint=None):
+    from insight_agent.batch import BatchRunner, iter_batch_queries
+
+    runner = BatchRunner(
+        load_target_agent(args, endpoint),
+        output_path,
+        concurrency=args.concurrency,
+        rate_per_minute=args.rate_per_minute or None,
+        max_retries=args.retries,
+        structured=args.target == "coordinator",
+        progress_interval=args.progress_interval,
+    )
+    return await runner.run(iter_batch_queries(args.input, limit=args.limit),
+                            restart=args.restart, retry_failed=args.retry_failed)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.input):
+        print(f"Input file '{args.input}' not found.")
+        return 1
+    configure_environment(args)
+    output_path = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+
+    print(f"Analyzing profiles from '{args.input}' -> '{output_path}' "
+          f"(target: {args.target}, concurrency: {args.concurrency}, "
+          f"rate limit: {f'{args.rate_per_minute:g}/min' if args.rate_per_minute else 'none'})")
+    endpoint = None
+    if args.offline and (args.quota_rpm or args.quota_tpm):
+        from insight_agent.testing.fakes import QuotaEnforcingEndpoint
+        endpoint = QuotaEnforcingEndpoint(args.quota_rpm, args.quota_tpm, period=args.quota_period)
+    stats = asyncio.run(run_batch(args, output_path, endpoint))
+    print(f"Done: {stats['succeeded']} succeeded, {stats['failed']} failed, {stats['skipped']} already done, "
+          f"{stats['retries']} retries in {stats['elapsed_s']:.1f} s - "
+          f"sustained {stats['profiles_per_minute']:.1f} profiles/min.")
+    if "latency_ms" in stats:
+        print(f"Per-profile latency: p50 {stats['latency_ms']['p50']:.0f} ms, p95 {stats['latency_ms']['p95']:.0f} ms")
+    from insight_agent.singleflight import get_default_singleflight, singleflight_enabled
+    if singleflight_enabled():
+        coalescing = get_default_singleflight().stats()
+        stats["singleflight"] = coalescing
+        print(f"Coalesced specialist calls: {coalescing['total'].get('coalesced', 0)} of "
+              f"{coalescing['total'].get('calls', 0)} (ratio {coalescing['total']['coalescing_ratio']:.2f})")
+    from insight_agent.scheduler import get_default_scheduler, scheduler_enabled
+    if scheduler_enabled():
+        scheduling = get_default_scheduler().stats()
+        stats["scheduler"] = scheduling
+        for resource, counts in scheduling["resources"].items():
+            if counts.get("granted"):
+                print(f"Scheduler '{resource}': {counts['granted']} calls, {counts.get('throttled', 0)} rate-limited, "
+                      f"max queue depth {counts['max_queue_depth']}, wait p50 {counts['wait_ms'].get('p50', 0):.0f} ms "
+                      f"/ p95 {counts['wait_ms'].get('p95', 0):.0f} ms")
+    if endpoint is not None:
+        stats["endpoint"] = endpoint.stats()
+        print(f"Fake endpoint: {stats['endpoint'].get('accepted', 0)} requests accepted, "
+              f"{stats['endpoint'].get('rejected', 0)} rejected with 429")
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
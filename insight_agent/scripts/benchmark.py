@@ -0,0 +1,242 @@
+# insight_agent/scripts/benchmark.py
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# Ensure the insight_agent package root is in the Python path
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+DEFAULT_COLLEGE_COUNTS = "1,5,15,50"
+DEFAULT_OUTPUT_PATH = os.path.join(PROJECT_ROOT_DIR, '.insight_index', 'benchmark_results.json')
+TEST_PROMPT_PATH = os.path.join(PROJECT_ROOT_DIR, 'test prompt.txt')
+# Allowed relative p50 latency increase before a workload counts as a regression.
+DEFAULT_LATENCY_TOLERANCE = 0.15
+
+# Workload colleges, in order.
+BENCHMARK_COLLEGES = [
+    "Caltech", "Stanford", "UC Berkeley", "MIT", "Harvard", "Princeton", "Yale", "Columbia University",
+    "University of Chicago", "Duke University", "Brown University", "Cornell University", "Rice University",
+    "Dartmouth College", "Northwestern University", "Vanderbilt University", "UCLA", "Carnegie Mellon University",
+    "Johns Hopkins University", "University of Pennsylvania", "Georgetown University", "University of Michigan",
+    "University of Virginia", "Emory University", "Tufts University", "University of Southern California",
+    "New York University", "Boston College", "Boston University", "Georgia Tech", "UC San Diego",
+    "University of Florida", "UC Davis", "UC Irvine", "University of Wisconsin", "University of Illinois",
+    "University of Washington", "Purdue University", "Ohio State University", "Rutgers University",
+    "University of Maryland", "Northeastern University", "Case Western Reserve University", "Tulane University",
+    "Wake Forest University", "Lehigh University", "Villanova University", "University of Rochester",
+    "Brandeis University", "Williams College",
+]
+
+_COLLEGE_LIST_PATTERN = re.compile(r"(admission into )[^?]+(\?)")
+
+
+def build_query(college_count):
+    """The profile from 'test prompt.txt' asking about the first `college_count` benchmark colleges."""
+    with open(TEST_PROMPT_PATH, "r", encoding="utf-8") as f:
+        prompt = f.read().strip()
+    colleges = BENCHMARK_COLLEGES[:college_count]
+    college_list = colleges[0] if len(colleges) == 1 else ", ".join(colleges[:-1]) + f", and {colleges[-1]}"
+    return _COLLEGE_LIST_PATTERN.sub(lambda m: m.group(1) + college_list + m.group(2), prompt)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark of the Project Insight agent graph with replayed model/tool responses.")
+    parser.add_argument("--colleges", default=DEFAULT_COLLEGE_COUNTS,
+                        help=f"Comma-separated college counts per workload (default: {DEFAULT_COLLEGE_COUNTS}).")
+    parser.add_argument("--repeat", type=int, default=3, help="Requests per workload.")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for the simulated model/tool latencies (0 measures orchestration overhead only).")
+    parser.add_argument("--coordinator-mode", choices=["sequential", "parallel"],
+                        default=os.getenv("INSIGHT_COORDINATOR_MODE", "sequential"))
+    parser.add_argument("--presenter-mode", choices=["llm", "template"],
+                        default=os.getenv("INSIGHT_PRESENTER_MODE", "llm"))
+    parser.add_argument("--analysis-cache", action="store_true",
+                        help="Enable an in-memory per-college analysis cache (repeat requests of a workload hit it).")
+    parser.add_argument("--no-context-compaction", action="store_true",
+                        help="Keep the full per-college history in the sequential coordinator's context.")
+    parser.add_argument("--recordings", help="JSON file with recorded responses (see testing/fakes.py DEFAULT_RECORDINGS).")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Earlier results file; exit with status 1 on regressions against it.")
+    parser.add_argument("--latency-tolerance", type=float, default=DEFAULT_LATENCY_TOLERANCE,
+                        help="Allowed relative p50 latency increase over the baseline.")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Selects the graph variant to benchmark. Must run before insight_agent.agent is imported, since
+    its mode settings are read at import time (the graph itself is built on first use)."""
+    os.environ["INSIGHT_COORDINATOR_MODE"] = args.coordinator_mode
+    os.environ["INSIGHT_PRESENTER_MODE"] = args.presenter_mode
+    # The Vertex AI retrieval tool runs with a stand-in beneath it; keep the on-disk caches out of the runs.
+    os.environ["RAG_BACKEND"] = "vertex"
+    os.environ.pop("RAG_CACHE_PATH", None)
+    os.environ["INSIGHT_ANALYSIS_CACHE"] = "1" if args.analysis_cache else "0"
+    os.environ["ANALYSIS_CACHE_PATH"] = ""
+    os.environ["FRESHNESS_DB_PATH"] = ""
+    os.environ["INSIGHT_CONTEXT_COMPACTION"] = "0" if args.no_context_compaction else "1"
+
+
+def load_agent_graph(args):
+    """Imports the configured agent graph, then swaps in the offline stand-ins."""
+    from insight_agent.agent import get_root_agent
+    from insight_agent.testing.fakes import install_standins, load_recordings, scaled_latency
+
+    root_agent = get_root_agent()
+    install_standins(root_agent, load_recordings(args.recordings), scaled_latency(args.latency_scale))
+    return root_agent
+
+
+def _request_metrics(summary):
+    metrics = {"model_calls": 0, "tool_calls": 0, "agent_runs": 0, "input_tokens": 0, "output_tokens": 0,
+               "max_context_tokens": 0}
+    for key, stats in summary["spans"].items():
+        kind = key.split(":", 1)[0]
+        metrics[f"{kind}_calls" if kind != "agent" else "agent_runs"] += stats["count"]
+        if kind == "model":
+            metrics["input_tokens"] += stats["input_tokens"]
+            metrics["output_tokens"] += stats["output_tokens"]
+            # Largest prompt of any single turn: stays flat as colleges are added when compaction works.
+            metrics["max_context_tokens"] = max(metrics["max_context_tokens"], stats.get("context_tokens_max", 0))
+    metrics["calls_by_span"] = {key: stats["count"] for key, stats in sorted(summary["spans"].items())}
+    return metrics
+
+
+def _compaction_delta(before, after):
+    return {key: after.get(key, 0) - before.get(key, 0) for key in
+            ("compactions", "estimated_tokens_removed", "final_outputs_assembled", "blocks_restored")}
+
+
+async def run_workload(root_agent, aggregator, college_count, repeat):
+    from insight_agent.compaction import get_compaction_stats
+    from insight_agent.runtime import run_agent_to_text
+
+    query = build_query(college_count)
+    runs = []
+    for _ in range(repeat):
+        aggregator.reset()
+        compaction_before = get_compaction_stats()
+        started = time.perf_counter()
+        text = await run_agent_to_text(root_agent, query)
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        run = {"latency_ms": round(latency_ms, 2), "output_chars": len(text)}
+        run.update(_request_metrics(aggregator.summary()))
+        run["compaction"] = _compaction_delta(compaction_before, get_compaction_stats())
+        runs.append(run)
+
+    latencies = np.array([run["latency_ms"] for run in runs])
+    first = runs[0]
+    return {
+        "colleges": college_count,
+        "requests": repeat,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "mean": round(float(latencies.mean()), 2),
+            "min": round(float(latencies.min()), 2),
+            "max": round(float(latencies.max()), 2),
+        },
+        # Call and token counts are deterministic with replayed responses; report the first run.
+        **{key: first[key] for key in ("model_calls", "tool_calls", "agent_runs", "input_tokens",
+                                       "output_tokens", "max_context_tokens", "calls_by_span", "compaction")},
+        "runs": runs,
+    }
+
+
+def compare_to_baseline(results, baseline, latency_tolerance):
+    """Returns human-readable regressions of `results` against `baseline` (matched by college count)."""
+    regressions = []
+    previous = {workload["colleges"]: workload for workload in baseline.get("workloads", [])}
+    for workload in results["workloads"]:
+        before = previous.get(workload["colleges"])
+        if before is None:
+            continue
+        label = f"{workload['colleges']} colleges"
+        for metric in ("model_calls", "tool_calls", "input_tokens", "output_tokens", "max_context_tokens"):
+            if metric in before and workload[metric] > before[metric]:
+                regressions.append(f"{label}: {metric} {before[metric]} -> {workload[metric]}")
+        for key, count in workload["calls_by_span"].items():
+            if count > before["calls_by_span"].get(key, 0):
+                regressions.append(f"{label}: {key} calls {before['calls_by_span'].get(key, 0)} -> {count}")
+        if workload["latency_ms"]["p50"] > before["latency_ms"]["p50"] * (1.0 + latency_tolerance):
+            regressions.append(f"{label}: p50 latency {before['latency_ms']['p50']:.0f} ms -> "
+                               f"{workload['latency_ms']['p50']:.0f} ms")
+    return regressions
+
+
+async def run_benchmark(args):
+    from insight_agent.tracing import SpanAggregator, Tracer
+
+    root_agent = load_agent_graph(args)
+    aggregator = SpanAggregator()
+    Tracer([aggregator]).instrument(root_agent)
+
+    college_counts = [int(count) for count in args.colleges.split(",") if count.strip()]
+    if max(college_counts) > len(BENCHMARK_COLLEGES):
+        raise SystemExit(f"At most {len(BENCHMARK_COLLEGES)} colleges are available for workloads.")
+    workloads = []
+    for college_count in college_counts:
+        workload = await run_workload(root_agent, aggregator, college_count, args.repeat)
+        workloads.append(workload)
+        print(f"{college_count:>3} colleges: p50 {workload['latency_ms']['p50']:>10.1f} ms  "
+              f"model calls {workload['model_calls']:>5}  tool calls {workload['tool_calls']:>5}  "
+              f"tokens {workload['input_tokens']:>8} in / {workload['output_tokens']:>6} out  "
+              f"max context {workload['max_context_tokens']:>7}  "
+              f"compactions {workload['compaction']['compactions']:>4} "
+              f"(~{workload['compaction']['estimated_tokens_removed']} tokens removed, "
+              f"{workload['compaction']['blocks_restored']} blocks restored)")
+    return {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "coordinator_mode": args.coordinator_mode,
+            "presenter_mode": args.presenter_mode,
+            "analysis_cache": args.analysis_cache,
+            "context_compaction": not args.no_context_compaction,
+            "latency_scale": args.latency_scale,
+            "repeat": args.repeat,
+            "recordings": args.recordings,
+        },
+        "workloads": workloads,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    results = asyncio.run(run_benchmark(args))
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to '{args.output}'.")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("coordinator_mode") != args.coordinator_mode or \
+                baseline.get("config", {}).get("presenter_mode") != args.presenter_mode:
+            print("WARNING: the baseline was recorded with a different coordinator/presenter mode.")
+        regressions = compare_to_baseline(results, baseline, args.latency_tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
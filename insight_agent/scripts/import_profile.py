@@ -0,0 +1,141 @@
+# insight_agent/scripts/import_profile.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Ensure the insight_agent package root is in the Python path
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+DEFAULT_MODULE = "insight_agent.agent"
+# Written to stderr right before the profiled import, so interpreter start-up imports are excluded.
+_START_MARKER = "--- import_profile start ---"
+_IMPORTTIME_PREFIX = "import time:"
+
+# Runs in a fresh interpreter with -X importtime; prints the build time of the graph when asked.
+_PROFILE_CODE = """
+import json, sys, time
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+started = time.perf_counter()
+import {module}
+result = {{"import_ms": (time.perf_counter() - started) * 1000.0}}
+if {build!r}:
+    from insight_agent.agent import get_root_agent
+    started = time.perf_counter()
+    get_root_agent()
+    result["build_ms"] = (time.perf_counter() - started) * 1000.0
+print(json.dumps(result))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Profile the cold-start import time of the Project Insight package with python -X importtime.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help=f"Module to import (default: {DEFAULT_MODULE}).")
+    parser.add_argument("--build", action="store_true",
+                        help="Also build the agent graph (get_root_agent) and report how long it takes.")
+    parser.add_argument("--top", type=int, default=20, help="Number of modules to list.")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("INSIGHT_IMPORT_BUDGET_MS", "0")) or None,
+                        help="Cold-start budget in ms (import, plus build with --build); exit with status 1 "
+                             "when exceeded. Defaults to INSIGHT_IMPORT_BUDGET_MS.")
+    parser.add_argument("--json", action="store_true", help="Print the raw profile as JSON.")
+    return parser.parse_args(argv)
+
+
+def parse_importtime(stderr_text):
+    """Parses `-X importtime` output after the start marker into per-module records.
+
+    Each record has the module name, its own import time, the cumulative time including its
+    imports (both in ms) and its nesting depth (0 = imported directly by the profiled code).
+    """
+    lines = stderr_text.splitlines()
+    if _START_MARKER in lines:
+        lines = lines[lines.index(_START_MARKER) + 1:]
+    records = []
+    for line in lines:
+        if not line.startswith(_IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(_IMPORTTIME_PREFIX):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line.
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        records.append({
+            "module": stripped,
+            "self_ms": int(fields[0]) / 1000.0,
+            "cumulative_ms": int(fields[1]) / 1000.0,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+        })
+    return records
+
+
+def summarize_profile(records):
+    by_package = defaultdict(lambda: {"modules": 0, "self_ms": 0.0})
+    for record in records:
+        package = by_package[record["module"].split(".", 1)[0]]
+        package["modules"] += 1
+        package["self_ms"] += record["self_ms"]
+    return {
+        "total_ms": sum(record["cumulative_ms"] for record in records if record["depth"] == 0),
+        "modules": len(records),
+        "by_package": dict(by_package),
+    }
+
+
+def profile_import(module, build=False):
+    """Imports `module` in a fresh interpreter and returns (records, timings)."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT_DIR, env.get("PYTHONPATH")]))
+    code = _PROFILE_CODE.format(marker=_START_MARKER, module=module, build=build)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                               cwd=PROJECT_ROOT_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith(_IMPORTTIME_PREFIX)]
+        raise RuntimeError(f"Importing '{module}' failed:\n" + "\n".join(errors[-20:]))
+    return parse_importtime(completed.stderr), json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        records, timings = profile_import(args.module, build=args.build)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    summary = summarize_profile(records)
+    cold_start_ms = timings["import_ms"] + timings.get("build_ms", 0.0)
+
+    if args.json:
+        print(json.dumps({"module": args.module, "timings": timings, "summary": summary, "records": records}, indent=2))
+    else:
+        print(f"Import of '{args.module}': {timings['import_ms']:.1f} ms wall, "
+              f"{summary['total_ms']:.1f} ms in {summary['modules']} module imports"
+              f"{' (including those made by the build)' if args.build else ''}")
+        if "build_ms" in timings:
+            print(f"Agent graph build (get_root_agent): {timings['build_ms']:.1f} ms")
+
+        print(f"\n{'package':<30} {'modules':>8} {'self ms':>10}")
+        for package, stats in sorted(summary["by_package"].items(), key=lambda item: -item[1]["self_ms"])[:args.top]:
+            print(f"{package:<30} {stats['modules']:>8} {stats['self_ms']:>10.1f}")
+
+        print(f"\n{'module':<55} {'self ms':>10} {'cumul. ms':>10}")
+        for record in sorted(records, key=lambda record: -record["self_ms"])[:args.top]:
+            print(f"{record['module']:<55} {record['self_ms']:>10.1f} {record['cumulative_ms']:>10.1f}")
+
+    if args.budget_ms is not None:
+        if cold_start_ms > args.budget_ms:
+            print(f"\nCold start {cold_start_ms:.1f} ms exceeds the budget of {args.budget_ms:.0f} ms.")
+            return 1
+        print(f"\nCold start {cold_start_ms:.1f} ms is within the budget of {args.budget_ms:.0f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
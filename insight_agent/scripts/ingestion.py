@@ -1,11 +1,21 @@
 # insight_agent/scripts/ingestion.py
 
+import argparse
+import concurrent.futures
+import hashlib
+import json
 import os
+import random
 import sys
+import threading
+import time
 from dotenv import load_dotenv
 
 # Ensure the insight_agent package root is in the Python path
 # This allows a_i_m_l_path_to_insert_sys_path_statement_for_insight_agent
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
 
 try:
     import vertexai
@@ -34,6 +44,19 @@ RAG_CORPUS_ENV_VAR = os.getenv("RAG_CORPUS")
 CORPUS_DEFAULT_DISPLAY_NAME = "Project Insight College Data Corpus"
 CORPUS_DEFAULT_DESCRIPTION = "Corpus containing data about US colleges for Project Insight RAG."
 
+# Bulk ingestion settings
+DEFAULT_MAX_IN_FLIGHT_UPLOADS = int(os.getenv("INGESTION_MAX_IN_FLIGHT", 8))
+DEFAULT_MAX_UPLOAD_ATTEMPTS = 5
+DEFAULT_MANIFEST_PATH = os.path.join(PROJECT_ROOT_DIR, '.insight_index', 'ingestion_manifest.json')
+# Transient API errors worth retrying with exponential backoff.
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+)
+
 # --- Helper Functions --- 
 
 def init_vertex_ai():
@@ -135,9 +158,498 @@ def list_files_in_rag_corpus(corpus_resource_name):
         print(f"  Error listing files: {e}")
         traceback.print_exc()
 
+def invalidate_retrieval_cache(corpus_resource_name):
+    """Invalidates cached RAG retrievals and per-college analyses for the corpus so agents don't serve
+    pre-ingestion results."""
+    from insight_agent.analysis_cache import invalidate_analysis_cache
+    from insight_agent.rag_cache import invalidate_corpus
+    if invalidate_corpus(corpus_resource_name):
+        print(f"Invalidated cached retrievals for corpus '{corpus_resource_name}'.")
+    else:
+        print("RAG_CACHE_PATH not set; no shared retrieval cache to invalidate (in-process caches expire via TTL).")
+    removed = invalidate_analysis_cache(corpus_resource_name)
+    if removed is not None:
+        print(f"Invalidated {removed} cached college analyses for corpus '{corpus_resource_name}'.")
+
+def build_college_stats_index(file_paths, index_path=None):
+    """Extracts CDS/IPEDS statistics from the source files into the memory-mapped stats table.
+
+    The table backs RAGAgent's `lookup_college_stats` tool, so exact figures no longer need a
+    vector search plus LLM extraction on every query.
+    """
+    from insight_agent.college_stats import DEFAULT_STATS_INDEX_PATH, extract_stats_from_files, write_stats_index
+    index_path = index_path or os.getenv("COLLEGE_STATS_INDEX_PATH") or DEFAULT_STATS_INDEX_PATH
+    try:
+        records = extract_stats_from_files(file_paths)
+        row_count = write_stats_index(records, index_path)
+        print(f"Wrote college statistics index with {row_count} colleges to '{index_path}'.")
+        return True
+    except (OSError, ValueError) as e:
+        print(f"Error building college statistics index: {e}")
+        return False
+
+def build_college_entity_index(file_paths, index_path=None):
+    """Builds the college entity index (canonical names, aliases) from the colleges the source files name.
+
+    Agents use it to map "UCB", "Cal" or "UC Berkeley" to one college for queries and cache keys.
+    """
+    from insight_agent.entities import DEFAULT_ENTITY_INDEX_PATH, build_entities, write_entity_index
+    index_path = index_path or os.getenv("COLLEGE_ENTITY_INDEX_PATH") or DEFAULT_ENTITY_INDEX_PATH
+    try:
+        entities = build_entities(file_paths)
+        count = write_entity_index(entities, index_path)
+        in_corpus = sum(1 for entity in entities.values() if entity["sources"])
+        print(f"Wrote college entity index with {count} colleges ({in_corpus} named in the corpus) to '{index_path}'.")
+        return True
+    except (OSError, ValueError) as e:
+        print(f"Error building college entity index: {e}")
+        return False
+
+# --- Bulk Ingestion ---
+
+def discover_source_files(data_dir):
+    """Returns all non-hidden files under data_dir, sorted for deterministic processing."""
+    found = []
+    for dir_path, dir_names, file_names in os.walk(data_dir):
+        dir_names[:] = sorted(d for d in dir_names if not d.startswith('.'))
+        found.extend(os.path.join(dir_path, name) for name in sorted(file_names) if not name.startswith('.'))
+    return found
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Content hash used by the manifest to detect unchanged files."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class IngestionManifest:
+    """Local record of what has been uploaded: source key -> content hash and RAG file name.
+
+    Saved after every completed upload so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("files", {})
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def record(self, key, **fields):
+        with self._lock:
+            self.entries[key] = dict(fields, updated_at=time.time())
+            self._save_locked()
+
+    def remove(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+            self._save_locked()
+
+    def dependents(self, keys):
+        """Keys whose de-duplicated content was matched against any of `keys`, directly or through
+        another dependent."""
+        found, frontier = set(), set(keys)
+        with self._lock:
+            while frontier:
+                frontier = {key for key, entry in self.entries.items()
+                            if key not in found and frontier & set(entry.get("depends_on") or ())}
+                found |= frontier
+        return found
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def upload_with_retry(rag_module, corpus_resource_name, file_path, display_name,
+                      max_attempts=DEFAULT_MAX_UPLOAD_ATTEMPTS, base_delay=1.0, max_delay=30.0,
+                      retryable_exceptions=RETRYABLE_EXCEPTIONS, sleep=time.sleep):
+    """Calls rag_module.upload_file, retrying transient errors with jittered exponential backoff.
+
+    Returns (rag_file, attempts). Non-retryable errors, and the last retryable one, are raised.
+    At least one attempt is always made.
+    """
+    max_attempts = max(1, max_attempts)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            rag_file = rag_module.upload_file(
+                corpus_name=corpus_resource_name,
+                path=file_path,
+                display_name=display_name,
+                description=f"Uploaded file {display_name}"
+            )
+            return rag_file, attempt
+        except retryable_exceptions as e:
+            if attempt == max_attempts:
+                raise
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+            print(f"  Retryable error uploading '{display_name}' (attempt {attempt}/{max_attempts}): {e}. Retrying in {delay:.1f}s.")
+            sleep(delay)
+
+def bulk_ingest(corpus_resource_name, file_paths, root_dir, rag_module=None, manifest_path=DEFAULT_MANIFEST_PATH,
+                max_in_flight=DEFAULT_MAX_IN_FLIGHT_UPLOADS, max_attempts=DEFAULT_MAX_UPLOAD_ATTEMPTS,
+                base_delay=1.0, retryable_exceptions=RETRYABLE_EXCEPTIONS, sleep=time.sleep, prepare=None):
+    """Uploads many files with a bounded worker pool, skipping files whose content is unchanged.
+
+    Files whose hash differs from the manifest are re-uploaded and the previous RAG file is deleted.
+    A file is only unchanged if the manifest recorded it for this same corpus, and if the files its
+    de-duplicated content was matched against are unchanged as well.
+    `rag_module` defaults to vertexai.rag; any object with upload_file/delete_file works, which
+    lets the pipeline run against a local fake. `prepare(file_path, key)` returns (upload_path,
+    depends_on): a different path to upload (e.g. a preprocessed copy) or None when nothing is left
+    to upload, and the keys of the files that hold the content it dropped as duplicates. Files are
+    prepared one at a time in key order, so the result does not depend on upload timing.
+    Returns a summary dict with throughput figures.
+    """
+    rag_module = rag_module or rag
+    manifest = IngestionManifest(manifest_path)
+    summary = {"uploaded": 0, "replaced": 0, "skipped": 0, "deduplicated": 0, "failed": 0, "retries": 0, "bytes": 0}
+    keys = {file_path: os.path.relpath(file_path, root_dir) for file_path in file_paths}
+
+    def recorded(key):
+        entry = manifest.get(key)
+        # Recorded for another corpus (RAG_CORPUS changed): upload again and leave that corpus's file alone.
+        return entry if entry and entry.get("corpus") == corpus_resource_name else None
+
+    def content_hash_of(file_path):
+        try:
+            return file_sha256(file_path)
+        except OSError as e:
+            print(f"  Failed to read '{file_path}': {e}")
+            return None
+
+    def upload_one(key, content_hash, upload_path, depends_on):
+        previous = recorded(key)
+        if upload_path is None:
+            rag_file, attempts, size, outcome = None, 1, 0, "deduplicated"
+        else:
+            rag_file, attempts = upload_with_retry(
+                rag_module, corpus_resource_name, upload_path, key,
+                max_attempts=max_attempts, base_delay=base_delay,
+                retryable_exceptions=retryable_exceptions, sleep=sleep
+            )
+            size, outcome = os.path.getsize(upload_path), "uploaded"
+        manifest.record(key, sha256=content_hash, size=size, corpus=corpus_resource_name,
+                        rag_file_name=getattr(rag_file, 'name', None), depends_on=depends_on)
+        if previous and previous.get("rag_file_name"):
+            # Replace: the new version is in place, now drop the stale one.
+            try:
+                rag_module.delete_file(name=previous["rag_file_name"])
+            except Exception as e:
+                print(f"  Warning: could not delete previous version of '{key}' ({previous['rag_file_name']}): {e}")
+            if outcome == "uploaded":
+                outcome = "replaced"
+        return outcome, size, attempts - 1
+
+    def count(file_path, outcome, size=0, retries=0):
+        summary[outcome] += 1
+        summary["bytes"] += size
+        summary["retries"] += retries
+        if outcome != "skipped":
+            print(f"  {outcome.capitalize()}: {keys[file_path]}")
+
+    started = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        hashes = dict(zip((keys[path] for path in file_paths), pool.map(content_hash_of, file_paths)))
+        stale = {key for key, content_hash in hashes.items()
+                 if content_hash is not None and (recorded(key) or {}).get("sha256") != content_hash}
+        # Content dropped as a duplicate lives in the file it matched: re-ingest a file whenever one of
+        # those changes or is no longer in the manifest (deleted), until no more files become stale.
+        growing = True
+        while growing:
+            growing = False
+            for key in hashes.keys() - stale:
+                depends_on = (recorded(key) or {}).get("depends_on") or {}
+                if hashes[key] is not None and any(
+                        dep in stale or (recorded(dep) or {}).get("sha256") != dep_hash
+                        for dep, dep_hash in depends_on.items()):
+                    stale.add(key)
+                    growing = True
+
+        futures = {}
+        for file_path in sorted(file_paths, key=keys.get):
+            key = keys[file_path]
+            if hashes[key] is None:
+                count(file_path, "failed")
+                continue
+            if key not in stale:
+                count(file_path, "skipped")
+                continue
+            try:
+                upload_path, depends_on = prepare(file_path, key) if prepare else (file_path, [])
+            except Exception as e:
+                print(f"  Failed to prepare '{file_path}': {e}")
+                count(file_path, "failed")
+                continue
+            depends_on = {dep: hashes.get(dep) or (recorded(dep) or {}).get("sha256") for dep in depends_on}
+            futures[pool.submit(upload_one, key, hashes[key], upload_path, depends_on)] = file_path
+        for future in concurrent.futures.as_completed(futures):
+            file_path = futures[future]
+            try:
+                outcome, size, retries = future.result()
+            except Exception as e:
+                print(f"  Failed to ingest '{file_path}': {e}")
+                outcome, size, retries = "failed", 0, 0
+            count(file_path, outcome, size, retries)
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    transferred = summary["uploaded"] + summary["replaced"]
+    summary["elapsed_seconds"] = elapsed
+    summary["files_per_second"] = transferred / elapsed
+    summary["bytes_per_second"] = summary["bytes"] / elapsed
+    print(
+        f"\nBulk ingestion: {summary['uploaded']} uploaded, {summary['replaced']} replaced, "
+        f"{summary['skipped']} unchanged, {summary['deduplicated']} fully deduplicated, {summary['failed']} failed, {summary['retries']} retries "
+        f"in {elapsed:.1f}s ({summary['files_per_second']:.2f} files/s, {summary['bytes_per_second'] / 1024:.1f} KiB/s)."
+    )
+    return summary
+
+def make_preprocessor(staging_dir):
+    """Returns a bulk_ingest `prepare` hook that chunks, normalizes and de-duplicates each file.
+
+    One MinHash index is shared across files, so text repeated verbatim or with only formatting
+    changes is only uploaded once; the hook reports which files hold the text it dropped. Chunks
+    whose figures or headers differ (e.g. consecutive CDS years) are always kept.
+    """
+    from insight_agent.preprocess import MinHashDeduper, stage_preprocessed_file
+    deduper = MinHashDeduper()
+
+    def prepare(file_path, key):
+        staged_path, stats = stage_preprocessed_file(file_path, staging_dir, deduper, source=key)
+        print(f"  Preprocessed {key}: {stats['chunks_kept']} chunks kept, {stats['chunks_dropped']} near-duplicates "
+              f"dropped ({stats['bytes_in']} -> {stats['bytes_out']} bytes).")
+        return staged_path, stats["duplicate_of"]
+
+    return prepare
+
+# --- Watch Mode ---
+
+def snapshot_source_files(data_dir):
+    """Maps each source key (path relative to data_dir) to (mtime, size), the cheap per-poll change signal."""
+    snapshot = {}
+    for file_path in discover_source_files(data_dir):
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            continue  # Removed between the walk and the stat; the next poll sees it as gone.
+        snapshot[os.path.relpath(file_path, data_dir)] = (st.st_mtime, st.st_size)
+    return snapshot
+
+def delete_removed_sources(keys, rag_module=None, manifest_path=DEFAULT_MANIFEST_PATH):
+    """Deletes the RAG files of sources that no longer exist and drops them from the manifest.
+
+    Returns (deleted, failed). A failed delete keeps its manifest entry, so the next sync retries it.
+    """
+    rag_module = rag_module or rag
+    manifest = IngestionManifest(manifest_path)
+    deleted = failed = 0
+    for key in keys:
+        entry = manifest.get(key)
+        if entry is None:
+            continue
+        if entry.get("rag_file_name"):
+            try:
+                rag_module.delete_file(name=entry["rag_file_name"])
+            except Exception as e:
+                print(f"  Failed to delete RAG file for removed source '{key}' ({entry['rag_file_name']}): {e}")
+                failed += 1
+                continue
+        manifest.remove(key)
+        deleted += 1
+        print(f"  Deleted: {key}")
+    return deleted, failed
+
+class DataDirWatcher:
+    """Keeps the RAG corpus in sync with the data directory by polling it and syncing only deltas.
+
+    Changes are debounced: a sync runs once the tree has been quiet for `debounce` seconds (or
+    `max_delay` seconds after the first pending change), so a burst of edits becomes one batch.
+    New and modified files go through bulk_ingest (which skips content-identical files and replaces
+    modified ones); removed files have their RAG files deleted. The ingestion manifest is the
+    persistent state, so on start-up the watcher reconciles whatever changed while it was down.
+    """
+
+    def __init__(self, corpus_resource_name, data_dir, rag_module=None, manifest_path=DEFAULT_MANIFEST_PATH,
+                 poll_interval=2.0, debounce=5.0, max_delay=60.0, max_in_flight=DEFAULT_MAX_IN_FLIGHT_UPLOADS,
+                 preprocess_dir=None, metrics_path=None, on_sync=None):
+        self.corpus = corpus_resource_name
+        self.data_dir = data_dir
+        self.rag_module = rag_module
+        self.manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.max_in_flight = max_in_flight
+        self.preprocess_dir = preprocess_dir
+        self.metrics_path = metrics_path
+        self.on_sync = on_sync
+        self.syncs = []
+
+    def sync(self, keys, snapshot, detected_at=None, initial=False):
+        """Uploads the present `keys`, deletes the removed ones and returns this sync's metrics."""
+        started = time.time()
+        present = sorted(k for k in keys if k in snapshot)
+        removed = sorted(k for k in keys if k not in snapshot)
+        # Files de-duplicated against a changed or removed file are re-checked too; removed files are
+        # deleted first, so bulk_ingest sees that the content those files relied on is gone.
+        dependents = IngestionManifest(self.manifest_path).dependents(keys) - set(keys)
+        ingest = sorted(set(present) | {k for k in dependents if k in snapshot})
+        removed += sorted(k for k in dependents if k not in snapshot)
+        deleted, delete_failed = delete_removed_sources(removed, self.rag_module, self.manifest_path) if removed else (0, 0)
+        # A fresh de-duplication index per sync: a modified file must not be matched against its own old version.
+        prepare = make_preprocessor(self.preprocess_dir) if self.preprocess_dir else None
+        summary = {"uploaded": 0, "replaced": 0, "skipped": 0, "deduplicated": 0, "failed": 0}
+        if ingest:
+            summary.update(bulk_ingest(self.corpus, [os.path.join(self.data_dir, k) for k in ingest], self.data_dir,
+                                       rag_module=self.rag_module, manifest_path=self.manifest_path,
+                                       max_in_flight=self.max_in_flight, prepare=prepare))
+        finished = time.time()
+
+        changed = summary["uploaded"] + summary["replaced"] + summary["deduplicated"] + deleted
+        if changed:
+            invalidate_retrieval_cache(self.corpus)
+            source_paths = [os.path.join(self.data_dir, k) for k in sorted(snapshot)]
+            build_college_stats_index(source_paths)
+            build_college_entity_index(source_paths)
+
+        # Sync lag: from the change (file mtime, or first detection for deletions) to the corpus reflecting it.
+        detected_at = detected_at or {}
+        lags = [finished - snapshot[k][0] for k in present] + [finished - detected_at.get(k, started) for k in removed]
+        metrics = {
+            "synced_at": finished,
+            "initial": initial,
+            "files": len(keys),
+            "uploaded": summary["uploaded"],
+            "replaced": summary["replaced"],
+            "unchanged": summary["skipped"],
+            "deduplicated": summary["deduplicated"],
+            "deleted": deleted,
+            "failed": summary["failed"] + delete_failed,
+            "sync_seconds": round(finished - started, 3),
+        }
+        if lags and not initial:
+            lags.sort()
+            metrics["lag_p50_s"] = round(lags[len(lags) // 2], 3)
+            metrics["lag_max_s"] = round(lags[-1], 3)
+        self.syncs.append(metrics)
+        self._emit(metrics)
+        return metrics
+
+    def _emit(self, metrics):
+        lag = f", sync lag p50 {metrics['lag_p50_s']:.1f}s / max {metrics['lag_max_s']:.1f}s" if "lag_p50_s" in metrics else ""
+        print(f"[watch] {'Start-up reconcile' if metrics['initial'] else 'Sync'}: {metrics['uploaded']} uploaded, "
+              f"{metrics['replaced']} replaced, {metrics['deleted']} deleted, {metrics['unchanged']} unchanged, "
+              f"{metrics['failed']} failed in {metrics['sync_seconds']:.1f}s{lag}.")
+        if self.metrics_path:
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(metrics) + "\n")
+        if self.on_sync:
+            self.on_sync(metrics)
+
+    def run(self, stop_event=None):
+        """Polls until `stop_event` is set (or KeyboardInterrupt). Returns the list of sync metrics."""
+        stop_event = stop_event or threading.Event()
+        snapshot = snapshot_source_files(self.data_dir)
+        # Start-up reconcile: every present file (unchanged ones are skipped by hash) plus manifest entries whose source is gone.
+        self.sync(set(snapshot) | set(IngestionManifest(self.manifest_path).entries), snapshot, initial=True)
+        print(f"[watch] Watching '{self.data_dir}' (poll {self.poll_interval:g}s, debounce {self.debounce:g}s). Ctrl-C to stop.")
+
+        pending = {}  # key -> wall time the change was first seen
+        first_pending = last_change = None
+        failed_syncs, retry_at = 0, 0.0
+        try:
+            while not stop_event.wait(self.poll_interval):
+                current = snapshot_source_files(self.data_dir)
+                now = time.time()
+                changed = {k for k in set(snapshot) | set(current) if snapshot.get(k) != current.get(k)}
+                snapshot = current
+                if changed:
+                    for key in changed:
+                        pending.setdefault(key, now)
+                    first_pending = first_pending or now
+                    last_change = now
+                if pending and now >= retry_at and (now - last_change >= self.debounce or now - first_pending >= self.max_delay):
+                    try:
+                        metrics = self.sync(set(pending), snapshot, detected_at=pending)
+                    except Exception as e:
+                        metrics = {"failed": True}
+                        print(f"[watch] Sync failed: {e}")
+                    if metrics["failed"]:
+                        # Retry the batch after another quiet period, waiting longer after each failed
+                        # attempt (up to max_delay); files that did sync are skipped by hash.
+                        failed_syncs += 1
+                        first_pending = last_change = now
+                        retry_at = now + min(self.max_delay, self.debounce * 2 ** (failed_syncs - 1))
+                        continue
+                    pending, first_pending, last_change = {}, None, None
+                    failed_syncs, retry_at = 0, 0.0
+        except KeyboardInterrupt:
+            print("\n[watch] Stopped.")
+        return self.syncs
+
 # --- Main Ingestion Logic ---
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest college data files into the Project Insight RAG corpus.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Ingest every file under the data directory concurrently, skipping unchanged files.")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_ROOT_DIR, 'data'),
+                        help="Source directory for --bulk and --watch (default: <project>/data).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_IN_FLIGHT_UPLOADS,
+                        help="Maximum number of in-flight uploads for --bulk and --watch.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH,
+                        help="Path of the content-hash manifest used by --bulk and --watch.")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Chunk, normalize and de-duplicate files before uploading them.")
+    parser.add_argument("--staging-dir", default=os.path.join(PROJECT_ROOT_DIR, '.insight_index', 'staging'),
+                        help="Where --preprocess writes the files it uploads.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and sync new, modified and removed files under the data directory as they change.")
+    parser.add_argument("--poll-interval", type=float, default=float(os.getenv("INGESTION_POLL_INTERVAL_S", 2)),
+                        help="Seconds between scans of the data directory in --watch mode.")
+    parser.add_argument("--debounce", type=float, default=float(os.getenv("INGESTION_DEBOUNCE_S", 5)),
+                        help="Quiet period in seconds after the last change before --watch syncs a batch.")
+    parser.add_argument("--max-delay", type=float, default=float(os.getenv("INGESTION_MAX_SYNC_DELAY_S", 60)),
+                        help="Longest a pending change waits for a quiet period before --watch syncs anyway.")
+    parser.add_argument("--metrics-file",
+                        help="With --watch: append one JSON line of sync metrics (counts, sync lag) per sync.")
+    return parser.parse_args(argv)
+
+def run_bulk_ingestion(target_corpus_name, args):
+    """Bulk mode: concurrent, resumable ingestion of the whole data directory."""
+    file_paths = discover_source_files(args.data_dir)
+    if not file_paths:
+        print(f"No files found under '{args.data_dir}'.")
+        return
+    print(f"Found {len(file_paths)} files under '{args.data_dir}'.")
+    prepare = make_preprocessor(args.staging_dir) if args.preprocess else None
+    summary = bulk_ingest(target_corpus_name, file_paths, args.data_dir,
+                          manifest_path=args.manifest, max_in_flight=args.workers, prepare=prepare)
+    # A fully deduplicated file also deletes its previous RAG file, so cached retrievals of it are stale too.
+    if summary["uploaded"] or summary["replaced"] or summary["deduplicated"]:
+        invalidate_retrieval_cache(target_corpus_name)
+    build_college_stats_index(file_paths)
+    build_college_entity_index(file_paths)
+
+def run_watch_ingestion(target_corpus_name, args):
+    """Watch mode: long-running delta sync of the data directory."""
+    os.makedirs(args.data_dir, exist_ok=True)
+    watcher = DataDirWatcher(target_corpus_name, args.data_dir, manifest_path=args.manifest,
+                             poll_interval=args.poll_interval, debounce=args.debounce, max_delay=args.max_delay,
+                             max_in_flight=args.workers, preprocess_dir=args.staging_dir if args.preprocess else None,
+                             metrics_path=args.metrics_file)
+    watcher.run()
+
+def main(argv=None):
     """Main function to run the ingestion process."""
+    args = parse_args(argv)
     print("Starting RAG data ingestion process...")
     init_vertex_ai()
 
@@ -150,6 +662,16 @@ def main():
         print("Could not obtain a valid RAG corpus. Exiting ingestion.")
         return
 
+    if args.watch:
+        run_watch_ingestion(target_corpus_name, args)
+        print("\nIngestion process finished.")
+        return
+
+    if args.bulk:
+        run_bulk_ingestion(target_corpus_name, args)
+        print("\nIngestion process finished.")
+        return
+
     project_root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     data_dir = os.path.join(project_root_dir, 'data')
     
@@ -183,12 +705,18 @@ def main():
         print("No sample files configured or found to upload.")
         return # Exit if no files to upload
 
+    prepare = make_preprocessor(args.staging_dir) if args.preprocess else None
+
     successful_uploads = 0
     for file_info in sample_files_to_upload:
         if os.path.exists(file_info["path"]):
+            upload_path, _ = prepare(file_info["path"], file_info["display_name"]) if prepare else (file_info["path"], [])
+            if upload_path is None:
+                print(f"Skipping '{file_info['display_name']}': all of its content duplicates earlier files.")
+                continue
             if upload_file_to_rag_corpus(
                 target_corpus_name, # Pass the full resource name
-                file_info["path"],
+                upload_path,
                 file_info["display_name"]
             ):
                 successful_uploads += 1
@@ -196,6 +724,13 @@ def main():
             print(f"File not found, skipping: {file_info['path']}")
             
     print(f"\n{successful_uploads} out of {len(sample_files_to_upload)} files processed for upload.")
+
+    if successful_uploads:
+        invalidate_retrieval_cache(target_corpus_name)
+
+    sample_paths = [f["path"] for f in sample_files_to_upload if os.path.exists(f["path"])]
+    build_college_stats_index(sample_paths)
+    build_college_entity_index(sample_paths)
     
     list_files_in_rag_corpus(target_corpus_name) # Pass the full resource name
     print("\nIngestion process finished.")
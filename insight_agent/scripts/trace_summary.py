@@ -0,0 +1,53 @@
+# insight_agent/scripts/trace_summary.py
+
+import argparse
+import json
+import os
+import sys
+
+# Ensure the insight_agent package root is in the Python path
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from insight_agent.tracing import DEFAULT_TRACE_PATH, SpanAggregator, load_spans
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a Project Insight trace file (written with INSIGHT_TRACE=1).")
+    parser.add_argument("path", nargs="?", default=os.getenv("INSIGHT_TRACE_PATH", DEFAULT_TRACE_PATH),
+                        help="JSONL trace file (default: INSIGHT_TRACE_PATH or .insight_index/traces.jsonl).")
+    parser.add_argument("--json", action="store_true", help="Print the raw summary as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"Trace file '{args.path}' not found. Run the agent with INSIGHT_TRACE=1 first.")
+        return 1
+    aggregator = SpanAggregator()
+    for record in load_spans(args.path):
+        aggregator.export(record)
+    summary = aggregator.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"{'span':<45} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'in tok':>9} {'out tok':>9} {'retries':>8}")
+    for key, stats in sorted(summary["spans"].items(), key=lambda item: -item[1].get("p95_ms", 0)):
+        print(f"{key:<45} {stats['count']:>6} {stats.get('p50_ms', 0):>10.1f} {stats.get('p95_ms', 0):>10.1f} "
+              f"{stats['input_tokens']:>9} {stats['output_tokens']:>9} {stats['retries']:>8}")
+    if summary["calls_per_college"]:
+        print("\nCalls per college:")
+        for college, calls in sorted(summary["calls_per_college"].items()):
+            print(f"  {college}: {sum(calls.values())} ({', '.join(f'{k}={v}' for k, v in sorted(calls.items()))})")
+    if summary["remote_call_budgets"]:
+        print("\nRemote call budgets (maximum_remote_calls):")
+        for name, usage in sorted(summary["remote_call_budgets"].items()):
+            print(f"  {name}: max {usage['max_remote_calls']} of {usage['budget']} per run, exceeded {usage['exceeded']} times")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# insight_agent/singleflight.py
+#
+# Single-flight request coalescing: concurrent identical requests (e.g. many sessions asking
+# RAGAgent about the same college within seconds) share one underlying call, and its result is
+# fanned out to every waiter. Unlike the retrieval cache, nothing is kept after the call finishes.
+
+import asyncio
+import collections
+import os
+import re
+import threading
+
+from .entities import canonicalize_mentions
+from .rag_cache import normalize_query
+from .tracing import current_span
+
+# Specialists whose AgentTool calls are coalesced. Their answers depend only on the request text;
+# CodingAgent requests carry student-specific numbers and rarely repeat.
+DEFAULT_COALESCED_AGENTS = ("RAGAgent", "SearchAgent")
+
+# Words that do not change what a specialist is asked for ("RAGAgent, get comprehensive admission
+# statistics for X" and "Admission statistics for X" are the same request).
+_FILLER_WORDS = frozenset("""
+a an the for of at about on in to and or please get find give me show provide retrieve look up
+comprehensive detailed current latest any all its their this that
+ragagent searchagent codingagent
+""".split())
+# Words whose meaning depends on what they stand next to ("SAT scores not GPA" and "GPA not SAT
+# scores" are different requests); requests containing them, or numbers, keep their word order.
+_ORDER_WORDS = frozenset("""
+not no without except excluding but only instead rather than vs versus
+above below over under more less fewer higher lower before after
+""".split())
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def request_intent_key(text):
+    """Canonical college plus query intent: the request's content words, with college aliases
+    ("UCB", "Cal") replaced by the college's id (see entities.py). The words are order-insensitive
+    unless the request contains a negation, a comparison or a number."""
+    text = canonicalize_mentions(text, ids=True)
+    words = [word for word in _TOKEN_PATTERN.findall(normalize_query(text)) if word not in _FILLER_WORDS]
+    if _ORDER_WORDS.isdisjoint(words) and not any(word.isdigit() for word in words):
+        return " ".join(sorted(set(words)))
+    return "ordered: " + " ".join(words)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one execution.
+
+    `await do(key, factory)` runs `factory()` (a coroutine function) unless a call with the same
+    key is already in flight, in which case it waits for that call's result (or exception). The
+    shared call runs as its own task: a waiter that is cancelled (e.g. by its deadline) leaves the
+    call running for the others, and the call is only cancelled when no waiter is left.
+    Counters are kept per `group` (e.g. the tool name).
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(collections.Counter)
+
+    async def do(self, key, factory, group="default"):
+        # Tasks are bound to their event loop, so calls only coalesce within one loop.
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            entry = self._inflight.get(key)
+            coalesced = entry is not None
+            if entry is None:
+                entry = {"task": asyncio.ensure_future(factory()), "waiters": 0}
+                self._inflight[key] = entry
+                entry["task"].add_done_callback(lambda task, key=key, entry=entry: self._forget(key, entry))
+            entry["waiters"] += 1
+            self._counters[group]["calls"] += 1
+            self._counters[group]["coalesced" if coalesced else "executions"] += 1
+        if coalesced:
+            span = current_span()
+            if span is not None:
+                span.attributes["coalesced"] = True
+
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            with self._lock:
+                entry["waiters"] -= 1
+                abandoned = entry["waiters"] == 0 and not entry["task"].done()
+            if abandoned:
+                entry["task"].cancel()
+
+    def _forget(self, key, entry):
+        with self._lock:
+            if self._inflight.get(key) is entry:
+                del self._inflight[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self):
+        """Per-group and total call counts; coalescing_ratio is the share of calls that were served
+        by another call's execution."""
+        with self._lock:
+            groups = {group: dict(counts) for group, counts in self._counters.items()}
+        totals = collections.Counter()
+        for counts in groups.values():
+            totals.update(counts)
+        for counts in list(groups.values()) + [totals]:
+            counts["coalescing_ratio"] = counts.get("coalesced", 0) / counts["calls"] if counts.get("calls") else 0.0
+        return {"groups": groups, "total": dict(totals)}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+# --- Process-wide Default ---
+
+_default_singleflight = SingleFlight()
+
+
+def singleflight_enabled():
+    return os.getenv("INSIGHT_SINGLEFLIGHT", "").lower() in ("1", "true", "yes")
+
+
+def get_default_singleflight():
+    """The process-wide SingleFlight shared by the retrieval tools and the specialist AgentTools."""
+    return _default_singleflight
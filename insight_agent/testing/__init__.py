@@ -0,0 +1,5 @@
+# insight_agent/testing/__init__.py
+#
+# Test-only stand-ins (replayed models and tools, a quota-enforcing fake endpoint) used by the test
+# suite, scripts/benchmark.py and scripts/batch_analyze.py --offline. Nothing in the agent runtime
+# imports this package, and it must never be used to serve real requests.
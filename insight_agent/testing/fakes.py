@@ -0,0 +1,405 @@
+# insight_agent/testing/fakes.py
+#
+# Deterministic offline stand-ins for Gemini, Vertex AI RAG, Google Search and code execution.
+# Used by the tests and scripts/benchmark.py to exercise the real agent graph (tools, AgentTool
+# nesting, fan-out and presenter) without network access; each stand-in replays recorded responses
+# and sleeps for a configurable, simulated latency. Test-only: see insight_agent/testing/__init__.py.
+
+import asyncio
+import collections
+import copy
+import json
+import re
+import threading
+import time
+import types
+from typing import Any
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import FunctionTool
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from ..compaction import COMPACTED_CONTEXT_MARKER, RECORD_TOOL_NAME
+from ..coordinator_output import (
+    COLLEGE_BLOCK_END,
+    COLLEGE_BLOCK_START,
+    extract_college_blocks,
+    parse_coordinator_output,
+    render_coordinator_output,
+)
+from ..fanout import extract_college_names, summarize_profile
+from ..report import render_report
+from ..runtime import iter_agent_tree
+from ..tracing import estimate_tokens
+
+# Simulated latencies in milliseconds (multiplied by the benchmark's --latency-scale).
+DEFAULT_LATENCY = {
+    "model_ms": 450.0,
+    "model_ms_per_1k_input_tokens": 40.0,
+    "model_ms_per_output_token": 4.0,
+    "rag_ms": 150.0,
+    "search_ms": 700.0,
+    "code_ms": 350.0,
+}
+
+# Recorded responses. "{college}" is replaced with the college being processed; entries under
+# "colleges" override the defaults for a specific college.
+DEFAULT_RECORDINGS = {
+    "rag_chunks": [
+        "College Name: {college}\nSection C: First-Time, First-Year Admission\n"
+        "Total first-time, first-year applicants: 16,000. Admitted: 1,100. "
+        "SAT Evidence-Based Reading and Writing 25th percentile 740, 75th percentile 780. "
+        "SAT Math 25th percentile 780, 75th percentile 800. ACT Composite 25th percentile 34, 75th percentile 36. "
+        "Average high school GPA: 3.95.",
+    ],
+    "rag_summary": ("For {college}: Acceptance Rate: 7%, SAT Range: 1520-1580, ACT Range: 34-36, "
+                    "Avg GPA: 3.95 (unweighted). Data from the 2023-2024 Common Data Set."),
+    "search_results": [
+        {"title": "{college} Admissions - First-Year Applicants",
+         "snippet": "{college} continues to consider SAT or ACT scores for first-year applicants."},
+    ],
+    "search_summary": "For {college}: No major admission policy changes found in the last 3-6 months.",
+    "code_result": "Calculation result: student SAT 1550 is at approximately the 60th percentile of the 1520-1580 range.",
+    "classification": "Reach",
+    "key_data_points": "Student SAT 1550 vs {college} SAT 1520-1580; Student GPA 3.75 vs average 3.95; acceptance rate 7%.",
+    "rationale": ("{college} admits fewer than 10% of applicants, which makes it a Reach for any applicant. "
+                  "The student's scores are within the middle 50% range."),
+    "data_sources": "RAGAgent (Common Data Set 2023-2024), SearchAgent (admissions website).",
+    # Whether the coordinators call CodingAgent for every college (the prompt asks for it only when
+    # a calculation is needed; recorded sessions called it for most colleges).
+    "coordinator_calls_coding": True,
+    "colleges": {},
+}
+
+_ANALYZE_ONLY_PATTERN = re.compile(r"Analyze ONLY this college:\s*(?P<college>[^\n]+?)\.?\s*$", re.MULTILINE)
+_FOR_COLLEGE_PATTERN = re.compile(r"\b(?:for|at|about)\s+(?P<college>[^\n?.]+?)\s*[?.]?\s*$", re.IGNORECASE)
+
+_COORDINATOR_ROLES = ("InternalCoordinatorAgent", "SequentialCoordinatorAgent")
+
+
+def load_recordings(path=None):
+    """Returns DEFAULT_RECORDINGS, updated from a JSON file of recorded responses if given."""
+    recordings = copy.deepcopy(DEFAULT_RECORDINGS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            recordings.update(json.load(f))
+    return recordings
+
+
+def scaled_latency(scale=1.0, overrides=None):
+    latency = dict(DEFAULT_LATENCY, **(overrides or {}))
+    return {name: value * scale for name, value in latency.items()}
+
+
+def _recorded(recordings, key, college):
+    value = recordings.get("colleges", {}).get(college, {}).get(key, recordings[key])
+    return _fill(value, college)
+
+
+def _fill(value, college):
+    if isinstance(value, str):
+        return value.replace("{college}", college)
+    if isinstance(value, list):
+        return [_fill(item, college) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, college) for key, item in value.items()}
+    return value
+
+
+def _college_from_request(text):
+    match = _ANALYZE_ONLY_PATTERN.search(text) or _FOR_COLLEGE_PATTERN.search(text.strip())
+    return match.group("college").strip() if match else text.strip()
+
+
+# --- Model Stand-In ---
+
+class ReplayLlm(BaseLlm):
+    """Scripted stand-in for Gemini that plays one agent's role in the graph.
+
+    The next function call is chosen from the role's recorded plan by counting the function
+    responses already in the request (plus the plan steps of colleges compacted away, see
+    compaction.py); once the plan is exhausted the recorded final text is returned. Latency grows
+    with the (estimated) prompt and response sizes. With an `endpoint` (QuotaEnforcingEndpoint),
+    each request is first charged to the model's quota there and may be rejected with a 429.
+    """
+
+    role: str
+    recordings: dict
+    latency: dict
+    endpoint: Any = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        contents = llm_request.contents or []
+        query = next((part.text for content in contents if content.role == "user"
+                      for part in content.parts or () if part.text), "")
+        responses = [part.function_response for content in contents for part in content.parts or ()
+                     if part.function_response]
+        tools = set(llm_request.tools_dict)
+        plan = self._plan(query, tools)
+        step = len(responses) + self._compacted_steps(query, contents, tools)
+        if step < len(plan):
+            name, args = plan[step]
+            content = genai_types.Content(role="model", parts=[
+                genai_types.Part(function_call=genai_types.FunctionCall(name=name, args=args))])
+        else:
+            content = genai_types.Content(role="model", parts=[genai_types.Part(text=self._final_text(query, responses))])
+        if self.endpoint is not None:
+            self.endpoint.admit(llm_request.model or self.model, estimate_tokens(contents) + estimate_tokens([content]))
+
+        delay_ms = (self.latency["model_ms"]
+                    + self.latency["model_ms_per_1k_input_tokens"] * estimate_tokens(contents) / 1000.0
+                    + self.latency["model_ms_per_output_token"] * estimate_tokens([content]))
+        if stream and content.parts[0].text:
+            # Mirror Gemini SSE: partial text deltas, then one aggregated final response.
+            text = content.parts[0].text
+            pieces = [text[i:i + 400] for i in range(0, len(text), 400)]
+            for piece in pieces:
+                await asyncio.sleep(delay_ms / 1000.0 / len(pieces))
+                yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text=piece)]),
+                                  partial=True)
+            yield LlmResponse(content=content)
+            return
+        await asyncio.sleep(delay_ms / 1000.0)
+        yield LlmResponse(content=content)
+
+    def _plan(self, query, tools=()):
+        if self.role == "PresenterAgent":
+            return [("InternalCoordinatorAgent", {"request": query})]
+        if self.role in _COORDINATOR_ROLES:
+            return [call for college in extract_college_names(query) for call in self._college_plan(query, college, tools)]
+        if self.role == "CollegeAnalystAgent":
+            return self._college_plan(query, _college_from_request(query), tools)
+        college = _college_from_request(query)
+        if self.role == "RAGAgent":
+            return [("lookup_college_stats", {"college_name": college}),
+                    ("retrieve_rag_documentation", {"query": f"Admission statistics for {college}"})]
+        if self.role == "SearchAgent":
+            return [("google_search", {"query": f"{college} admission policy changes"})]
+        if self.role == "CodingAgent":
+            return [("code_execution", {"code": f"# percentile estimate for {college}"})]
+        return []
+
+    def _compacted_steps(self, query, contents, tools):
+        """Plan steps whose calls were replaced by a compacted-records note."""
+        if self.role not in _COORDINATOR_ROLES:
+            return 0
+        compacted = sum(len(extract_college_blocks(part.text)) for content in contents for part in content.parts or ()
+                        if part.text and part.text.startswith(COMPACTED_CONTEXT_MARKER))
+        colleges = extract_college_names(query)[:compacted]
+        return sum(len(self._college_plan(query, college, tools)) for college in colleges)
+
+    def _college_plan(self, query, college, tools=()):
+        plan = [("RAGAgent", {"request": f"Admission statistics for {college}"})]
+        if "check_search_freshness" in tools:
+            # The recorded coordinators always go on to call SearchAgent; the gate answers skipped calls.
+            plan.append(("check_search_freshness", {"college_name": college, "user_requested_recent": False,
+                                                    "key_data_missing": False, "rag_data_year": 0}))
+        plan += [
+            ("SearchAgent", {"request": f"Recent admission policy changes at {college}"}),
+            ("classify_admission_chances", {"student_gpa": 3.75, "student_sat": 1550, "student_act": 35,
+                                            "colleges_json": json.dumps([college])}),
+        ]
+        if self.recordings.get("coordinator_calls_coding", True):
+            plan.append(("CodingAgent", {"request": f"Estimate the student's test score percentile for {college}"}))
+        if RECORD_TOOL_NAME in tools:
+            plan.append((RECORD_TOOL_NAME, {"college_name": college, "analysis_block": self._college_block(college)}))
+        return plan
+
+    def _final_text(self, query, responses):
+        if self.role == "PresenterAgent":
+            coordinator_text = str(responses[-1].response.get("result", "")) if responses else ""
+            return render_report(parse_coordinator_output(coordinator_text))
+        if self.role in _COORDINATOR_ROLES:
+            colleges = extract_college_names(query)
+            return render_coordinator_output(
+                profile_summary=summarize_profile(query),
+                overall_notes=f"Analyzed {len(colleges)} colleges: {', '.join(colleges)}.",
+                college_blocks=[self._college_block(college) for college in colleges],
+            )
+        college = _college_from_request(query)
+        if self.role == "CollegeAnalystAgent":
+            return f"INTERNAL_TRACE: Processing {college}.\n{self._college_block(college)}"
+        key = {"RAGAgent": "rag_summary", "SearchAgent": "search_summary", "CodingAgent": "code_result"}.get(self.role)
+        return _recorded(self.recordings, key, college) if key else "OK"
+
+    def _college_block(self, college):
+        return "\n".join([
+            COLLEGE_BLOCK_START,
+            f"COLLEGE_NAME: {college}",
+            f"CLASSIFICATION: {_recorded(self.recordings, 'classification', college)}",
+            f"KEY_COMPARATIVE_DATA_POINTS: {_recorded(self.recordings, 'key_data_points', college)}",
+            f"DETAILED_RATIONALE: {_recorded(self.recordings, 'rationale', college)}",
+            f"DATA_SOURCES_SUMMARY: {_recorded(self.recordings, 'data_sources', college)}",
+            "INTERNAL_PROCESSING_NOTES: Replayed by the offline benchmark.",
+            COLLEGE_BLOCK_END,
+        ])
+
+
+# --- Quota-Enforcing Endpoint ---
+
+class QuotaEnforcingEndpoint:
+    """Stand-in for the Gemini API's per-model quotas.
+
+    Within any sliding `period` seconds at most `rpm` requests and `tpm` tokens (prompt plus
+    response) are accepted per model; a request beyond either is rejected with the 429
+    RESOURCE_EXHAUSTED ClientError the real API returns. A limit of 0 is unlimited.
+    """
+
+    def __init__(self, rpm=0, tpm=0, period=60.0, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        self.clock = clock
+        self._windows = collections.defaultdict(collections.deque)
+        self._counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def admit(self, model, tokens):
+        """Charges one request of `tokens` to `model`, or raises a 429 ClientError."""
+        with self._lock:
+            now = self.clock()
+            window = self._windows[model]
+            while window and window[0][0] <= now - self.period:
+                window.popleft()
+            used = sum(charged for _, charged in window)
+            if (self.rpm and len(window) >= self.rpm) or (self.tpm and used + tokens > self.tpm):
+                self._counters["rejected"] += 1
+                raise genai_errors.ClientError(429, {"error": {
+                    "code": 429, "status": "RESOURCE_EXHAUSTED",
+                    "message": f"Quota exceeded for {model}: {self.rpm:g} requests / {self.tpm:g} tokens "
+                               f"per {self.period:g} s."}})
+            window.append((now, tokens))
+            self._counters["accepted"] += 1
+            self._counters["tokens"] += tokens
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+# --- RAG Corpus Stand-In ---
+
+class FakeRagCorpus:
+    """Stand-in for the vertexai.rag file operations scripts/ingestion.py uses (upload_file,
+    delete_file), keeping every uploaded file's text in memory.
+
+    `failures` maps a display name to the exceptions its next uploads raise, one per attempt.
+    """
+
+    def __init__(self, failures=None):
+        self.files = {}  # RAG file name -> (display name, text)
+        self.failures = {name: list(errors) for name, errors in (failures or {}).items()}
+        self.uploads = []
+        self.deletes = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def upload_file(self, corpus_name, path, display_name, description=None):
+        with self._lock:
+            self.uploads.append(display_name)
+            errors = self.failures.get(display_name)
+            if errors:
+                raise errors.pop(0)
+            self._next_id += 1
+            name = f"{corpus_name}/ragFiles/{self._next_id}"
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        with self._lock:
+            self.files[name] = (display_name, text)
+        return types.SimpleNamespace(name=name, display_name=display_name)
+
+    def delete_file(self, name):
+        with self._lock:
+            self.deletes.append(name)
+            if name not in self.files:
+                raise KeyError(f"RAG file {name} not found")
+            del self.files[name]
+
+    def texts(self):
+        """Display name -> uploaded text, for every file currently in the corpus."""
+        with self._lock:
+            return {display_name: text for display_name, text in self.files.values()}
+
+
+# --- Tool Stand-Ins ---
+
+def make_retrieval_query(recordings, latency):
+    """Stand-in for vertexai.preview.rag.retrieval_query returning recorded chunks.
+
+    Like the real call it is synchronous and blocks its thread for the simulated latency, so the
+    retrieval tool above it (cache, single-flight, query canonicalization) runs unchanged.
+    """
+
+    def retrieval_query(text, rag_resources=None, rag_corpora=None, similarity_top_k=None,
+                        vector_distance_threshold=None, **kwargs):
+        time.sleep(latency["rag_ms"] / 1000.0)
+        chunks = _recorded(recordings, "rag_chunks", _college_from_request(text))[:similarity_top_k or None]
+        contexts = [types.SimpleNamespace(text=chunk) for chunk in chunks]
+        return types.SimpleNamespace(contexts=types.SimpleNamespace(contexts=contexts))
+
+    return retrieval_query
+
+
+def make_search_tool(recordings, latency):
+    """Function-tool stand-in for the built-in google_search tool."""
+
+    async def google_search(query: str) -> dict:
+        """Searches the web and returns recorded results."""
+        await asyncio.sleep(latency["search_ms"] / 1000.0)
+        college = re.sub(r"\s+admission policy changes$", "", query)
+        return {"results": _recorded(recordings, "search_results", college)}
+
+    return FunctionTool(google_search)
+
+
+def make_code_execution_tool(recordings, latency):
+    """Function-tool stand-in for the built-in code execution tool."""
+
+    async def code_execution(code: str) -> dict:
+        """Executes Python code and returns its recorded output."""
+        await asyncio.sleep(latency["code_ms"] / 1000.0)
+        return {"output": recordings["code_result"]}
+
+    return FunctionTool(code_execution)
+
+
+def install_standins(root_agent, recordings=None, latency=None, endpoint=None):
+    """Swaps every model and external tool in the graph under `root_agent` for its offline stand-in.
+
+    Local tools (college stats lookup, classification) and AgentTools are kept, so the benchmark
+    measures the real orchestration. The retrieval tool is kept too: the Vertex AI call beneath it
+    (vertexai.preview.rag.retrieval_query, patched process-wide) is replaced instead. Scheduled
+    models (see scheduler.py) keep their scheduler and only the model behind it is replaced;
+    `endpoint` is an optional QuotaEnforcingEndpoint the stand-ins charge. Returns the number of
+    agents patched.
+    """
+    from google.adk.agents import LlmAgent
+    from vertexai.preview import rag
+
+    from ..scheduler import ScheduledLlm
+
+    recordings = recordings or load_recordings()
+    latency = latency or scaled_latency()
+    rag.retrieval_query = make_retrieval_query(recordings, latency)
+    patched = 0
+    for agent in iter_agent_tree(root_agent):
+        if not isinstance(agent, LlmAgent):
+            continue
+        replay = ReplayLlm(model="replay", role=agent.name, recordings=recordings, latency=latency, endpoint=endpoint)
+        if isinstance(agent.model, ScheduledLlm):
+            agent.model.llm = replay
+        else:
+            agent.model = replay
+        tools = []
+        for tool in agent.tools:
+            name = getattr(tool, "name", None)
+            if name == "google_search":
+                tool = make_search_tool(recordings, latency)
+            elif name == "code_execution":
+                tool = make_code_execution_tool(recordings, latency)
+            tools.append(tool)
+        agent.tools = tools
+        patched += 1
+    return patched
@@ -0,0 +1,133 @@
+# insight_agent/tools.py
+
+import asyncio
+
+from google.adk.tools.retrieval.base_retrieval_tool import BaseRetrievalTool
+from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
+from vertexai.preview import rag
+
+from .entities import canonicalize_mentions
+from .freshness import get_default_freshness_store, record_chunk_years, search_gating_enabled
+from .local_retrieval import get_local_index
+from .paths import DATA_DIR
+from .rag_cache import normalize_query
+from .scheduler import RAG_RESOURCE, get_default_scheduler, scheduler_enabled
+
+
+def _record_freshness(result):
+    """Feeds the data years of retrieved chunks to the freshness table behind SearchAgent gating."""
+    if search_gating_enabled() and isinstance(result, list):
+        record_chunk_years(result, get_default_freshness_store())
+
+
+def _retrieval_query(args):
+    """The query with college aliases replaced by canonical names (as the corpus names them), and its
+    cache key: that query lower-cased with punctuation and whitespace collapsed, so "UCB admission
+    stats" and "uc berkeley admission stats" share cached results. Other rewordings are retrieved
+    anew, since they can rank different chunks."""
+    query = canonicalize_mentions(args.get("query", ""))
+    return query, normalize_query(query)
+
+
+def _vertex_retrieval(store, query):
+    """VertexAiRagRetrieval.run_async's retrieval as a plain function: rag.retrieval_query is
+    synchronous, so it is run in a worker thread instead of on the event loop."""
+    response = rag.retrieval_query(
+        text=query,
+        rag_resources=store.rag_resources,
+        rag_corpora=store.rag_corpora,
+        similarity_top_k=store.similarity_top_k,
+        vector_distance_threshold=store.vector_distance_threshold,
+    )
+    if not response.contexts.contexts:
+        return f"No matching result found with the config: {store}"
+    return [context.text for context in response.contexts.contexts]
+
+
+async def _coalesced(tool, corpus_name, top_k, key, factory):
+    """Runs `factory()`, sharing one execution among concurrent identical retrievals when the tool has a SingleFlight."""
+    if tool.singleflight is None:
+        return await factory()
+    key = (tool.name, corpus_name, top_k, normalize_query(key))
+    return await tool.singleflight.do(key, factory, group=tool.name)
+
+
+class CachedVertexAiRagRetrieval(VertexAiRagRetrieval):
+    """VertexAiRagRetrieval that serves repeated queries from a RetrievalCache.
+
+    Retrieval is always exposed to the model as a function call (rather than Gemini 2's built-in
+    retrieval), since built-in retrieval runs inside the model request and cannot be cached. With a
+    `singleflight`, concurrent cache misses for the same query share one Vertex AI call.
+    """
+
+    def __init__(self, *, cache, corpus_name, singleflight=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.corpus_name = corpus_name or ""
+        self.singleflight = singleflight
+
+    async def process_llm_request(self, *, tool_context, llm_request):
+        # Skip VertexAiRagRetrieval's built-in retrieval path and declare a plain function tool.
+        await super(VertexAiRagRetrieval, self).process_llm_request(
+            tool_context=tool_context, llm_request=llm_request
+        )
+
+    async def run_async(self, *, args, tool_context):
+        query, key = _retrieval_query(args)
+        top_k = self.vertex_rag_store.similarity_top_k
+        cached = self.cache.get(key, self.corpus_name, top_k)
+        if cached is not None:
+            return cached
+
+        async def retrieve():
+            # Vertex AI retrievals share the INSIGHT_RAG_RPM quota through the scheduler.
+            if scheduler_enabled():
+                await get_default_scheduler().acquire(RAG_RESOURCE, role="specialist")
+            # Off the event loop, so concurrent retrievals (e.g. prefetches) overlap with model turns
+            # and deadlines can fire while the call is in flight.
+            return await asyncio.to_thread(_vertex_retrieval, self.vertex_rag_store, query)
+
+        result = await _coalesced(self, self.corpus_name, top_k, key, retrieve)
+        _record_freshness(result)
+        # Only successful retrievals (a list of context texts) are cached; "no result" strings are not.
+        if isinstance(result, list):
+            self.cache.put(key, self.corpus_name, top_k, result)
+        return result
+
+
+class LocalRagRetrieval(BaseRetrievalTool):
+    """In-process retrieval over the memory-mapped local vector index built from the data directory.
+
+    Used for dev/edge deployments and offline benchmarks; needs no network access or credentials.
+    """
+
+    def __init__(self, *, name, description, cache, similarity_top_k=5, data_dir=DATA_DIR, index_dir=None,
+                 singleflight=None):
+        super().__init__(name=name, description=description)
+        self.cache = cache
+        self.singleflight = singleflight
+        self.similarity_top_k = similarity_top_k
+        self.data_dir = data_dir
+        self.index_dir = index_dir
+
+    async def run_async(self, *, args, tool_context):
+        query, key = _retrieval_query(args)
+        # The fingerprint check walks the data directory and a stale index is rebuilt, so neither
+        # runs on the event loop.
+        index = await asyncio.to_thread(get_local_index, self.data_dir, self.index_dir)
+        # Keying on the data fingerprint invalidates cached results whenever the index is rebuilt.
+        corpus_name = f"local:{index.fingerprint}"
+        cached = self.cache.get(key, corpus_name, self.similarity_top_k)
+        if cached is not None:
+            return cached
+
+        async def retrieve():
+            results = index.query(query, top_k=self.similarity_top_k)
+            if not results:
+                return f"No matching result found in the local index for: {query}"
+            texts = [result["text"] for result in results]
+            self.cache.put(key, corpus_name, self.similarity_top_k, texts)
+            _record_freshness(texts)
+            return texts
+
+        return await _coalesced(self, corpus_name, self.similarity_top_k, key, retrieve)
@@ -0,0 +1,409 @@
+# insight_agent/tracing.py
+
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from .paths import index_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_PATH = index_path("traces.jsonl")
+# Latency samples kept per span name for the percentile summary.
+DEFAULT_MAX_SAMPLES = 10000
+
+AGENT = "agent"
+MODEL = "model"
+TOOL = "tool"
+
+# Innermost open agent/tool span and the college being analyzed. Context variables are copied
+# into every asyncio task, so spans nest correctly across AgentTool runners and the parallel fan-out.
+_current_span = contextvars.ContextVar("insight_current_span", default=None)
+_current_college = contextvars.ContextVar("insight_current_college", default=None)
+
+
+# --- Spans ---
+
+@dataclasses.dataclass
+class Span:
+    """One agent run, model call or tool call."""
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: str = None
+    college: str = None
+    start_time: float = 0.0
+    duration_ms: float = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    retries: int = 0
+    status: str = "ok"
+    attributes: dict = dataclasses.field(default_factory=dict)
+    parent: "Span" = dataclasses.field(default=None, repr=False)
+    _started: float = dataclasses.field(default=0.0, repr=False)
+    _tool_calls: collections.Counter = dataclasses.field(default_factory=collections.Counter, repr=False)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "college": self.college,
+            "start_time": self.start_time, "duration_ms": self.duration_ms,
+            "input_tokens": self.input_tokens, "output_tokens": self.output_tokens,
+            "retries": self.retries, "status": self.status, "attributes": self.attributes,
+        }
+
+
+@contextlib.contextmanager
+def college_scope(college_name):
+    """Attributes every span started inside the block (in this task) to `college_name`."""
+    token = _current_college.set(college_name)
+    try:
+        yield
+    finally:
+        _current_college.reset(token)
+
+
+def current_span():
+    return _current_span.get()
+
+
+# --- Exporters ---
+
+class JsonlSpanExporter:
+    """Appends one JSON object per finished span to a file."""
+
+    def __init__(self, path=DEFAULT_TRACE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class SpanAggregator:
+    """In-memory rollup of finished spans: latency percentiles per agent/model/tool, context tokens per
+    model call (turn) and calls per college."""
+
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._durations = collections.defaultdict(lambda: collections.deque(maxlen=self.max_samples))
+        # Prompt tokens of each model call: the context size per turn.
+        self._context_tokens = collections.defaultdict(lambda: collections.deque(maxlen=self.max_samples))
+        self._totals = collections.defaultdict(collections.Counter)
+        self._calls_per_college = collections.defaultdict(collections.Counter)
+        self._budgets = {}
+
+    def export(self, record):
+        key = f"{record['kind']}:{record['name']}"
+        with self._lock:
+            if record["duration_ms"] is not None:
+                self._durations[key].append(record["duration_ms"])
+            if record["kind"] == MODEL:
+                self._context_tokens[key].append(record["input_tokens"])
+            totals = self._totals[key]
+            totals["count"] += 1
+            totals["input_tokens"] += record["input_tokens"]
+            totals["output_tokens"] += record["output_tokens"]
+            totals["retries"] += record["retries"]
+            totals["errors"] += record["status"] != "ok"
+            if record["college"] and record["kind"] != MODEL:
+                self._calls_per_college[record["college"]][key] += 1
+            budget = record["attributes"].get("remote_call_budget")
+            if budget is not None:
+                usage = self._budgets.setdefault(record["name"], {"budget": budget, "max_remote_calls": 0, "exceeded": 0})
+                calls = record["attributes"].get("remote_calls", 0)
+                usage["max_remote_calls"] = max(usage["max_remote_calls"], calls)
+                usage["exceeded"] += calls > budget
+
+    def summary(self):
+        with self._lock:
+            spans = {}
+            for key, totals in self._totals.items():
+                durations = np.asarray(self._durations[key], dtype=float)
+                spans[key] = dict(totals)
+                if durations.size:
+                    spans[key]["p50_ms"] = round(float(np.percentile(durations, 50)), 2)
+                    spans[key]["p95_ms"] = round(float(np.percentile(durations, 95)), 2)
+                context_tokens = np.asarray(self._context_tokens.get(key, ()), dtype=float)
+                if context_tokens.size:
+                    spans[key]["context_tokens_p50"] = int(np.percentile(context_tokens, 50))
+                    spans[key]["context_tokens_max"] = int(context_tokens.max())
+            return {
+                "spans": spans,
+                "calls_per_college": {college: dict(calls) for college, calls in self._calls_per_college.items()},
+                "remote_call_budgets": {name: dict(usage) for name, usage in self._budgets.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._context_tokens.clear()
+            self._totals.clear()
+            self._calls_per_college.clear()
+            self._budgets.clear()
+
+
+def load_spans(path=DEFAULT_TRACE_PATH):
+    """Reads span records back from a JSONL trace file (e.g. to feed a SpanAggregator)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# --- Tracer ---
+
+def chain_callbacks(*callbacks):
+    """Combines ADK callbacks; they run in order and the first non-None result short-circuits."""
+    flattened = []
+    for callback in callbacks:
+        if isinstance(callback, (list, tuple)):
+            flattened.extend(c for c in callback if c)
+        elif callback:
+            flattened.append(callback)
+    if len(flattened) <= 1:
+        return flattened[0] if flattened else None
+
+    async def chained(**kwargs):
+        for callback in flattened:
+            result = callback(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            if result is not None:
+                return result
+        return None
+
+    return chained
+
+
+def estimate_tokens(contents):
+    """Rough token count (~4 characters per token) for when the model response carries no usage metadata."""
+    characters = 0
+    for content in contents or ():
+        for part in content.parts or ():
+            if part.text:
+                characters += len(part.text)
+            elif part.function_call or part.function_response:
+                payload = part.function_call or part.function_response
+                characters += len(json.dumps({"name": payload.name, "data": getattr(payload, "args", None)
+                                              or getattr(payload, "response", None)}, default=str))
+    return (characters + 3) // 4
+
+
+def _remote_call_budget(agent):
+    config = getattr(agent, "generate_content_config", None)
+    afc = getattr(config, "automatic_function_calling", None) if config else None
+    return getattr(afc, "maximum_remote_calls", None) if afc else None
+
+
+class Tracer:
+    """Records nested spans for agent runs, model calls and tool calls via ADK callbacks.
+
+    `instrument(root_agent)` attaches callbacks to every agent reachable from the root (sub-agents,
+    AgentTool-wrapped agents and agents held in custom agent fields), chained with any callbacks
+    the agents already had. Tool calls per agent run are counted against the agent's
+    `maximum_remote_calls` budget; with `enforce_budget` further calls get an error response.
+    """
+
+    def __init__(self, exporters, enforce_budget=False):
+        self.exporters = list(exporters)
+        self.enforce_budget = enforce_budget
+        self._open_model_spans = {}  # id(agent span) -> model span awaiting its final response
+        self._instrumented = set()
+
+    # Span lifecycle
+
+    def start_span(self, name, kind, college=None, **attributes):
+        parent = _current_span.get()
+        span_id = uuid.uuid4().hex[:16]
+        return Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else span_id,
+            span_id=span_id,
+            parent_id=parent.span_id if parent else None,
+            college=college or _current_college.get() or (parent.college if parent else None),
+            start_time=time.time(),
+            attributes=attributes,
+            parent=parent,
+            _started=time.perf_counter(),
+        )
+
+    def end_span(self, span, status=None):
+        if span.duration_ms is not None:
+            return
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000.0, 3)
+        if status:
+            span.status = status
+        record = span.to_dict()
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception as e:
+                logger.warning("Tracing: exporter %s failed: %s", type(exporter).__name__, e)
+
+    # Instrumentation
+
+    def instrument(self, agent):
+        """Attaches tracing callbacks to `agent` and every agent below it. Returns `agent`."""
+        from google.adk.agents import LlmAgent
+
+        from .runtime import iter_agent_tree
+
+        for node in iter_agent_tree(agent):
+            if id(node) in self._instrumented:
+                continue
+            self._instrumented.add(id(node))
+            budget = _remote_call_budget(node)
+            # Tracing runs last among "before" callbacks and first among "after" callbacks, so a span
+            # is only opened if the call really happens and is always closed.
+            node.before_agent_callback = chain_callbacks(node.before_agent_callback, self._before_agent(budget))
+            node.after_agent_callback = chain_callbacks(self._after_agent, node.after_agent_callback)
+            if isinstance(node, LlmAgent):
+                node.before_model_callback = chain_callbacks(node.before_model_callback, self._before_model)
+                node.after_model_callback = chain_callbacks(self._after_model, node.after_model_callback)
+                node.before_tool_callback = chain_callbacks(node.before_tool_callback, self._before_tool)
+                node.after_tool_callback = chain_callbacks(self._after_tool, node.after_tool_callback)
+        return agent
+
+    def _before_agent(self, budget):
+        def before_agent(callback_context):
+            attributes = {"invocation_id": callback_context.invocation_id}
+            if budget is not None:
+                attributes.update(remote_calls=0, remote_call_budget=budget)
+            _current_span.set(self.start_span(callback_context.agent_name, AGENT, **attributes))
+            return None
+        return before_agent
+
+    def _after_agent(self, callback_context):
+        span = _current_span.get()
+        # Close tool spans left open by a failed tool call, then the agent span itself.
+        while span is not None and not (span.kind == AGENT and span.name == callback_context.agent_name):
+            self.end_span(span, status="error")
+            span = span.parent
+        if span is not None:
+            model_span = self._open_model_spans.pop(id(span), None)
+            if model_span is not None:
+                self.end_span(model_span, status="incomplete")
+            self.end_span(span)
+            _current_span.set(span.parent)
+        return None
+
+    def _before_model(self, callback_context, llm_request):
+        parent = _current_span.get()
+        span = self.start_span(callback_context.agent_name, MODEL, model=llm_request.model)
+        span.attributes["estimated_input_tokens"] = estimate_tokens(llm_request.contents)
+        self._open_model_spans[id(parent)] = span
+        return None
+
+    def _after_model(self, callback_context, llm_response):
+        parent = _current_span.get()
+        span = self._open_model_spans.get(id(parent))
+        if span is None:
+            return None
+        # Older google-adk releases don't surface usage metadata on LlmResponse.
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            # Streamed responses repeat cumulative usage; keep the largest count seen.
+            span.input_tokens = max(span.input_tokens, usage.prompt_token_count or 0)
+            span.output_tokens = max(span.output_tokens, usage.candidates_token_count or 0)
+        if llm_response.error_code:
+            span.status = "error"
+        if not llm_response.partial:
+            del self._open_model_spans[id(parent)]
+            if not span.input_tokens and not span.output_tokens:
+                span.input_tokens = span.attributes.pop("estimated_input_tokens")
+                span.output_tokens = estimate_tokens([llm_response.content] if llm_response.content else [])
+                span.attributes["tokens_estimated"] = True
+            else:
+                span.attributes.pop("estimated_input_tokens", None)
+            self.end_span(span)
+            if parent is not None:
+                parent.input_tokens += span.input_tokens
+                parent.output_tokens += span.output_tokens
+        return None
+
+    def _before_tool(self, tool, args, tool_context):
+        parent = _current_span.get()
+        call_key = (tool.name, json.dumps(args, sort_keys=True, default=str))
+        retries = 0
+        if parent is not None:
+            # An identical call within the same agent run is counted as a retry.
+            retries = parent._tool_calls[call_key]
+            parent._tool_calls[call_key] += 1
+            parent.retries += bool(retries)
+            if "remote_calls" in parent.attributes:
+                parent.attributes["remote_calls"] += 1
+                calls, budget = parent.attributes["remote_calls"], parent.attributes["remote_call_budget"]
+                if calls == budget + 1:
+                    logger.warning("Tracing: %s exceeded its remote call budget of %s.", parent.name, budget)
+                if calls > budget and self.enforce_budget:
+                    return {"status": "error", "message": f"Remote call budget of {budget} exhausted for {parent.name}."}
+        span = self.start_span(tool.name, TOOL, college=args.get("college_name"))
+        span.retries = retries
+        _current_span.set(span)
+        return None
+
+    def _after_tool(self, tool, args, tool_context, tool_response):
+        span = _current_span.get()
+        if span is None or span.kind != TOOL or span.name != tool.name:
+            # before_tool short-circuited (e.g. enforced budget), so no span was opened.
+            return None
+        status = tool_response.get("status") if isinstance(tool_response, dict) else None
+        # Structured failures from DeadlineAgentTool (see resilience.py) count as errors and timeouts.
+        status = {"error": "error", "failed": "error", "timed_out": "timeout",
+                  "deadline_exceeded": "timeout"}.get(status)
+        self.end_span(span, status=status)
+        _current_span.set(span.parent)
+        return None
+
+
+# --- Default Tracer ---
+
+_default_tracer = None
+_default_aggregator = SpanAggregator()
+_default_tracer_lock = threading.Lock()
+
+
+def tracing_enabled():
+    return os.getenv("INSIGHT_TRACE", "").lower() in ("1", "true", "yes")
+
+
+def get_default_aggregator():
+    """Aggregator fed by the default tracer; call `.summary()` for per-agent p50/p95, context tokens per turn
+    and calls per college."""
+    return _default_aggregator
+
+
+def get_default_tracer():
+    """Returns the process-wide tracer, exporting to INSIGHT_TRACE_PATH (JSONL) and the default aggregator.
+
+    INSIGHT_ENFORCE_CALL_BUDGET=1 makes tool calls beyond an agent's maximum_remote_calls fail.
+    """
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            exporters = [_default_aggregator]
+            trace_path = os.getenv("INSIGHT_TRACE_PATH", DEFAULT_TRACE_PATH)
+            if trace_path:
+                exporters.append(JsonlSpanExporter(trace_path))
+            _default_tracer = Tracer(
+                exporters,
+                enforce_budget=os.getenv("INSIGHT_ENFORCE_CALL_BUDGET", "").lower() in ("1", "true", "yes"),
+            )
+        return _default_tracer
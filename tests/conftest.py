@@ -0,0 +1,20 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# Ensure the insight_agent package root is in the Python path
+PROJECT_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+
+@pytest.fixture(autouse=True)
+def isolated_environment(tmp_path, monkeypatch):
+    """Keeps tests independent of indexes and settings left by local ingestion runs."""
+    monkeypatch.setenv("COLLEGE_ENTITY_INDEX_PATH", str(tmp_path / "missing_college_entities.json"))
+    monkeypatch.setenv("COLLEGE_STATS_INDEX_PATH", str(tmp_path / "missing_college_stats.bin"))
+    for name in ("COLLEGE_ALIASES_PATH", "INSIGHT_ENTITY_RESOLUTION", "INSIGHT_COLLEGE_PREFETCH"):
+        monkeypatch.delenv(name, raising=False)
@@ -0,0 +1,131 @@
+# tests/test_analysis_cache.py
+
+import asyncio
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from insight_agent.analysis_cache import AnalysisCache, CachedCoordinatorAgent, profile_bucket
+from insight_agent.coordinator_output import (
+    COLLEGE_BLOCK_END,
+    COLLEGE_BLOCK_START,
+    parse_coordinator_output,
+    render_coordinator_output,
+)
+from insight_agent.fanout import extract_college_names, extract_profile
+from insight_agent.runtime import content_text, run_agent_to_text
+
+PROFILE = "I have a 1530 SAT, 34 ACT and a 3.9 GPA, and I captain the robotics team."
+QUERY = PROFILE + " What are my chances of admission into Stanford and Georgetown?"
+
+
+def college_block(college, sat):
+    return "\n".join([
+        COLLEGE_BLOCK_START,
+        f"COLLEGE_NAME: {college}",
+        "CLASSIFICATION: Reach",
+        f"KEY_COMPARATIVE_DATA_POINTS: Your SAT of {sat:g} vs {college}'s 1500-1570.",
+        "DETAILED_RATIONALE: Selective.",
+        "DATA_SOURCES_SUMMARY: RAGAgent.",
+        "INTERNAL_PROCESSING_NOTES: None.",
+        COLLEGE_BLOCK_END,
+    ])
+
+
+class ScriptedCoordinator(BaseAgent):
+    """Analyzes the colleges in its query, naming them as in `names` ({requested: returned})."""
+
+    names: dict = {}
+    queries: list = []
+
+    async def _run_async_impl(self, ctx):
+        query = content_text(ctx.user_content)
+        self.queries.append(query)
+        sat = extract_profile(query).get("SAT Score", 0)
+        text = render_coordinator_output(
+            profile_summary="Scripted.", overall_notes="Scripted.",
+            college_blocks=[college_block(self.names.get(college, college), sat)
+                            for college in extract_college_names(query)])
+        yield Event(author=self.name, invocation_id=ctx.invocation_id, branch=ctx.branch,
+                    content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]))
+
+
+def make_agent(cache=None, names=None, data_fingerprint=None):
+    coordinator = ScriptedCoordinator(name="Coordinator", names=names or {}, queries=[])
+    agent = CachedCoordinatorAgent(name="CachedCoordinator", coordinator_agent=coordinator,
+                                   cache=cache or AnalysisCache(), fingerprint="f1", corpus="corpus",
+                                   data_fingerprint=data_fingerprint)
+    return agent, coordinator
+
+
+def analyze(agent, query=QUERY):
+    return parse_coordinator_output(asyncio.run(run_agent_to_text(agent, query))).colleges
+
+
+# --- Profile Buckets ---
+
+def test_profiles_share_a_bucket_only_when_identical():
+    other_colleges = PROFILE + " What are my chances of admission into MIT?"
+    assert profile_bucket(QUERY) == profile_bucket(other_colleges)
+    assert profile_bucket(QUERY) != profile_bucket(QUERY.replace("1530 SAT", "1550 SAT"))
+    assert profile_bucket(QUERY) != profile_bucket(QUERY.replace("robotics", "debate"))
+    assert profile_bucket(QUERY).startswith("act_score:34|gpa:3.9|sat_score:1530|profile:")
+
+
+# --- Store ---
+
+def test_entries_expire_are_evicted_and_invalidated_by_corpus():
+    now = [0.0]
+    cache = AnalysisCache(max_entries=2, ttl_seconds=100, clock=lambda: now[0])
+    cache.put("Stanford", "b", "f", "stanford", corpus="c1")
+    cache.put("MIT", "b", "f", "mit", corpus="c2")
+    now[0] = 0.5
+    assert cache.get("Stanford University", "b", "f") == "stanford"  # Keyed by canonical college id.
+    now[0] = 1.0
+    cache.put("Yale", "b", "f", "yale", corpus="c1")  # Evicts MIT, the least recently used.
+    assert cache.get("MIT", "b", "f") is None
+    assert cache.invalidate("c1") == 2
+    cache.put("Rice", "b", "f", "rice")
+    now[0] = 200.0
+    assert cache.get("Rice", "b", "f") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["evictions"] == 1
+
+
+# --- Caching Coordinator ---
+
+def test_cached_blocks_are_served_only_to_the_same_profile():
+    agent, coordinator = make_agent()
+    first = analyze(agent)
+    assert [college.key_data_points for college in first] == [
+        "Your SAT of 1530 vs Stanford University's 1500-1570.", "Your SAT of 1530 vs Georgetown's 1500-1570."]
+    assert analyze(agent) == first
+    assert len(coordinator.queries) == 1
+
+    other = analyze(agent, QUERY.replace("1530 SAT", "1550 SAT"))
+    assert len(coordinator.queries) == 2
+    assert [college.key_data_points for college in other] == [
+        "Your SAT of 1550 vs Stanford University's 1500-1570.", "Your SAT of 1550 vs Georgetown's 1500-1570."]
+
+
+def test_blocks_named_differently_are_matched_to_their_college():
+    agent, _ = make_agent(names={"Georgetown": "Georgetown University"})
+    colleges = analyze(agent)
+    assert [college.college_name for college in colleges] == ["Stanford University", "Georgetown University"]
+    assert all(college.classification == "Reach" for college in colleges)
+
+
+def test_a_single_unmatched_block_answers_the_remaining_college():
+    agent, _ = make_agent(names={"Georgetown": "Hoyas College"})
+    assert [college.college_name for college in analyze(agent)] == ["Stanford University", "Hoyas College"]
+
+
+def test_data_changes_invalidate_cached_analyses():
+    data = ["v1"]
+    agent, coordinator = make_agent(data_fingerprint=lambda: data[0])
+    analyze(agent)
+    analyze(agent)
+    assert len(coordinator.queries) == 1
+    data[0] = "v2"
+    analyze(agent)
+    assert len(coordinator.queries) == 2
@@ -0,0 +1,161 @@
+# tests/test_batch.py
+
+import asyncio
+import json
+import types
+
+import pytest
+
+from insight_agent import batch
+from insight_agent.batch import ERROR, OK, BatchRunner, RateLimiter, _open_output, load_completed_ids
+
+
+def read_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records asyncio.sleep() delays instead of waiting."""
+    recorded = []
+
+    async def fake_sleep(delay, result=None):
+        recorded.append(delay)
+        return result
+
+    monkeypatch.setattr(batch.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+# --- Rate Limiting ---
+
+def test_rate_limiter_spaces_request_starts(sleeps):
+    limiter = RateLimiter(rate_per_minute=120, clock=lambda: 100.0)
+
+    async def acquire_all():
+        for _ in range(4):
+            await limiter.acquire()
+
+    asyncio.run(acquire_all())
+    assert sleeps == pytest.approx([0.5, 1.0, 1.5])
+
+
+def test_rate_limiter_does_not_bank_idle_time(sleeps):
+    now = [0.0]
+    limiter = RateLimiter(rate_per_minute=60, clock=lambda: now[0])
+
+    async def acquire_later():
+        await limiter.acquire()
+        now[0] = 30.0
+        await limiter.acquire()
+        await limiter.acquire()
+
+    asyncio.run(acquire_later())
+    assert sleeps == pytest.approx([1.0])
+
+
+def test_unlimited_rate_limiter_never_waits(sleeps):
+    asyncio.run(RateLimiter(None).acquire())
+    assert sleeps == []
+
+
+# --- Checkpoint ---
+
+def test_load_completed_ids_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "status": "error"}\n{"id": "c", "sta', encoding="utf-8")
+    assert load_completed_ids(str(path)) == {"a", "b"}
+    assert load_completed_ids(str(path), retry_failed=True) == {"a"}
+
+
+def test_load_completed_ids_uses_the_last_result_of_each_id(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"id": "a", "status": "error"}\n{"id": "a", "status": "ok"}\n', encoding="utf-8")
+    assert load_completed_ids(str(path), retry_failed=True) == {"a"}
+    assert load_completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_open_output_terminates_a_torn_line_before_appending(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"id": "a", "status": "ok"}\n{"id": "b"', encoding="utf-8")
+    with _open_output(str(path), restart=False) as f:
+        f.write('{"id": "c", "status": "ok"}\n')
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines == ['{"id": "a", "status": "ok"}', '{"id": "b"', '{"id": "c", "status": "ok"}']
+    assert load_completed_ids(str(path)) == {"a", "c"}
+
+
+def test_open_output_restart_truncates(tmp_path):
+    path = tmp_path / "out" / "results.jsonl"
+    path.parent.mkdir()
+    path.write_text('{"id": "a", "status": "ok"}\n', encoding="utf-8")
+    with _open_output(str(path), restart=True):
+        pass
+    assert path.read_text(encoding="utf-8") == ""
+
+
+# --- Runner ---
+
+class FlakyAgent:
+    """Stands in for run_agent_to_text: fails the first `failures[query]` calls for a query."""
+
+    def __init__(self, failures=None):
+        self.name = "FakeAgent"
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    async def run(self, agent, query, user_id=None):
+        self.calls.append(query)
+        if self.failures.get(query, 0) > 0:
+            self.failures[query] -= 1
+            raise RuntimeError(f"transient failure for {query}")
+        return f"Report for {query}"
+
+
+def run_batch(tmp_path, monkeypatch, fake, records, retry_failed=False, **kwargs):
+    monkeypatch.setattr(batch, "run_agent_to_text", fake.run)
+    output_path = str(tmp_path / "results.jsonl")
+    runner = BatchRunner(types.SimpleNamespace(name=fake.name), output_path, concurrency=2,
+                         retry_backoff=0.0, progress_interval=0, **kwargs)
+    stats = asyncio.run(runner.run(records, retry_failed=retry_failed))
+    return stats, output_path
+
+
+def test_runner_retries_transient_failures(tmp_path, monkeypatch, sleeps):
+    fake = FlakyAgent(failures={"q1": 1, "q2": 5})
+    stats, output_path = run_batch(tmp_path, monkeypatch, fake, [("1", "q1"), ("2", "q2")], max_retries=2)
+    results = {result["id"]: result for result in read_results(output_path)}
+    assert results["1"]["status"] == OK and results["1"]["attempts"] == 2
+    assert results["2"]["status"] == ERROR and results["2"]["attempts"] == 3
+    assert stats["succeeded"] == 1 and stats["failed"] == 1 and stats["retries"] == 3
+    assert fake.calls.count("q2") == 3
+
+
+def test_runner_resumes_from_its_output(tmp_path, monkeypatch, sleeps):
+    fake = FlakyAgent(failures={"q2": 1})
+    records = [("1", "q1"), ("2", "q2"), ("3", "q3")]
+    run_batch(tmp_path, monkeypatch, fake, records, max_retries=0)
+    assert fake.calls == ["q1", "q2", "q3"]
+
+    fake.calls.clear()
+    stats, output_path = run_batch(tmp_path, monkeypatch, fake, records, max_retries=0)
+    assert fake.calls == []
+    assert stats["skipped"] == 3
+
+    stats, output_path = run_batch(tmp_path, monkeypatch, fake, records, retry_failed=True)
+    assert fake.calls == ["q2"]
+    assert stats["succeeded"] == 1 and stats["skipped"] == 2
+    assert [result["id"] for result in read_results(output_path)] == ["1", "2", "3", "2"]
+
+
+def test_record_that_cannot_become_a_query_is_recorded_as_failed(tmp_path, monkeypatch, sleeps):
+    fake = FlakyAgent()
+    stats, output_path = run_batch(tmp_path, monkeypatch, fake, [("1", ValueError("no colleges"))])
+    assert read_results(output_path) == [{"id": "1", "status": ERROR, "error": "no colleges"}]
+    assert fake.calls == [] and stats["failed"] == 1
+
+
+def test_build_profile_query_from_csv_fields():
+    query = batch.build_profile_query({"sat": "1500", "gpa": "3.9", "colleges": "Stanford; MIT; Caltech"})
+    assert query == "I have a 1500 SAT, a 3.9 GPA. What are my chances of admission into Stanford, MIT, and Caltech?"
@@ -0,0 +1,121 @@
+# tests/test_classification.py
+
+import json
+
+import numpy as np
+import pytest
+
+from insight_agent.classification import (
+    INSUFFICIENT_DATA,
+    REACH,
+    SAFETY,
+    TARGET,
+    act_to_sat,
+    classify_admission_chances,
+    classify_colleges,
+    to_unweighted_gpa,
+)
+
+STUDENT = {"gpa": 3.9, "sat": 1560, "act": 0}
+
+
+def college(name="Example University", **stats):
+    defaults = {"sat_composite_25": 1400, "sat_composite_75": 1500, "gpa_25": 3.6, "gpa_75": 3.85}
+    return dict(defaults, college_name=name, **stats)
+
+
+def classify(student, **stats):
+    return classify_colleges(student, [college(**stats)])[0]
+
+
+# --- Conversions ---
+
+def test_act_scores_convert_to_the_sat_scale():
+    assert act_to_sat(36) == 1590
+    assert act_to_sat(33.5) == pytest.approx(1480)
+    assert np.isnan(act_to_sat(np.nan))
+
+
+def test_gpas_convert_to_the_unweighted_scale():
+    assert to_unweighted_gpa(3.7) == pytest.approx(3.7)
+    assert to_unweighted_gpa(4.6) == pytest.approx(4.0)
+    assert to_unweighted_gpa(97) == pytest.approx(4.0)
+    assert to_unweighted_gpa(65) == pytest.approx(1.0)
+
+
+# --- Classification Rules ---
+
+def test_selective_colleges_are_a_reach_for_any_profile():
+    result = classify(STUDENT, acceptance_rate=0.15)
+    assert result["classification"] == REACH
+    assert result["reasons"][0] == "Acceptance rate 15% is below the 20% selectivity threshold."
+
+
+@pytest.mark.parametrize("rate", [15, 15.0, "15", "15%", " 15% "])
+def test_acceptance_rates_given_as_percents_are_normalized(rate):
+    result = classify(STUDENT, acceptance_rate=rate)
+    assert result["classification"] == REACH
+    assert result["acceptance_rate"] == 0.15
+
+
+def test_acceptance_rates_above_100_percent_are_ignored():
+    result = classify(STUDENT, acceptance_rate=250)
+    assert result["acceptance_rate"] is None
+    assert result["classification"] == TARGET
+
+
+def test_profiles_above_range_at_open_colleges_are_safeties():
+    assert classify(STUDENT, acceptance_rate=0.6)["classification"] == SAFETY
+    assert classify(STUDENT, acceptance_rate=60)["classification"] == SAFETY
+    # Above range, but the admit rate is too low for a Safety.
+    result = classify(STUDENT, acceptance_rate=0.35)
+    assert result["classification"] == TARGET
+    assert "too low for a Safety" in result["reasons"][0]
+
+
+def test_profiles_below_range_are_a_reach():
+    assert classify({"gpa": 3.2, "sat": 1300}, acceptance_rate=0.6)["classification"] == REACH
+
+
+def test_act_scores_and_ranges_are_compared_on_the_sat_scale():
+    result = classify({"act": 34}, acceptance_rate=0.6, sat_composite_25=None, sat_composite_75=None,
+                      act_composite_25=32, act_composite_75=35)
+    assert result["classification"] == TARGET
+    assert result["test_percentile_estimate"] == pytest.approx(25.0 + 50.0 * (1500 - 1430) / (1540 - 1430), abs=0.01)
+
+
+def test_missing_data_is_reported_as_insufficient():
+    result = classify({"gpa": 0, "sat": 0, "act": 0}, acceptance_rate=0.6)
+    assert result["classification"] == INSUFFICIENT_DATA
+    assert result["test_percentile_estimate"] is None
+    # Selectivity alone is enough for a Reach.
+    assert classify({"gpa": 0, "sat": 0, "act": 0}, acceptance_rate=0.05)["classification"] == REACH
+
+
+def test_colleges_are_classified_in_input_order():
+    results = classify_colleges(STUDENT, [college("A", acceptance_rate=0.05), college("B", acceptance_rate=0.7),
+                                          college("C", acceptance_rate=0.3)])
+    assert [(result["college_name"], result["classification"]) for result in results] == [
+        ("A", REACH), ("B", SAFETY), ("C", TARGET)]
+
+
+# --- ADK Tool ---
+
+def test_tool_fills_missing_statistics_from_the_stats_table(monkeypatch):
+    class StatsIndex:
+        def lookup(self, name):
+            return {"acceptance_rate": 0.04, "sat_composite_25": 1500, "sat_composite_75": 1570} \
+                if name == "Stanford University" else None
+
+    monkeypatch.setattr("insight_agent.classification.get_default_stats_index", lambda: StatsIndex())
+    response = classify_admission_chances(3.9, 1560, 0, json.dumps([
+        "Stanford University", {"college_name": "Example University", "acceptance_rate": 0.7,
+                                "sat_composite_25": 1200, "sat_composite_75": 1300}]))
+    assert response["status"] == "success"
+    assert [result["classification"] for result in response["results"]] == [REACH, SAFETY]
+    assert response["results"][0]["acceptance_rate"] == 0.04
+
+
+@pytest.mark.parametrize("colleges_json", ["not json", "[]", '{"college_name": "MIT"}'])
+def test_tool_rejects_malformed_college_lists(colleges_json):
+    assert classify_admission_chances(3.9, 1560, 0, colleges_json)["status"] == "error"
@@ -0,0 +1,124 @@
+# tests/test_college_stats.py
+
+import os
+import threading
+
+import pytest
+
+from insight_agent.college_stats import (
+    CollegeStatsIndex,
+    extract_stats_from_files,
+    get_default_stats_index,
+    write_stats_index,
+)
+
+STANFORD_2023 = """College Name: Stanford University
+Common Data Set 2023-2024
+C1. Applications: 56,378
+C2. Admitted: 2,099
+C7. SAT Evidence-Based Reading and Writing: 25th percentile 740, 75th percentile 780
+C7. SAT Math: 25th percentile 770, 75th percentile 800
+"""
+
+STANFORD_2022 = """College Name: Stanford University
+Common Data Set 2022-2023
+C1. Applications: 50,000
+C12. Average high school GPA: 3.96
+"""
+
+IPEDS_EXAMPLE = """IPEDS Data for Example College
+Data Year: 2023
+Graduation Rate (4-year): 60%
+"""
+
+
+def write_sources(tmp_path, *texts):
+    paths = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"source_{i}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / "college_stats.idx")
+    write_stats_index(extract_stats_from_files(write_sources(tmp_path, STANFORD_2022, STANFORD_2023, IPEDS_EXAMPLE)), path)
+    return path
+
+
+# --- Columnar Table ---
+
+def test_documents_about_one_college_are_merged_newest_first(index_path):
+    stats = CollegeStatsIndex(index_path).lookup("stanford university")
+    assert stats["college_name"] == "Stanford University"
+    assert (stats["applications"], stats["data_year"]) == (56378.0, 2023)
+    assert stats["acceptance_rate"] == pytest.approx(2099 / 56378)
+    assert (stats["sat_composite_25"], stats["sat_composite_75"]) == (1510.0, 1580.0)
+    # Older documents only fill in what the newest one lacks.
+    assert stats["gpa_average"] == 3.96
+
+
+def test_missing_values_are_left_out(index_path):
+    stats = CollegeStatsIndex(index_path).lookup("Example College")
+    assert stats == {"college_name": "Example College", "graduation_rate_4yr": 0.6, "data_year": 2023}
+
+
+def test_columns_are_zero_copy_views(index_path):
+    index = CollegeStatsIndex(index_path)
+    assert len(index) == 2
+    years = index.column("data_year")
+    assert list(years) == [2023, 2023]
+    assert index.column("applications")[index.row_for("Stanford University")] == 56378.0
+    with pytest.raises(KeyError):
+        index.column("unknown")
+
+
+def test_unknown_colleges_and_files_are_rejected(tmp_path, index_path):
+    assert CollegeStatsIndex(index_path).lookup("Harvard University") is None
+    bad_path = tmp_path / "bad.idx"
+    bad_path.write_bytes(b"not an index")
+    with pytest.raises(ValueError):
+        CollegeStatsIndex(str(bad_path))
+
+
+# --- Process-wide Index ---
+
+def test_a_rewritten_table_is_reopened_without_closing_the_old_one(tmp_path, index_path, monkeypatch):
+    monkeypatch.setenv("COLLEGE_STATS_INDEX_PATH", index_path)
+    first = get_default_stats_index()
+    assert get_default_stats_index() is first
+
+    write_stats_index(extract_stats_from_files(write_sources(tmp_path, IPEDS_EXAMPLE)), index_path)
+    os.utime(index_path, ns=(1, 1))
+    second = get_default_stats_index()
+    assert second is not first and len(second) == 1
+    # A lookup that started on the previous table still completes.
+    assert first.lookup("Stanford University")["data_year"] == 2023
+
+
+def test_lookups_keep_working_while_the_table_is_rewritten(tmp_path, index_path, monkeypatch):
+    monkeypatch.setenv("COLLEGE_STATS_INDEX_PATH", index_path)
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                get_default_stats_index().lookup("Example College")
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    sources = write_sources(tmp_path, STANFORD_2023, IPEDS_EXAMPLE)
+    for i in range(50):
+        write_stats_index(extract_stats_from_files(sources), index_path)
+        os.utime(index_path, ns=(i + 2, i + 2))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
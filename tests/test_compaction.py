@@ -0,0 +1,59 @@
+# tests/test_compaction.py
+
+from insight_agent.compaction import merge_recorded_blocks
+from insight_agent.coordinator_output import parse_coordinator_output, render_coordinator_output
+
+
+def block(college, classification="Target", rationale="Within the middle 50%."):
+    return "\n".join([
+        "COLLEGE_ANALYSIS_BLOCK_START",
+        f"COLLEGE_NAME: {college}",
+        f"CLASSIFICATION: {classification}",
+        f"DETAILED_RATIONALE: {rationale}",
+        "COLLEGE_ANALYSIS_BLOCK_END",
+    ])
+
+
+def records(*blocks):
+    return {parse_coordinator_output(b).colleges[0].college_name: {"block": b} for b in blocks}
+
+
+def output(*blocks):
+    return render_coordinator_output("Profile.", "Notes.", list(blocks), as_of="2026-01-01")
+
+
+def colleges(text):
+    parsed = parse_coordinator_output(text)
+    assert parsed.complete
+    return [(college.college_name, college.classification) for college in parsed.colleges]
+
+
+def test_faithful_copies_are_left_unchanged():
+    recorded = records(block("Stanford University", "Reach"), block("Rice University"))
+    text = output(block("Stanford University", "Reach"), block("Rice University"))
+    assert merge_recorded_blocks(text, recorded) == (text, 0)
+
+
+def test_altered_and_dropped_blocks_are_restored_from_the_records():
+    recorded = records(block("Stanford University", "Reach"), block("Rice University"), block("Duke University"))
+    text = output(block("Stanford University", "Target", "Paraphrased."), block("Duke University"))
+    merged, restored = merge_recorded_blocks(text, recorded)
+    assert restored == 2
+    assert colleges(merged) == [("Stanford University", "Reach"), ("Rice University", "Target"),
+                                ("Duke University", "Target")]
+
+
+def test_unrecorded_blocks_are_kept_in_place():
+    recorded = records(block("Rice University"))
+    text = output(block("Stanford University", "Insufficient Data for Classification"), block("Rice University"))
+    merged, restored = merge_recorded_blocks(text, recorded)
+    assert restored == 0
+    assert colleges(merged) == [("Stanford University", "Insufficient Data for Classification"),
+                                ("Rice University", "Target")]
+
+
+def test_blocks_are_inserted_when_the_output_has_none():
+    recorded = records(block("Rice University"), block("Duke University"))
+    merged, restored = merge_recorded_blocks(output(), recorded)
+    assert restored == 2
+    assert colleges(merged) == [("Rice University", "Target"), ("Duke University", "Target")]
@@ -0,0 +1,113 @@
+# tests/test_coordinator_output.py
+
+from insight_agent.coordinator_output import (
+    COLLEGE_BLOCK_END,
+    COLLEGE_BLOCK_START,
+    OUTPUT_END,
+    OUTPUT_START,
+    CoordinatorOutputParser,
+    parse_coordinator_output,
+    render_coordinator_output,
+    split_college_blocks,
+)
+
+
+def college_block(college, classification="Target"):
+    return "\n".join([
+        COLLEGE_BLOCK_START,
+        f"COLLEGE_NAME: {college}",
+        f"CLASSIFICATION: {classification}",
+        "KEY_COMPARATIVE_DATA_POINTS: SAT 1450 vs 1400-1500.",
+        "DETAILED_RATIONALE: Within the middle 50%.",
+        "  The acceptance rate is moderate.",
+        "DATA_SOURCES_SUMMARY: RAGAgent.",
+        "INTERNAL_PROCESSING_NOTES: None.",
+        COLLEGE_BLOCK_END,
+    ])
+
+
+OUTPUT = render_coordinator_output("GPA 3.8, SAT 1450.", "Two colleges analyzed.",
+                                   [college_block("Rice University"), college_block("Emory University", "Reach")],
+                                   as_of="2026-01-01")
+
+
+def feed_in_pieces(text, size):
+    parser = CoordinatorOutputParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.close())
+    return parser, events
+
+
+# --- Complete Output ---
+
+def test_a_complete_output_is_parsed_into_sections_and_colleges():
+    output = parse_coordinator_output(OUTPUT)
+    assert output.started and output.complete and output.warnings == []
+    assert (output.profile_summary, output.overall_notes) == ("GPA 3.8, SAT 1450.", "Two colleges analyzed.")
+    assert [(c.college_name, c.classification) for c in output.colleges] == [
+        ("Rice University", "Target"), ("Emory University", "Reach")]
+    assert output.colleges[0].rationale == "Within the middle 50%.\nThe acceptance rate is moderate."
+    assert "2026-01-01" in output.limitations
+
+
+def test_text_outside_the_markers_and_code_fences_are_ignored():
+    output = parse_coordinator_output("Trace: calling RAGAgent...\n```\n" + OUTPUT + "\n```\nDone.")
+    assert output.complete and len(output.colleges) == 2
+
+
+# --- Streaming ---
+
+def test_markers_torn_across_pieces_are_parsed_like_whole_text():
+    for size in (1, 7, 64):
+        parser, events = feed_in_pieces(OUTPUT, size)
+        assert [c.college_name for c in parser.output.colleges] == ["Rice University", "Emory University"]
+        assert parser.output.complete and parser.output.warnings == []
+        assert [kind for kind, _ in events if kind != "section"] == ["college", "college", "end"]
+
+
+def test_college_events_fire_when_their_block_ends():
+    parser = CoordinatorOutputParser()
+    head, tail = OUTPUT.split(COLLEGE_BLOCK_END, 1)
+    assert [kind for kind, _ in parser.feed(head)] == ["section", "section"]
+    assert [kind for kind, _ in parser.feed(COLLEGE_BLOCK_END)] == []
+    assert [kind for kind, _ in parser.feed("\n")] == ["college"]
+
+
+def test_a_partial_stream_keeps_finished_colleges_and_flags_the_cut_off_one():
+    cut = OUTPUT.index("DETAILED_RATIONALE", OUTPUT.index("Emory University"))
+    parser, events = feed_in_pieces(OUTPUT[:cut], 16)
+    colleges = parser.output.colleges
+    assert [(c.college_name, c.complete) for c in colleges] == [("Rice University", True), ("Emory University", False)]
+    assert not parser.output.complete
+    assert any("Emory University" in warning for warning in parser.output.warnings)
+    assert any(OUTPUT_END in warning for warning in parser.output.warnings)
+
+
+def test_a_missing_end_marker_is_reported():
+    output = parse_coordinator_output(OUTPUT.replace(OUTPUT_END, ""))
+    assert len(output.colleges) == 2 and not output.complete
+    assert output.warnings == [f"{OUTPUT_END} was not found."]
+
+
+def test_blocks_without_a_start_marker_or_a_name_are_handled_leniently():
+    output = parse_coordinator_output(college_block("Rice University") + "\n"
+                                      + college_block("").replace("COLLEGE_NAME: \n", ""))
+    assert [c.college_name for c in output.colleges] == ["Rice University"]
+    assert output.warnings[:2] == [f"{COLLEGE_BLOCK_START} appeared before {OUTPUT_START}.",
+                                   "Dropped a college block without COLLEGE_NAME."]
+
+
+def test_text_after_the_end_marker_is_ignored():
+    output = parse_coordinator_output(OUTPUT + "\n" + college_block("Duke University"))
+    assert len(output.colleges) == 2
+
+
+# --- Block Splitting ---
+
+def test_college_blocks_split_from_the_surrounding_sections():
+    head, blocks, tail = split_college_blocks(OUTPUT)
+    assert head.startswith(OUTPUT_START) and tail.startswith("QUALITATIVE_SECTION_CONTENT_START")
+    assert [parse_coordinator_output(block).colleges[0].college_name for block in blocks] == [
+        "Rice University", "Emory University"]
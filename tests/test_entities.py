@@ -0,0 +1,138 @@
+# tests/test_entities.py
+
+import asyncio
+import types
+
+import pytest
+from google.genai import types as genai_types
+
+from insight_agent.entities import (
+    CollegeEntityIndex,
+    build_entities,
+    canonicalize_mentions,
+    generate_aliases,
+    get_entity_stats,
+    install_college_prefetch,
+    resolve_college_id,
+    resolve_college_names,
+)
+
+BERKELEY = "university of california berkeley"
+MICHIGAN = "university of michigan"
+
+
+# --- Aliases ---
+
+def test_generated_aliases_cover_short_forms():
+    assert generate_aliases("Stanford University") == ["stanford"]
+    assert "ucla" in generate_aliases("University of California, Los Angeles")
+    assert {"uc davis", "davis"} <= set(generate_aliases("University of California, Davis"))
+    assert generate_aliases("Michigan State University") == ["msu"]
+
+
+def test_aliases_claimed_by_two_colleges_are_dropped():
+    index = CollegeEntityIndex(build_entities([], alias_table={"Example University": [], "Example College": []}))
+    assert index.resolve("Example") is None
+    assert index.resolve("Example College") == "example college"
+
+
+# --- Resolution ---
+
+@pytest.mark.parametrize("name", ["UCB", "Cal", "UC Berkeley", "University of California, Berkeley", "berkeley"])
+def test_aliases_resolve_to_the_canonical_college(name):
+    assert resolve_college_id(name) == BERKELEY
+
+
+def test_full_names_with_an_alias_resolve_by_mention():
+    assert resolve_college_id("the Massachusetts Institute of Technology (MIT)") == "massachusetts institute of technology"
+
+
+def test_misspelled_names_resolve_by_spelling():
+    assert resolve_college_id("Standford University") == "stanford university"
+
+
+@pytest.mark.parametrize("name", [
+    "Michigan State University",
+    "Western Michigan University",
+    "Cal Poly",
+    "Cal State Long Beach",
+    "Stanford Law School",
+])
+def test_other_colleges_named_after_an_alias_do_not_resolve(name):
+    assert resolve_college_id(name) is None
+
+
+def test_similar_names_are_kept_apart_in_college_lists():
+    assert resolve_college_names(["Michigan State University", "Michigan", "UMich", "Cal Poly", "UCB", "Cal"]) == [
+        "Michigan State University",
+        "University of Michigan",
+        "Cal Poly",
+        "University of California, Berkeley",
+    ]
+
+
+def test_split_college_names_are_joined_again():
+    assert resolve_college_names(["University of California", "Berkeley", "UCLA"]) == [
+        "University of California, Berkeley",
+        "University of California, Los Angeles",
+    ]
+
+
+# --- Mentions in Free Text ---
+
+def test_mentions_are_replaced_by_canonical_names():
+    assert canonicalize_mentions("Compare Cal and MIT SAT scores") == \
+        "Compare University of California, Berkeley and Massachusetts Institute of Technology SAT scores"
+    assert canonicalize_mentions("Admission statistics for UMich", ids=True) == f"Admission statistics for {MICHIGAN}"
+
+
+@pytest.mark.parametrize("text", [
+    "Michigan State University admission statistics",
+    "Admission statistics for Cal Poly",
+    "Cal State Long Beach acceptance rate",
+    "Is cal a good fit?",
+])
+def test_near_miss_names_are_not_rewritten(text):
+    assert canonicalize_mentions(text) == text
+
+
+def test_resolution_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv("INSIGHT_ENTITY_RESOLUTION", "0")
+    assert resolve_college_id("UCB") is None
+    assert canonicalize_mentions("Admission statistics for UCB") == "Admission statistics for UCB"
+    assert resolve_college_names(["UCB", "Cal"]) == ["UCB", "Cal"]
+
+
+# --- Retrieval Prefetch ---
+
+class BlockingRetrievalTool:
+    name = "retrieve_rag_documentation"
+
+    def __init__(self):
+        self.queries = []
+
+    async def run_async(self, args, tool_context):
+        self.queries.append(args["query"])
+        await asyncio.Event().wait()
+
+
+def test_prefetches_still_running_are_cancelled_when_the_run_ends():
+    tool = BlockingRetrievalTool()
+    agent = install_college_prefetch(types.SimpleNamespace(before_agent_callback=None, after_agent_callback=None),
+                                     types.SimpleNamespace(tools=[tool]))
+    user_content = genai_types.Content(role="user", parts=[genai_types.Part(
+        text="What are my chances of admission into Stanford, UCB, and Cal?")])
+    callback_context = types.SimpleNamespace(invocation_id="invocation-1", user_content=user_content)
+    cancelled_before = get_entity_stats().get("prefetch_cancelled", 0)
+
+    async def run():
+        agent.before_agent_callback(callback_context=callback_context)
+        await asyncio.sleep(0.01)
+        agent.after_agent_callback(callback_context=callback_context)
+        await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert tool.queries == ["Admission statistics for Stanford University",
+                            "Admission statistics for University of California, Berkeley"]
+    assert get_entity_stats()["prefetch_cancelled"] - cancelled_before == 2
@@ -0,0 +1,108 @@
+# tests/test_fanout.py
+
+import asyncio
+import re
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from insight_agent.coordinator_output import fallback_college_block, parse_coordinator_output
+from insight_agent.entities import resolve_college_names
+from insight_agent.fanout import (
+    ParallelCoordinatorAgent,
+    build_college_request,
+    extract_college_names,
+    extract_profile,
+    restrict_query_to_colleges,
+    summarize_profile,
+)
+from insight_agent.runtime import content_text, run_agent_to_text
+
+QUERY = ("I have a 1550 SAT, 35 ACT, a 4.2 weighted GPA (3.75 unweighted). "
+         "What are my chances of admission into Caltech, Stanford, and UC Berkeley?")
+
+
+# --- College Lists ---
+
+@pytest.mark.parametrize("query, colleges", [
+    (QUERY, ["Caltech", "Stanford", "UC Berkeley"]),
+    ("I want to apply to Stanford, the University of Michigan, and UCLA",
+     ["Stanford", "University of Michigan", "UCLA"]),
+    ("What are my odds at Texas A&M and Rice?", ["Texas A&M", "Rice"]),
+    ("Chances of getting into Stanford & MIT?", ["Stanford", "MIT"]),
+    ("Chances for University of California, Berkeley and William & Mary?",
+     ["University of California, Berkeley", "William & Mary"]),
+    ("My chances at Virginia Polytechnic Institute and State University or Duke?",
+     ["Virginia Polytechnic Institute and State University", "Duke"]),
+    ("Colleges: Yale; Brown; Yale", ["Yale", "Brown"]),
+    ("My list:\n- Stanford\n- MIT\n- UC Davis", ["Stanford", "MIT", "UC Davis"]),
+])
+def test_college_lists_are_extracted_in_order(query, colleges):
+    assert extract_college_names(query) == colleges
+
+
+@pytest.mark.parametrize("query", [
+    "What about Duke, Rice and Emory",  # No list introduction: the LLM coordinator reads the query.
+    "What are my chances of admission into Stanford, MIT, or some state school?",
+    "My list:\n- Stanford\n- a good engineering school",
+    "",
+])
+def test_uncertain_lists_are_left_to_the_llm_coordinator(query):
+    assert extract_college_names(query) == []
+
+
+def test_extracted_names_resolve_to_one_entry_per_college():
+    names = extract_college_names("Chances of admission into Cal, UC Berkeley, the University of Michigan and UMich?")
+    assert resolve_college_names(names) == ["University of California, Berkeley", "University of Michigan"]
+
+
+def test_restricted_queries_keep_the_rest_of_the_text():
+    assert restrict_query_to_colleges(QUERY, ["Stanford"]).endswith("chances of admission into Stanford?")
+    assert restrict_query_to_colleges(QUERY, ["Caltech", "Stanford"]).endswith("into Caltech and Stanford?")
+    assert restrict_query_to_colleges("My list:\n- Stanford\n- MIT\n- Yale", ["MIT", "Yale"]) == "My list:\n- MIT\n- Yale"
+    assert restrict_query_to_colleges("Help me decide.", ["MIT"]) == "Help me decide.\n\nColleges to analyze: MIT"
+
+
+# --- Profiles ---
+
+def test_profile_fields_are_extracted():
+    assert extract_profile(QUERY) == {"Unweighted GPA": 3.75, "Weighted GPA": 4.2, "SAT Score": 1550.0,
+                                      "ACT Score": 35.0}
+    assert summarize_profile(QUERY) == "Unweighted GPA: 3.75. Weighted GPA: 4.2. SAT Score: 1550. ACT Score: 35."
+    assert summarize_profile("Where should I apply?").startswith("No GPA or standardized test scores")
+
+
+def test_college_requests_name_one_college():
+    request = build_college_request(QUERY, "Stanford University")
+    assert request.startswith(f"Student query (verbatim):\n{QUERY}")
+    assert "Analyze ONLY this college: Stanford University." in request
+
+
+# --- Parallel Coordinator ---
+
+class ScriptedAgent(BaseAgent):
+    """Answers with a college block for the college in its request, or with a fixed note."""
+
+    async def _run_async_impl(self, ctx):
+        match = re.search(r"Analyze ONLY this college: (.+)\.", content_text(ctx.user_content))
+        text = fallback_college_block(match.group(1), "Scripted.") if match else f"{self.name} handled the query."
+        yield Event(author=self.name, invocation_id=ctx.invocation_id, branch=ctx.branch,
+                    content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]))
+
+
+def make_coordinator():
+    return ParallelCoordinatorAgent(name="ParallelCoordinator", college_agent=ScriptedAgent(name="CollegeAnalyst"),
+                                    fallback_agent=ScriptedAgent(name="SequentialCoordinator"))
+
+
+def test_parallel_coordinator_analyzes_every_college_in_query_order():
+    output = parse_coordinator_output(asyncio.run(run_agent_to_text(make_coordinator(), QUERY)))
+    assert [college.college_name for college in output.colleges] == [
+        "California Institute of Technology", "Stanford University", "University of California, Berkeley"]
+
+
+def test_parallel_coordinator_delegates_uncertain_lists():
+    query = "What are my chances of admission into Stanford, MIT, or some state school?"
+    assert asyncio.run(run_agent_to_text(make_coordinator(), query)) == "SequentialCoordinator handled the query."
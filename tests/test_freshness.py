@@ -0,0 +1,83 @@
+# tests/test_freshness.py
+
+import types
+
+import pytest
+
+from insight_agent.freshness import (
+    DAY_SECONDS,
+    SEARCH_DECISION_KEY,
+    FreshnessStore,
+    SearchPolicy,
+    gate_search_calls,
+    verification_outcome,
+)
+
+
+@pytest.mark.parametrize("summary", [
+    "MIT reinstated its SAT/ACT requirement for applicants.",
+    "Dartmouth will now require standardized test scores starting with the Class of 2029.",
+    "Yale adopted a new test-flexible policy.",
+    "Harvard became test-required again.",
+    "UVA ended its early decision option.",
+    "No major changes, but the college now requires the SAT again.",
+])
+def test_explicit_change_signals_are_changes(summary):
+    assert verification_outcome(summary) == "changed"
+
+
+@pytest.mark.parametrize("summary", [
+    "No recent admissions policy changes were found.",
+    "There is no new information about Stanford admissions.",
+])
+def test_no_change_statements(summary):
+    assert verification_outcome(summary) == "no_change"
+
+
+@pytest.mark.parametrize("summary", [
+    "Stanford's acceptance rate for the Class of 2028 was 3.6%, with a middle 50% SAT of 1500-1570.",
+    "The university remains test-optional for the 2024-2025 cycle.",
+    "The admissions office will consider essays and recommendations.",
+])
+def test_ordinary_search_results_are_not_changes(summary):
+    assert verification_outcome(summary) == "unknown"
+
+
+def test_search_failures():
+    assert verification_outcome("Search failed: the request timed out.") == "failed"
+
+
+def test_only_changes_make_a_college_volatile():
+    now = [1_000_000_000.0]
+    store = FreshnessStore(clock=lambda: now[0])
+    policy = SearchPolicy(store, clock=lambda: now[0])
+    for college, summary in (("Stanford University", "Stanford's acceptance rate was 3.6%."),
+                             ("Massachusetts Institute of Technology", "MIT reinstated its SAT requirement.")):
+        store.record_verification(college, verification_outcome(summary), summary)
+    now[0] += 10 * DAY_SECONDS
+    stanford = policy.decide("Stanford University", rag_data_year=2099)
+    mit = policy.decide("Massachusetts Institute of Technology", rag_data_year=2099)
+    assert not stanford["volatile"] and stanford["decision"] == "skip"
+    assert mit["volatile"] and mit["decision"] == "search"
+
+
+def test_aliases_of_a_college_share_one_row():
+    store = FreshnessStore()
+    store.record_data_year("MIT", 2023)
+    store.record_verification("Massachusetts Institute of Technology", "no_change", "No changes.")
+    row = store.get("the Massachusetts Institute of Technology (MIT)")
+    assert (row["data_year"], row["verification_outcome"]) == (2023, "no_change")
+    assert store.invalidate_verifications("MIT") == 1
+
+
+def test_volatile_colleges_are_matched_by_alias():
+    policy = SearchPolicy(FreshnessStore(), volatile_colleges=["MIT"])
+    assert policy.decide("Massachusetts Institute of Technology", rag_data_year=2099)["volatile"]
+
+
+def test_a_skip_decision_gates_search_calls_that_name_the_college_by_alias():
+    tool_context = types.SimpleNamespace(state={SEARCH_DECISION_KEY: {
+        "college_name": "Massachusetts Institute of Technology", "decision": "skip", "reason": "Current data."}})
+    result = gate_search_calls(types.SimpleNamespace(name="SearchAgent"),
+                               {"request": "Recent MIT admission policy changes"}, tool_context)
+    assert result["status"] == "skipped"
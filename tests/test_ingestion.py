@@ -0,0 +1,261 @@
+# tests/test_ingestion.py
+
+import os
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from insight_agent.scripts.ingestion import (
+    DataDirWatcher,
+    IngestionManifest,
+    bulk_ingest,
+    delete_removed_sources,
+    make_preprocessor,
+    snapshot_source_files,
+    upload_with_retry,
+)
+from insight_agent.testing.fakes import FakeRagCorpus
+
+CORPUS = "projects/p/locations/l/ragCorpora/1"
+
+SECTION = """College Name: Example University
+Common Data Set 2023-2024
+Section C: First-Time, First-Year Admission
+C1. Total first-time, first-year students who applied: 43,645 admitted: 2,790 enrolled: 1,663
+C9. SAT Evidence-Based Reading and Writing 25th percentile 720, 75th percentile 770
+"""
+
+
+def write(data_dir, name, text):
+    path = os.path.join(data_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def ingest(data_dir, manifest_path, rag, staging_dir, **kwargs):
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir))
+    return bulk_ingest(CORPUS, paths, data_dir, rag_module=rag, manifest_path=manifest_path,
+                       prepare=make_preprocessor(staging_dir), sleep=lambda delay: None, **kwargs)
+
+
+def ingest_raw(data_dir, manifest_path, rag, corpus=CORPUS, **kwargs):
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir))
+    return bulk_ingest(corpus, paths, data_dir, rag_module=rag, manifest_path=manifest_path,
+                       sleep=lambda delay: None, **kwargs)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / "data"
+    path.mkdir()
+    write(str(path), "a.txt", "College Name: A University\nC1. Applicants: 1,000\n")
+    write(str(path), "b.txt", "College Name: B College\nC1. Applicants: 2,000\n")
+    return str(path)
+
+
+# --- Change Detection ---
+
+def test_unchanged_files_are_skipped(tmp_path, data_dir):
+    rag, manifest_path = FakeRagCorpus(), str(tmp_path / "manifest.json")
+    assert ingest_raw(data_dir, manifest_path, rag)["uploaded"] == 2
+    summary = ingest_raw(data_dir, manifest_path, rag)
+    assert (summary["uploaded"], summary["skipped"]) == (0, 2)
+    assert rag.uploads == ["a.txt", "b.txt"]
+
+
+def test_a_changed_file_replaces_its_previous_version(tmp_path, data_dir):
+    rag, manifest_path = FakeRagCorpus(), str(tmp_path / "manifest.json")
+    ingest_raw(data_dir, manifest_path, rag)
+    old_name = IngestionManifest(manifest_path).get("a.txt")["rag_file_name"]
+    write(data_dir, "a.txt", "College Name: A University\nC1. Applicants: 1,500\n")
+
+    summary = ingest_raw(data_dir, manifest_path, rag)
+    assert (summary["replaced"], summary["skipped"]) == (1, 1)
+    assert rag.deletes == [old_name]
+    assert "1,500" in rag.texts()["a.txt"]
+    assert IngestionManifest(manifest_path).get("a.txt")["rag_file_name"] in rag.files
+
+
+def test_files_recorded_for_another_corpus_are_uploaded_again(tmp_path, data_dir):
+    rag, manifest_path = FakeRagCorpus(), str(tmp_path / "manifest.json")
+    ingest_raw(data_dir, manifest_path, rag)
+    other_corpus = "projects/p/locations/l/ragCorpora/2"
+
+    summary = ingest_raw(data_dir, manifest_path, rag, corpus=other_corpus)
+    assert (summary["uploaded"], summary["replaced"], summary["skipped"]) == (2, 0, 0)
+    # The first corpus's files are left alone.
+    assert rag.deletes == []
+    assert IngestionManifest(manifest_path).get("a.txt")["corpus"] == other_corpus
+
+
+# --- Retries ---
+
+def test_transient_errors_are_retried_with_exponential_backoff():
+    rag = FakeRagCorpus(failures={"a.txt": [google_exceptions.ServiceUnavailable("busy")] * 3})
+    delays = []
+    rag_file, attempts = upload_with_retry(rag, CORPUS, __file__, "a.txt", base_delay=1.0, sleep=delays.append)
+    assert attempts == 4 and rag_file.name in rag.files
+    assert [0.5 <= delay / 2 ** n <= 1.0 for n, delay in enumerate(delays)] == [True] * 3
+
+
+def test_the_last_retryable_error_is_raised():
+    rag = FakeRagCorpus(failures={"a.txt": [google_exceptions.TooManyRequests("quota")] * 5})
+    with pytest.raises(google_exceptions.TooManyRequests):
+        upload_with_retry(rag, CORPUS, __file__, "a.txt", max_attempts=2, sleep=lambda delay: None)
+    assert rag.uploads == ["a.txt", "a.txt"]
+
+
+def test_other_errors_are_not_retried():
+    rag = FakeRagCorpus(failures={"a.txt": [google_exceptions.PermissionDenied("no")]})
+    with pytest.raises(google_exceptions.PermissionDenied):
+        upload_with_retry(rag, CORPUS, __file__, "a.txt", sleep=lambda delay: None)
+    assert rag.uploads == ["a.txt"]
+
+
+def test_zero_max_attempts_still_uploads_once():
+    rag = FakeRagCorpus()
+    rag_file, attempts = upload_with_retry(rag, CORPUS, __file__, "a.txt", max_attempts=0)
+    assert attempts == 1 and rag_file.name in rag.files
+
+
+def test_failed_uploads_are_retried_on_the_next_run(tmp_path, data_dir):
+    rag = FakeRagCorpus(failures={"a.txt": [google_exceptions.ServiceUnavailable("busy")] * 2})
+    manifest_path = str(tmp_path / "manifest.json")
+    summary = ingest_raw(data_dir, manifest_path, rag, max_attempts=2)
+    assert (summary["uploaded"], summary["failed"], summary["retries"]) == (1, 1, 0)
+    assert IngestionManifest(manifest_path).get("a.txt") is None
+
+    summary = ingest_raw(data_dir, manifest_path, rag)
+    assert (summary["uploaded"], summary["skipped"]) == (1, 1)
+
+
+# --- De-duplication ---
+
+def test_duplicated_text_is_kept_in_the_first_file_by_key_order(tmp_path):
+    data_dir, rag = str(tmp_path / "data"), FakeRagCorpus()
+    os.makedirs(data_dir)
+    for name in ("c.txt", "a.txt", "b.txt"):
+        write(data_dir, name, SECTION)
+    summary = ingest(data_dir, str(tmp_path / "manifest.json"), rag, str(tmp_path / "staging"), max_in_flight=4)
+    assert (summary["uploaded"], summary["deduplicated"]) == (1, 2)
+    assert list(rag.texts()) == ["a.txt"]
+
+
+def test_deduplicated_file_is_reingested_when_its_match_changes(tmp_path):
+    data_dir, rag, manifest_path = str(tmp_path / "data"), FakeRagCorpus(), str(tmp_path / "manifest.json")
+    os.makedirs(data_dir)
+    write(data_dir, "a.txt", SECTION)
+    write(data_dir, "b.txt", SECTION)
+    ingest(data_dir, manifest_path, rag, str(tmp_path / "staging"))
+    assert IngestionManifest(manifest_path).get("b.txt")["depends_on"] == {
+        "a.txt": IngestionManifest(manifest_path).get("a.txt")["sha256"]}
+
+    write(data_dir, "a.txt", SECTION.replace("43,645", "45,001"))
+    summary = ingest(data_dir, manifest_path, rag, str(tmp_path / "staging"))
+    assert (summary["replaced"], summary["uploaded"]) == (1, 1)
+    assert "43,645" in rag.texts()["b.txt"]
+
+
+def test_deduplicated_file_is_reingested_when_its_match_is_removed(tmp_path):
+    data_dir, rag, manifest_path = str(tmp_path / "data"), FakeRagCorpus(), str(tmp_path / "manifest.json")
+    os.makedirs(data_dir)
+    write(data_dir, "a.txt", SECTION)
+    write(data_dir, "b.txt", SECTION)
+    ingest(data_dir, manifest_path, rag, str(tmp_path / "staging"))
+    assert IngestionManifest(manifest_path).dependents(["a.txt"]) == {"b.txt"}
+
+    os.remove(os.path.join(data_dir, "a.txt"))
+    IngestionManifest(manifest_path).remove("a.txt")
+    summary = ingest(data_dir, manifest_path, rag, str(tmp_path / "staging"))
+    assert summary["uploaded"] == 1
+    assert "b.txt" in rag.texts()
+
+
+# --- Watch Mode ---
+
+def make_watcher(tmp_path, data_dir, rag, **kwargs):
+    return DataDirWatcher(CORPUS, data_dir, rag_module=rag, manifest_path=str(tmp_path / "manifest.json"), **kwargs)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_a_burst_of_changes_is_synced_as_one_batch(tmp_path, data_dir):
+    rag = FakeRagCorpus()
+    watcher = make_watcher(tmp_path, data_dir, rag, poll_interval=0.02, debounce=0.3, max_delay=5.0)
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        assert wait_for(lambda: len(watcher.syncs) == 1)
+        for name in ("c.txt", "d.txt", "e.txt"):
+            write(data_dir, name, f"College Name: {name}\n")
+            time.sleep(0.05)
+        assert wait_for(lambda: len(watcher.syncs) == 2)
+        time.sleep(0.4)
+    finally:
+        stop.set()
+        thread.join()
+    assert len(watcher.syncs) == 2
+    assert (watcher.syncs[1]["files"], watcher.syncs[1]["uploaded"]) == (3, 3)
+    assert "lag_p50_s" in watcher.syncs[1]
+
+
+def test_removed_files_are_deleted_from_the_corpus(tmp_path, data_dir):
+    rag = FakeRagCorpus()
+    watcher = make_watcher(tmp_path, data_dir, rag)
+    watcher.sync({"a.txt", "b.txt"}, snapshot_source_files(data_dir), initial=True)
+    os.remove(os.path.join(data_dir, "a.txt"))
+
+    metrics = watcher.sync({"a.txt"}, snapshot_source_files(data_dir))
+    assert (metrics["deleted"], metrics["failed"]) == (1, 0)
+    assert list(rag.texts()) == ["b.txt"]
+    assert IngestionManifest(watcher.manifest_path).get("a.txt") is None
+
+
+def test_failed_deletes_keep_their_manifest_entry(tmp_path, data_dir):
+    rag, manifest_path = FakeRagCorpus(), str(tmp_path / "manifest.json")
+    ingest_raw(data_dir, manifest_path, rag)
+    IngestionManifest(manifest_path).record("gone.txt", sha256="0", corpus=CORPUS, rag_file_name="missing")
+    assert delete_removed_sources(["a.txt", "gone.txt"], rag, manifest_path) == (1, 1)
+    assert IngestionManifest(manifest_path).get("gone.txt") is not None
+
+
+def test_files_deduplicated_against_a_removed_file_are_uploaded(tmp_path):
+    data_dir, rag = str(tmp_path / "data"), FakeRagCorpus()
+    os.makedirs(data_dir)
+    write(data_dir, "a.txt", SECTION)
+    write(data_dir, "b.txt", SECTION)
+    watcher = make_watcher(tmp_path, data_dir, rag, preprocess_dir=str(tmp_path / "staging"))
+    watcher.sync({"a.txt", "b.txt"}, snapshot_source_files(data_dir), initial=True)
+    assert list(rag.texts()) == ["a.txt"]
+    os.remove(os.path.join(data_dir, "a.txt"))
+
+    metrics = watcher.sync({"a.txt"}, snapshot_source_files(data_dir))
+    assert (metrics["deleted"], metrics["uploaded"]) == (1, 1)
+    assert list(rag.texts()) == ["b.txt"]
+
+
+def test_changes_made_while_stopped_are_reconciled_on_start(tmp_path, data_dir):
+    rag = FakeRagCorpus()
+    make_watcher(tmp_path, data_dir, rag).sync({"a.txt", "b.txt"}, snapshot_source_files(data_dir), initial=True)
+    os.remove(os.path.join(data_dir, "a.txt"))
+    write(data_dir, "b.txt", "College Name: B College\nC1. Applicants: 2,500\n")
+    write(data_dir, "c.txt", "College Name: C University\n")
+
+    stop = threading.Event()
+    stop.set()
+    watcher = make_watcher(tmp_path, data_dir, rag)
+    assert len(watcher.run(stop)) == 1
+    metrics = watcher.syncs[0]
+    assert metrics["initial"]
+    assert (metrics["uploaded"], metrics["replaced"], metrics["deleted"]) == (1, 1, 1)
+    assert sorted(rag.texts()) == ["b.txt", "c.txt"]
+    assert "2,500" in rag.texts()["b.txt"]
@@ -0,0 +1,159 @@
+# tests/test_local_retrieval.py
+
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from insight_agent import local_retrieval, tools
+from insight_agent.local_retrieval import (
+    HashingEmbedder,
+    LocalVectorIndex,
+    build_local_index,
+    data_fingerprint,
+    get_local_index,
+)
+from insight_agent.rag_cache import RetrievalCache
+from insight_agent.tools import LocalRagRetrieval
+
+DOCUMENTS = {
+    "stanford.txt": "College Name: Stanford University\nAdmissions\nStanford admitted 4% of applicants to the class of 2028.\n",
+    "mit.txt": "College Name: Massachusetts Institute of Technology\nAdmissions\nMIT admitted 5% of applicants from its early action pool.\n",
+    os.path.join("cds", "rice.txt"): "College Name: Rice University\nFinancial Aid\nRice meets full demonstrated need for admitted students.\n",
+}
+
+
+def write_documents(data_dir, documents=DOCUMENTS):
+    for name, text in documents.items():
+        path = os.path.join(data_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = str(tmp_path / "data")
+    write_documents(path)
+    return path
+
+
+@pytest.fixture
+def default_index(monkeypatch):
+    """A fresh get_local_index() cache that re-checks the data directory on every call."""
+    monkeypatch.setattr(local_retrieval, "_default_index", None)
+    monkeypatch.setattr(local_retrieval, "FINGERPRINT_CHECK_INTERVAL", 0.0)
+
+
+# --- Embedder ---
+
+def test_hashing_embeddings_are_deterministic_and_unit_length():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["Stanford admission rate", "Stanford admission rate", ""])
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    assert np.array_equal(vectors[0], HashingEmbedder(dim=64).embed(["Stanford admission rate"])[0])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()  # No features: a zero vector rather than NaNs.
+    assert embedder.name == "hashing-64"
+
+
+def test_hashing_embeddings_rank_shared_words_higher():
+    query, related, unrelated = HashingEmbedder().embed(
+        ["stanford acceptance rate", "Stanford's acceptance rate was 4%", "Rice meets full demonstrated need"])
+    assert query @ related > query @ unrelated
+    # Case and punctuation do not change the features.
+    assert np.array_equal(*HashingEmbedder().embed(["Acceptance, Rate!", "acceptance rate"]))
+
+
+# --- Index Build and Query ---
+
+def test_index_round_trips_chunks_through_the_memory_mapped_files(data_dir, tmp_path):
+    index_dir = str(tmp_path / "index")
+    assert build_local_index(data_dir, index_dir, HashingEmbedder(), batch_size=2) == 3
+    index = LocalVectorIndex(index_dir, HashingEmbedder())
+    assert len(index) == 3
+    assert isinstance(index._vectors, np.memmap) and isinstance(index._texts, np.memmap)
+    assert index.fingerprint == data_fingerprint(data_dir)
+    assert index.meta["sources"] == ["mit.txt", "stanford.txt", os.path.join("cds", "rice.txt")]
+    assert [index.chunk(row)["source"] for row in range(3)] == index.meta["sources"]
+
+    results = index.query("Which share of applicants did Stanford admit?", top_k=2)
+    assert [result["source"] for result in results][0] == "stanford.txt"
+    assert results[0]["text"].startswith("College Name: Stanford University")
+    assert results[0]["score"] >= results[1]["score"]
+    assert len(index.query("admitted", top_k=10)) == 3
+
+
+def test_batch_size_does_not_change_the_index(data_dir, tmp_path):
+    for batch_size in (1, 256):
+        build_local_index(data_dir, str(tmp_path / f"index{batch_size}"), HashingEmbedder(), batch_size=batch_size)
+    small, large = (LocalVectorIndex(str(tmp_path / f"index{size}"), HashingEmbedder()) for size in (1, 256))
+    assert np.array_equal(small._vectors, large._vectors)
+    assert [small.chunk(row) for row in range(3)] == [large.chunk(row) for row in range(3)]
+
+
+def test_empty_data_directory_builds_an_empty_index(tmp_path):
+    os.makedirs(tmp_path / "empty")
+    assert build_local_index(str(tmp_path / "empty"), str(tmp_path / "index"), HashingEmbedder()) == 0
+    assert LocalVectorIndex(str(tmp_path / "index"), HashingEmbedder()).query("anything") == []
+
+
+def test_index_refuses_a_different_embedder(data_dir, tmp_path):
+    build_local_index(data_dir, str(tmp_path / "index"), HashingEmbedder(dim=64))
+    with pytest.raises(ValueError, match="hashing-64"):
+        LocalVectorIndex(str(tmp_path / "index"), HashingEmbedder(dim=128))
+
+
+# --- Staleness ---
+
+def test_fingerprint_tracks_visible_files_only(data_dir):
+    before = data_fingerprint(data_dir)
+    assert data_fingerprint(data_dir) == before
+    write_documents(data_dir, {".DS_Store": "ignored", os.path.join(".git", "HEAD"): "ignored"})
+    assert data_fingerprint(data_dir) == before
+    write_documents(data_dir, {"mit.txt": DOCUMENTS["mit.txt"] + "MIT is need-blind.\n"})
+    assert data_fingerprint(data_dir) != before
+
+
+def test_default_index_is_rebuilt_when_the_data_changes(data_dir, tmp_path, default_index):
+    index_dir = str(tmp_path / "index")
+    first = get_local_index(data_dir, index_dir)
+    assert len(first) == 3
+    assert get_local_index(data_dir, index_dir) is first
+
+    write_documents(data_dir, {"yale.txt": "College Name: Yale University\nAdmissions\nYale admitted 4.6% of applicants.\n"})
+    second = get_local_index(data_dir, index_dir)
+    assert len(second) == 4 and second.fingerprint == data_fingerprint(data_dir)
+    assert get_local_index(data_dir, index_dir).query("Yale", top_k=1)[0]["source"] == "yale.txt"
+
+
+# --- Retrieval Tool ---
+
+def test_index_build_runs_off_the_event_loop(data_dir, tmp_path, default_index, monkeypatch):
+    def slow_get_local_index(*args):
+        time.sleep(0.3)  # Stands in for a rebuild.
+        return local_retrieval.get_local_index(*args)
+
+    monkeypatch.setattr(tools, "get_local_index", slow_get_local_index)
+    tool = LocalRagRetrieval(name="retrieve_rag_documentation", description="Retrieval.", cache=RetrievalCache(),
+                             data_dir=data_dir, index_dir=str(tmp_path / "index"))
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        result = await tool.run_async(args={"query": "Rice financial aid"}, tool_context=None)
+        ticking.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result[0].startswith("College Name: Rice University")
+    assert ticks >= 10  # The event loop kept running during the build.
@@ -0,0 +1,90 @@
+# tests/test_preprocess.py
+
+import re
+
+from insight_agent.preprocess import MinHashDeduper, iter_chunks, stage_preprocessed_file
+
+CDS_SECTION = """College Name: Example University
+Common Data Set 2023-2024
+Section C: First-Time, First-Year Admission
+C1. Total first-time, first-year men who applied: 21,532 admitted: 1,402 enrolled: 841
+C1. Total first-time, first-year women who applied: 22,113 admitted: 1,388 enrolled: 822
+C9. SAT Evidence-Based Reading and Writing 25th percentile 720, 75th percentile 770
+C9. SAT Math 25th percentile 750, 75th percentile 800
+C11. Percent who had GPA of 3.75 and higher 95.2%
+"""
+
+
+def next_year(text):
+    """The same section a year later: identical wording, every figure changed."""
+    return re.sub(r"\d+", lambda match: str(int(match.group()) + 1), text)
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_exact_duplicate_is_dropped():
+    deduper = MinHashDeduper()
+    assert not deduper.is_duplicate(CDS_SECTION)
+    assert deduper.is_duplicate(CDS_SECTION)
+    assert deduper.duplicates == 1
+
+
+def test_reformatted_copy_is_a_near_duplicate():
+    deduper = MinHashDeduper()
+    assert not deduper.is_duplicate(CDS_SECTION)
+    reformatted = CDS_SECTION.replace("\n", " \n").replace(":", " :")
+    assert deduper.is_duplicate(reformatted)
+
+
+def test_sections_with_different_figures_are_kept():
+    deduper = MinHashDeduper()
+    assert not deduper.is_duplicate(CDS_SECTION)
+    assert not deduper.is_duplicate(next_year(CDS_SECTION))
+    assert not deduper.is_duplicate(CDS_SECTION.replace("95.2%", "95.3%"))
+
+
+def test_sections_with_different_headers_are_kept():
+    deduper = MinHashDeduper()
+    assert not deduper.is_duplicate(CDS_SECTION)
+    assert not deduper.is_duplicate(CDS_SECTION.replace("Section C: First-Time", "Section D: First-Time"))
+
+
+def test_title_lines_are_left_out_of_the_comparison():
+    deduper = MinHashDeduper()
+    assert not deduper.is_duplicate(CDS_SECTION, source="example.txt")
+    retitled = CDS_SECTION.replace("College Name: Example University", "College Name: Example Univ.")
+    assert deduper.duplicate_source(retitled, source="copy.txt") == "example.txt"
+
+
+def test_consecutive_cds_years_are_both_staged(tmp_path):
+    deduper = MinHashDeduper()
+    staging = str(tmp_path / "staging")
+    older = write(tmp_path, "cds_2023_2024.txt", CDS_SECTION)
+    newer = write(tmp_path, "cds_2024_2025.txt", next_year(CDS_SECTION))
+    for path in (older, newer):
+        staged_path, stats = stage_preprocessed_file(path, staging, deduper, source=path)
+        assert staged_path is not None
+        assert stats["chunks_dropped"] == 0
+
+
+def test_staged_files_name_the_sources_they_rely_on(tmp_path):
+    deduper = MinHashDeduper()
+    staging = str(tmp_path / "staging")
+    original = write(tmp_path, "a.txt", CDS_SECTION)
+    copy = write(tmp_path, "b.txt", CDS_SECTION.replace("Common Data Set 2023-2024", "Common Data Set 2023-24"))
+    assert stage_preprocessed_file(original, staging, deduper, source="a.txt")[1]["duplicate_of"] == []
+    staged_path, stats = stage_preprocessed_file(copy, staging, deduper, source="b.txt")
+    assert staged_path is None
+    assert stats["chunks_dropped"] == 1
+    assert stats["duplicate_of"] == ["a.txt"]
+
+
+def test_chunks_repeat_title_lines_and_split_at_sections():
+    text = CDS_SECTION + "Section D: Transfer Admission\nD2. Applicants: 2,310\n"
+    chunks = list(iter_chunks(text.splitlines(), "example"))
+    assert [chunk.section for chunk in chunks] == ["Section C", "Section D"]
+    assert all(chunk.text.startswith("College Name: Example University\nCommon Data Set 2023-2024") for chunk in chunks)
@@ -0,0 +1,123 @@
+# tests/test_presenter.py
+
+import asyncio
+from typing import Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+from insight_agent.coordinator_output import COLLEGE_BLOCK_END, COLLEGE_BLOCK_START, render_coordinator_output
+from insight_agent.presenter import TemplatePresenterAgent
+from insight_agent.report import INCOMPLETE_ANALYSIS_NOTE, PRESENTER_ERROR_MESSAGE
+from insight_agent.runtime import content_text, iter_agent_events
+
+
+def college_block(college):
+    return "\n".join([
+        COLLEGE_BLOCK_START,
+        f"COLLEGE_NAME: {college}",
+        "CLASSIFICATION: Target",
+        "DETAILED_RATIONALE: Within the middle 50%.",
+        "INTERNAL_PROCESSING_NOTES: Secret.",
+        COLLEGE_BLOCK_END,
+    ])
+
+
+OUTPUT = render_coordinator_output("GPA 3.8.", "Two colleges.", [college_block("Rice University"),
+                                                                 college_block("Emory University")])
+
+
+class StreamingCoordinator(BaseAgent):
+    """Streams `partials` as partial events, then sends `final` (None: no final event) or raises."""
+
+    partials: list = []
+    final: Optional[str] = None
+    fail: bool = False
+
+    def _event(self, ctx, text, partial=None):
+        return Event(author=self.name, invocation_id=ctx.invocation_id, branch=ctx.branch, partial=partial,
+                     content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]))
+
+    async def _run_async_impl(self, ctx):
+        for piece in self.partials:
+            yield self._event(ctx, piece, partial=True)
+        if self.fail:
+            raise RuntimeError("model call failed")
+        if self.final is not None:
+            yield self._event(ctx, self.final)
+
+
+def present(partials=(), final=None, fail=False):
+    """Runs the presenter; returns (partial texts, final text)."""
+    coordinator = StreamingCoordinator(name="Coordinator", partials=list(partials), final=final, fail=fail)
+    presenter = TemplatePresenterAgent(name="Presenter", coordinator_agent=coordinator)
+
+    async def run():
+        partial_texts, final_texts = [], []
+        async for event in iter_agent_events(presenter, "What are my chances?"):
+            if event.author == presenter.name:
+                (partial_texts if event.partial else final_texts).append(content_text(event.content))
+        return partial_texts, final_texts
+
+    partial_texts, final_texts = asyncio.run(run())
+    assert len(final_texts) == 1
+    return partial_texts, final_texts[0]
+
+
+def pieces(text, size=23):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def headings(report):
+    return [line for line in report.splitlines() if line.startswith("### ")]
+
+
+# --- Streaming ---
+
+def test_streamed_output_is_reported_college_by_college():
+    partial_texts, report = present(pieces(OUTPUT), final=OUTPUT)
+    assert headings(report) == ["### Rice University", "### Emory University"]
+    assert [headings(text) for text in partial_texts[1:3]] == [["### Rice University"], ["### Emory University"]]
+    assert report == "".join(partial_texts)
+    assert "Secret" not in report and INCOMPLETE_ANALYSIS_NOTE not in report
+
+
+def test_unstreamed_output_is_parsed_from_the_final_event():
+    _, report = present(final=OUTPUT)
+    assert headings(report) == ["### Rice University", "### Emory University"]
+
+
+# --- Re-parse of the Final Event ---
+
+def test_colleges_missing_from_the_partials_are_taken_from_the_final_event():
+    _, report = present([college_block("Rice University") + "\n"], final=OUTPUT)
+    assert headings(report) == ["### Rice University", "### Emory University"]
+    assert INCOMPLETE_ANALYSIS_NOTE not in report
+
+
+def test_colleges_streamed_before_a_malformed_final_event_are_still_reported():
+    _, report = present([college_block("Rice University") + "\n"], final="Sorry, I ran out of time.")
+    assert headings(report) == ["### Rice University"]
+    assert INCOMPLETE_ANALYSIS_NOTE in report
+
+
+# --- Malformed Output ---
+
+def test_colleges_parsed_before_a_failure_are_reported_as_incomplete():
+    cut = OUTPUT.index("COLLEGE_NAME: Emory University")
+    _, report = present(pieces(OUTPUT[:cut]), fail=True)
+    assert headings(report) == ["### Rice University"]
+    assert INCOMPLETE_ANALYSIS_NOTE in report
+
+
+def test_a_cut_off_college_block_is_reported_as_incomplete():
+    cut = OUTPUT.index(COLLEGE_BLOCK_END, OUTPUT.index("Emory University"))
+    _, report = present(pieces(OUTPUT[:cut]))
+    assert headings(report) == ["### Rice University", "### Emory University"]
+    assert INCOMPLETE_ANALYSIS_NOTE in report
+
+
+def test_output_without_college_blocks_gets_the_error_message():
+    assert present(final="I could not analyze these colleges.")[1] == PRESENTER_ERROR_MESSAGE
+    assert present(["INTERNAL_COORDINATOR"], fail=True)[1] == PRESENTER_ERROR_MESSAGE
@@ -0,0 +1,93 @@
+# tests/test_rag_cache.py
+
+from insight_agent.rag_cache import RetrievalCache, invalidate_corpus, make_cache_key
+
+CORPUS = "projects/p/locations/l/ragCorpora/1"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# --- Keys ---
+
+def test_case_punctuation_and_whitespace_share_a_key():
+    assert make_cache_key("Stanford  SAT scores?", CORPUS, 5) == make_cache_key("stanford sat scores", CORPUS, 5)
+    assert make_cache_key("Stanford SAT scores", CORPUS, 5) != make_cache_key("SAT scores Stanford", CORPUS, 5)
+    assert make_cache_key("Stanford SAT scores", CORPUS, 5) != make_cache_key("Stanford SAT scores", CORPUS, 3)
+
+
+# --- In-Memory Tier ---
+
+def test_least_recently_used_entries_are_evicted():
+    cache = RetrievalCache(max_entries=2)
+    cache.put("a", CORPUS, 5, ["A"])
+    cache.put("b", CORPUS, 5, ["B"])
+    assert cache.get("a", CORPUS, 5) == ["A"]
+    cache.put("c", CORPUS, 5, ["C"])
+    assert cache.get("b", CORPUS, 5) is None
+    assert cache.get("a", CORPUS, 5) == ["A"] and cache.get("c", CORPUS, 5) == ["C"]
+    stats = cache.stats()
+    assert (stats["evictions"], stats["memory_entries"], stats["hits"], stats["misses"]) == (1, 2, 3, 1)
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = RetrievalCache(ttl_seconds=60, clock=clock)
+    cache.put("a", CORPUS, 5, ["A"])
+    clock.now += 61
+    assert cache.get("a", CORPUS, 5) is None
+    assert cache.stats()["expirations"] == 1
+
+
+# --- On-Disk Tier ---
+
+def test_entries_persist_across_instances(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    first = RetrievalCache(db_path=db_path)
+    first.put("Stanford SAT scores", CORPUS, 5, ["chunk"])
+    first.close()
+
+    second = RetrievalCache(db_path=db_path)
+    assert second.get("stanford sat scores", CORPUS, 5) == ["chunk"]
+    assert second.get("stanford sat scores", CORPUS, 5) == ["chunk"]
+    stats = second.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+    second.close()
+
+
+# --- Invalidation ---
+
+def test_invalidate_drops_only_that_corpus():
+    cache = RetrievalCache()
+    cache.put("a", CORPUS, 5, ["A"])
+    cache.put("a", "other", 5, ["other A"])
+    cache.invalidate(CORPUS)
+    assert cache.get("a", CORPUS, 5) is None
+    assert cache.get("a", "other", 5) == ["other A"]
+
+
+def test_invalidations_from_another_process_make_entries_stale(tmp_path):
+    db_path, clock = str(tmp_path / "cache.sqlite"), Clock()
+    cache = RetrievalCache(db_path=db_path, generation_check_interval=30, clock=clock)
+    cache.put("a", CORPUS, 5, ["A"])
+
+    assert invalidate_corpus(CORPUS, db_path=db_path)
+    # The generation is re-read from disk at most every generation_check_interval seconds.
+    assert cache.get("a", CORPUS, 5) == ["A"]
+    clock.now += 31
+    assert cache.get("a", CORPUS, 5) is None
+    assert cache.stats()["stale"] == 1
+
+    cache.put("a", CORPUS, 5, ["new A"])
+    assert RetrievalCache(db_path=db_path, clock=clock).get("a", CORPUS, 5) == ["new A"]
+    cache.close()
+
+
+def test_invalidate_corpus_needs_a_shared_cache(monkeypatch):
+    monkeypatch.delenv("RAG_CACHE_PATH", raising=False)
+    assert invalidate_corpus(CORPUS) is False
@@ -0,0 +1,144 @@
+# tests/test_resilience.py
+
+import asyncio
+import time
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.tools.agent_tool import AgentTool
+
+from insight_agent.resilience import (
+    DEADLINE_EXCEEDED,
+    FAILED,
+    TIMED_OUT,
+    DeadlineAgentTool,
+    build_specialist_tool,
+    get_latency_tracker,
+    get_resilience_stats,
+    request_deadline_scope,
+)
+
+RESILIENCE_SETTINGS = ("INSIGHT_SUBAGENT_TIMEOUT_S", "INSIGHT_SUBAGENT_TIMEOUTS", "INSIGHT_HEDGE_PERCENTILE",
+                       "INSIGHT_REQUEST_DEADLINE_S", "INSIGHT_SINGLEFLIGHT")
+
+
+@pytest.fixture(autouse=True)
+def no_resilience_settings(monkeypatch):
+    for name in RESILIENCE_SETTINGS:
+        monkeypatch.delenv(name, raising=False)
+
+
+class ScriptedSubAgent:
+    """Replaces AgentTool.run_async: the n-th call sleeps delays[n] seconds (or raises it) and
+    returns its call number; cancelled calls are recorded."""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = []
+
+    async def __call__(self, tool, *, args, tool_context):
+        call = self.calls
+        self.calls += 1
+        delay = self.delays[min(call, len(self.delays) - 1)]
+        if isinstance(delay, Exception):
+            raise delay
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(call)
+            raise
+        return f"call {call}"
+
+
+def make_tool(monkeypatch, sub_agent, name, **kwargs):
+    monkeypatch.setattr(AgentTool, "run_async", sub_agent)
+    return DeadlineAgentTool(LlmAgent(name=name, model="gemini-2.0-flash"), **kwargs)
+
+
+def call(tool):
+    return asyncio.run(tool.run_async(args={"request": "Stanford admission statistics"}, tool_context=None))
+
+
+# --- Per-Call Timeout ---
+
+def test_slow_calls_are_cancelled_at_their_timeout(monkeypatch):
+    sub_agent = ScriptedSubAgent(10.0)
+    tool = make_tool(monkeypatch, sub_agent, "TimeoutAgent", timeout=0.05)
+    started = time.monotonic()
+    result = call(tool)
+    assert time.monotonic() - started < 1.0
+    assert result["status"] == TIMED_OUT and result["agent"] == "TimeoutAgent"
+    assert sub_agent.cancelled == [0]
+
+
+def test_fast_calls_return_the_sub_agent_result(monkeypatch):
+    tool = make_tool(monkeypatch, ScriptedSubAgent(0.0), "FastAgent", timeout=5.0)
+    assert call(tool) == "call 0"
+
+
+def test_sub_agent_errors_become_failed_results(monkeypatch):
+    tool = make_tool(monkeypatch, ScriptedSubAgent(RuntimeError("boom")), "FailingAgent", timeout=5.0)
+    result = call(tool)
+    assert result["status"] == FAILED
+    assert "RuntimeError: boom" in result["message"]
+
+
+# --- Hedging ---
+
+def test_a_hedge_starts_after_the_latency_percentile_and_the_first_to_finish_wins(monkeypatch):
+    for _ in range(5):
+        get_latency_tracker("HedgedAgent").record(0.05)
+    sub_agent = ScriptedSubAgent(10.0, 0.0)
+    tool = make_tool(monkeypatch, sub_agent, "HedgedAgent", timeout=5.0, hedge_percentile=95, hedge_min_samples=5)
+    wins_before = get_resilience_stats().get("hedge_wins", 0)
+    started = time.monotonic()
+    assert call(tool) == "call 1"
+    assert time.monotonic() - started < 1.0
+    assert sub_agent.cancelled == [0]
+    assert get_resilience_stats()["hedge_wins"] - wins_before == 1
+
+
+def test_no_hedge_before_enough_latency_samples(monkeypatch):
+    sub_agent = ScriptedSubAgent(0.1)
+    tool = make_tool(monkeypatch, sub_agent, "UnsampledAgent", timeout=5.0, hedge_percentile=95, hedge_min_samples=5)
+    assert call(tool) == "call 0"
+    assert sub_agent.calls == 1
+
+
+# --- Request Deadline ---
+
+def test_the_request_deadline_cuts_calls_short(monkeypatch):
+    sub_agent = ScriptedSubAgent(10.0)
+    tool = make_tool(monkeypatch, sub_agent, "DeadlineAgent")
+
+    async def run():
+        with request_deadline_scope(0.05):
+            return await tool.run_async(args={"request": "Stanford"}, tool_context=None)
+
+    result = asyncio.run(run())
+    assert result["status"] == DEADLINE_EXCEEDED
+    assert sub_agent.cancelled == [0]
+
+
+def test_no_calls_are_made_after_the_request_deadline(monkeypatch):
+    sub_agent = ScriptedSubAgent(0.0)
+    tool = make_tool(monkeypatch, sub_agent, "LateAgent", timeout=5.0)
+
+    async def run():
+        with request_deadline_scope(0.01):
+            await asyncio.sleep(0.02)
+            return await tool.run_async(args={"request": "Stanford"}, tool_context=None)
+
+    assert asyncio.run(run())["status"] == DEADLINE_EXCEEDED
+    assert sub_agent.calls == 0
+
+
+# --- Configuration ---
+
+def test_specialists_keep_the_plain_agent_tool_unless_configured(monkeypatch):
+    agent = LlmAgent(name="RAGAgent", model="gemini-2.0-flash")
+    assert type(build_specialist_tool(agent)) is AgentTool
+    monkeypatch.setenv("INSIGHT_SUBAGENT_TIMEOUTS", "RAGAgent=30")
+    tool = build_specialist_tool(agent)
+    assert isinstance(tool, DeadlineAgentTool) and tool.timeout == 30.0
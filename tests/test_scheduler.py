@@ -0,0 +1,244 @@
+# tests/test_scheduler.py
+
+import asyncio
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from insight_agent.scheduler import (
+    BATCH,
+    DEFAULT_OUTPUT_TOKEN_ESTIMATE,
+    INTERACTIVE,
+    CallScheduler,
+    Quota,
+    ScheduledLlm,
+    TokenBucket,
+    estimate_request_tokens,
+    scheduling_scope,
+)
+from insight_agent.testing.fakes import DEFAULT_RECORDINGS, QuotaEnforcingEndpoint, ReplayLlm, scaled_latency
+from insight_agent.tracing import estimate_tokens
+
+MODEL = "gemini-test"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def request(text="Admission statistics for Stanford University"):
+    return LlmRequest(model=MODEL, contents=[genai_types.Content(role="user", parts=[genai_types.Part(text=text)])])
+
+
+# --- Token Buckets ---
+
+def test_token_bucket_refills_at_its_rate_up_to_capacity():
+    clock = Clock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=5, clock=clock)
+    bucket.take(5)
+    assert bucket.delay(2) == pytest.approx(2.0)
+    clock.now = 1.0
+    assert bucket.level() == pytest.approx(1.0)
+    clock.now = 100.0
+    assert bucket.level() == pytest.approx(5.0)
+    assert bucket.delay(50) == 0.0  # Larger than the capacity: waits for a full bucket only.
+
+
+def test_token_bucket_debt_delays_later_calls():
+    clock = Clock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=5, clock=clock)
+    bucket.take(8)
+    assert bucket.level() == pytest.approx(-3.0)
+    assert bucket.delay(1) == pytest.approx(4.0)
+    bucket.drain()
+    assert bucket.level() == pytest.approx(-3.0)
+
+
+def test_quota_reserves_both_limits_or_nothing():
+    clock = Clock()
+    quota = Quota(rpm=100, tpm=1000, clock=clock)  # Bursts of 10 requests and 100 tokens.
+    assert quota.reserve(60) == 0
+    delay = quota.reserve(60)
+    assert delay > 0
+    assert quota._requests.level() == pytest.approx(9.0)  # The refused call took nothing.
+    quota.settle(60, 20)  # The first call used fewer tokens than reserved.
+    assert quota.reserve(60) == 0
+
+
+def test_quota_throttled_empties_the_buckets():
+    clock = Clock()
+    quota = Quota(rpm=100, tpm=1000, clock=clock)
+    quota.throttled()
+    assert quota.reserve(1) > 0
+    assert Quota().unlimited and Quota().reserve(10 ** 9) == 0
+
+
+# --- Grant Order ---
+
+async def grant_order(scheduler, calls, stagger=0.0):
+    """Queues `calls` ((label, workload, session, role)) behind an empty quota; returns the labels in grant order."""
+    granted = []
+    scheduler.quota(MODEL).throttled()
+
+    async def call(label, workload, session, role):
+        with scheduling_scope(workload, session=session):
+            await scheduler.acquire(MODEL, 0, role=role)
+        granted.append(label)
+
+    tasks = []
+    for spec in calls:
+        tasks.append(asyncio.ensure_future(call(*spec)))
+        await asyncio.sleep(stagger)
+    await asyncio.gather(*tasks)
+    return granted
+
+
+def test_calls_are_granted_by_priority_class():
+    scheduler = CallScheduler(quotas={MODEL: (20, 0)}, period=1.0)
+    order = asyncio.run(grant_order(scheduler, [
+        ("batch presenter", BATCH, "b", "presenter"),
+        ("search", INTERACTIVE, "s", "search"),
+        ("specialist", INTERACTIVE, "s", "specialist"),
+        ("presenter", INTERACTIVE, "s", "presenter"),
+        ("analyst", INTERACTIVE, "s", "analyst"),
+    ]))
+    assert order == ["presenter", "analyst", "specialist", "search", "batch presenter"]
+
+
+def test_sessions_are_served_round_robin_within_a_class():
+    scheduler = CallScheduler(quotas={MODEL: (20, 0)}, period=1.0)
+    order = asyncio.run(grant_order(scheduler, [
+        ("a1", BATCH, "a", "analyst"), ("a2", BATCH, "a", "analyst"), ("a3", BATCH, "a", "analyst"),
+        ("b1", BATCH, "b", "analyst"), ("c1", BATCH, "c", "analyst"),
+    ]))
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+@pytest.mark.parametrize("aging_seconds, expected", [(0, ["interactive", "batch"]), (0.01, ["batch", "interactive"])])
+def test_waiting_batch_calls_age_into_higher_classes(aging_seconds, expected):
+    # One grant every ~0.33 s; the batch call has waited 0.1 s (10 aging steps) longer when both are queued.
+    scheduler = CallScheduler(quotas={MODEL: (4, 0)}, period=1.0, aging_seconds=aging_seconds)
+    order = asyncio.run(grant_order(scheduler, [
+        ("batch", BATCH, "b", "specialist"),
+        ("interactive", INTERACTIVE, "i", "presenter"),
+    ], stagger=0.1))
+    assert order == expected
+
+
+def test_unlimited_resources_are_never_queued():
+    scheduler = CallScheduler()
+    assert asyncio.run(scheduler.acquire("unlimited", 10 ** 9)) == 0.0
+    assert scheduler.stats()["resources"]["unlimited"]["granted"] == 1
+
+
+# --- Scheduled Model ---
+
+class ScriptedLlm(BaseLlm):
+    """Yields a partial and a final response, or raises `error` before answering."""
+
+    error: Exception = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if self.error is not None:
+            raise self.error
+        content = genai_types.Content(role="model", parts=[genai_types.Part(text="x" * 400)])
+        yield LlmResponse(content=content, partial=True)
+        yield LlmResponse(content=content)
+
+
+async def collect(llm, limit=None):
+    responses = []
+    async for response in llm.generate_content_async(request()):
+        responses.append(response)
+        if limit is not None and len(responses) >= limit:
+            break
+    return responses
+
+
+def scheduled(scheduler, **kwargs):
+    return ScheduledLlm(model=MODEL, llm=ScriptedLlm(model=MODEL, **kwargs), role="analyst", scheduler=scheduler)
+
+
+def test_reserved_tokens_are_settled_to_the_actual_usage():
+    scheduler = CallScheduler(quotas={MODEL: (1000, 100000)}, clock=Clock())
+    tokens = scheduler.quota(MODEL)._tokens
+    before = tokens.level()
+    asyncio.run(collect(scheduled(scheduler)))
+    # Without usage metadata, a call is charged its estimated prompt plus the answer's estimate.
+    prompt = estimate_request_tokens(request()) - DEFAULT_OUTPUT_TOKEN_ESTIMATE
+    answer = estimate_tokens([genai_types.Content(role="model", parts=[genai_types.Part(text="x" * 400)])])
+    assert tokens.level() == pytest.approx(before - prompt - answer)
+
+
+@pytest.mark.parametrize("error", [RuntimeError("boom"), genai_errors.ServerError(503, {"error": {"code": 503}})])
+def test_failed_calls_refund_their_reservation(error):
+    scheduler = CallScheduler(quotas={MODEL: (1000, 100000)}, clock=Clock())
+    tokens = scheduler.quota(MODEL)._tokens
+    before = tokens.level()
+    with pytest.raises(type(error)):
+        asyncio.run(collect(scheduled(scheduler, error=error)))
+    assert tokens.level() == pytest.approx(before)
+
+
+def test_abandoned_calls_are_charged_their_prompt_only():
+    scheduler = CallScheduler(quotas={MODEL: (1000, 100000)}, clock=Clock())
+    tokens = scheduler.quota(MODEL)._tokens
+    before = tokens.level()
+
+    async def abandon():
+        responses = scheduled(scheduler).generate_content_async(request())
+        await responses.__anext__()
+        await responses.aclose()
+
+    asyncio.run(abandon())
+    assert 0 < before - tokens.level() < 100
+
+
+def replay_model(scheduler, endpoint):
+    llm = ReplayLlm(model=MODEL, role="SearchAgent", recordings=DEFAULT_RECORDINGS, latency=scaled_latency(0),
+                    endpoint=endpoint)
+    return ScheduledLlm(model=MODEL, llm=llm, role="search", scheduler=scheduler)
+
+
+def test_rate_limited_calls_are_queued_again():
+    # The scheduler allows a call every ~0.11 s, the endpoint only one per 0.25 s: the second call
+    # is rejected with 429 until the endpoint's window has passed.
+    endpoint = QuotaEnforcingEndpoint(rpm=1, period=0.25)
+    scheduler = CallScheduler(quotas={MODEL: (10, 0)}, period=1.0, max_retries=5)
+    llm = replay_model(scheduler, endpoint)
+
+    async def two_calls():
+        return [await collect(llm) for _ in range(2)]
+
+    results = asyncio.run(two_calls())
+    assert all(len(responses) == 1 for responses in results)
+    stats = scheduler.stats()["resources"][MODEL]
+    assert endpoint.stats()["accepted"] == 2
+    assert endpoint.stats()["rejected"] >= 1
+    assert stats["throttled"] == stats["retries"] == endpoint.stats()["rejected"]
+
+
+def test_rate_limit_errors_pass_through_after_max_retries():
+    endpoint = QuotaEnforcingEndpoint(rpm=1, period=60.0)
+    scheduler = CallScheduler(quotas={MODEL: (600, 0)}, period=1.0, max_retries=1)
+    llm = replay_model(scheduler, endpoint)
+
+    async def two_calls():
+        await collect(llm)
+        await collect(llm)
+
+    with pytest.raises(genai_errors.ClientError) as raised:
+        asyncio.run(two_calls())
+    assert raised.value.code == 429
+    assert scheduler.stats()["resources"][MODEL]["throttled"] == 2
+    assert scheduler.stats()["resources"][MODEL]["retries"] == 1
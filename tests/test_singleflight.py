@@ -0,0 +1,74 @@
+# tests/test_singleflight.py
+
+import asyncio
+
+from insight_agent.singleflight import SingleFlight, request_intent_key
+
+
+# --- Request Intent Keys ---
+
+def test_filler_words_and_word_order_do_not_change_the_key():
+    assert request_intent_key("RAGAgent, get comprehensive admission statistics for Stanford University") == \
+        request_intent_key("Stanford University admission statistics")
+
+
+def test_college_aliases_share_a_key():
+    assert request_intent_key("Admission statistics for UCB") == \
+        request_intent_key("Admission statistics for University of California, Berkeley")
+    assert request_intent_key("Cal admission statistics") == request_intent_key("UC Berkeley admission statistics")
+
+
+def test_negated_requests_keep_their_word_order():
+    assert request_intent_key("Stanford SAT scores not GPA") != request_intent_key("Stanford GPA not SAT scores")
+    assert request_intent_key("Stanford SAT scores not GPA") == \
+        request_intent_key("Please find Stanford SAT scores, not GPA")
+
+
+def test_comparisons_and_numbers_keep_their_word_order():
+    assert request_intent_key("MIT acceptance rate higher than Stanford") != \
+        request_intent_key("Stanford acceptance rate higher than MIT")
+    assert request_intent_key("Students with GPA 3.5 and SAT 1400") != \
+        request_intent_key("Students with GPA 1400 and SAT 3.5")
+
+
+def test_different_colleges_do_not_share_a_key():
+    assert request_intent_key("Admission statistics for Stanford") != request_intent_key("Admission statistics for MIT")
+
+
+# --- SingleFlight ---
+
+def test_concurrent_calls_with_equal_keys_share_one_execution():
+    singleflight = SingleFlight()
+    executions = []
+
+    async def factory():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(singleflight.do("key", factory, group="RAGAgent") for _ in range(3)),
+                                    singleflight.do("other", factory, group="RAGAgent"))
+
+    assert asyncio.run(run()) == ["result"] * 4
+    assert len(executions) == 2
+    stats = singleflight.stats()["groups"]["RAGAgent"]
+    assert stats["calls"] == 4 and stats["coalesced"] == 2
+    assert singleflight.in_flight() == 0
+
+
+def test_a_cancelled_waiter_leaves_the_shared_call_running():
+    singleflight = SingleFlight()
+
+    async def factory():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def run():
+        first = asyncio.ensure_future(singleflight.do("key", factory))
+        second = asyncio.ensure_future(singleflight.do("key", factory))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "result"
@@ -0,0 +1,79 @@
+# tests/test_tools.py
+
+import asyncio
+import time
+
+import pytest
+from vertexai.preview import rag
+
+from insight_agent.rag_cache import RetrievalCache
+from insight_agent.testing.fakes import load_recordings, make_retrieval_query, scaled_latency
+from insight_agent.tools import CachedVertexAiRagRetrieval
+
+CORPUS = "projects/p/locations/l/ragCorpora/1"
+
+
+@pytest.fixture
+def vertex_calls(monkeypatch):
+    """Replaces rag.retrieval_query with the benchmark's blocking replay (0.2 s per call) and records its queries."""
+    calls = []
+    replay = make_retrieval_query(load_recordings(), scaled_latency(overrides={"rag_ms": 200.0}))
+
+    def retrieval_query(text, **kwargs):
+        calls.append(text)
+        return replay(text, **kwargs)
+
+    monkeypatch.setattr(rag, "retrieval_query", retrieval_query)
+    return calls
+
+
+def make_tool(cache=None):
+    return CachedVertexAiRagRetrieval(cache=cache or RetrievalCache(), corpus_name=CORPUS,
+                                      name="retrieve_rag_documentation", description="Retrieval.",
+                                      rag_corpora=[CORPUS], similarity_top_k=5)
+
+
+async def retrieve(tool, query):
+    return await tool.run_async(args={"query": query}, tool_context=None)
+
+
+def test_vertex_retrievals_run_off_the_event_loop(vertex_calls):
+    tool = make_tool()
+
+    async def concurrent():
+        started = time.perf_counter()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        results = await asyncio.gather(*(retrieve(tool, f"Admission statistics for {college}")
+                                         for college in ("Stanford", "MIT", "Caltech", "Yale")))
+        ticking.cancel()
+        return results, time.perf_counter() - started, ticks
+
+    results, elapsed, ticks = asyncio.run(concurrent())
+    assert [result[0].splitlines()[0] for result in results] == [
+        "College Name: Stanford University", "College Name: Massachusetts Institute of Technology",
+        "College Name: California Institute of Technology", "College Name: Yale University"]
+    assert len(vertex_calls) == 4
+    assert elapsed < 0.6  # Four 0.2 s calls overlap instead of running back to back.
+    assert ticks >= 10  # The event loop kept running while the calls were in flight.
+
+
+def test_cached_results_are_keyed_on_the_normalized_query(vertex_calls):
+    tool = make_tool()
+
+    async def run():
+        for query in ("Cal admission statistics", "university of california, berkeley  admission statistics?",
+                      "Admission statistics for Cal"):
+            await retrieve(tool, query)
+
+    asyncio.run(run())
+    # Aliases and case/punctuation share an entry; reworded queries are retrieved again.
+    assert vertex_calls == ["University of California, Berkeley admission statistics",
+                            "Admission statistics for University of California, Berkeley"]
@@ -0,0 +1,105 @@
+# tests/test_tracing.py
+
+import asyncio
+import json
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import FunctionTool
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types as genai_types
+
+from insight_agent.runtime import run_agent_to_text
+from insight_agent.tracing import AGENT, MODEL, TOOL, JsonlSpanExporter, SpanAggregator, Tracer, load_spans
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls each of the agent's tools once, in name order, then answers."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        called = sum(1 for content in llm_request.contents or () for part in content.parts or ()
+                     if part.function_response)
+        names = sorted(llm_request.tools_dict)
+        if called < len(names):
+            tool = llm_request.tools_dict[names[called]]
+            args = {"request": "Stanford University"} if isinstance(tool, AgentTool) else {"college_name": "Stanford University"}
+            part = genai_types.Part(function_call=genai_types.FunctionCall(name=names[called], args=args))
+        else:
+            part = genai_types.Part(text=f"{len(names)} tools called.")
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[part]))
+
+
+def lookup_college_stats(college_name: str) -> dict:
+    """Returns statistics for a college."""
+    return {"status": "success", "stats": {"college_name": college_name}}
+
+
+def build_graph():
+    specialist = LlmAgent(name="RAGAgent", model=ScriptedLlm(model="scripted"), instruction="Research.",
+                          tools=[FunctionTool(lookup_college_stats)])
+    return LlmAgent(name="Coordinator", model=ScriptedLlm(model="scripted"), instruction="Coordinate.",
+                    tools=[AgentTool(agent=specialist)])
+
+
+def traced_run(tmp_path):
+    path = str(tmp_path / "traces" / "spans.jsonl")
+    aggregator = SpanAggregator()
+    root = Tracer([JsonlSpanExporter(path), aggregator]).instrument(build_graph())
+    assert asyncio.run(run_agent_to_text(root, "Stanford please")) == "1 tools called."
+    return path, aggregator
+
+
+# --- Span Nesting ---
+
+def test_spans_nest_across_agent_tool_sub_runs(tmp_path):
+    path, _ = traced_run(tmp_path)
+    spans = load_spans(path)
+    by_key = {}
+    for span in spans:
+        by_key.setdefault((span["kind"], span["name"]), []).append(span)
+
+    (coordinator,) = by_key[(AGENT, "Coordinator")]
+    (agent_tool,) = by_key[(TOOL, "RAGAgent")]
+    (specialist,) = by_key[(AGENT, "RAGAgent")]
+    (lookup,) = by_key[(TOOL, "lookup_college_stats")]
+    assert coordinator["parent_id"] is None
+    assert agent_tool["parent_id"] == coordinator["span_id"]
+    # The sub-agent's run, inside the AgentTool's own runner, is a child of the tool call.
+    assert specialist["parent_id"] == agent_tool["span_id"]
+    assert lookup["parent_id"] == specialist["span_id"]
+    assert [span["parent_id"] for span in by_key[(MODEL, "RAGAgent")]] == [specialist["span_id"]] * 2
+    assert [span["parent_id"] for span in by_key[(MODEL, "Coordinator")]] == [coordinator["span_id"]] * 2
+    assert {span["trace_id"] for span in spans} == {coordinator["span_id"]}
+    assert lookup["college"] == "Stanford University"
+
+
+def test_model_tokens_roll_up_into_their_agent_span(tmp_path):
+    path, _ = traced_run(tmp_path)
+    spans = load_spans(path)
+    for agent_name in ("Coordinator", "RAGAgent"):
+        (agent,) = [s for s in spans if s["kind"] == AGENT and s["name"] == agent_name]
+        models = [s for s in spans if s["kind"] == MODEL and s["name"] == agent_name]
+        assert all(s["attributes"].get("tokens_estimated") for s in models)
+        assert agent["input_tokens"] == sum(s["input_tokens"] for s in models) > 0
+
+
+# --- Exporters ---
+
+def test_jsonl_exporter_writes_one_complete_record_per_span(tmp_path):
+    path, aggregator = traced_run(tmp_path)
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 8
+    assert all(set(record) == {"trace_id", "span_id", "parent_id", "name", "kind", "college", "start_time",
+                               "duration_ms", "input_tokens", "output_tokens", "retries", "status", "attributes"}
+               for record in records)
+    assert all(record["duration_ms"] >= 0 and record["status"] == "ok" for record in records)
+    # Spans are written as they finish: children before their parents, the root last.
+    assert records[-1]["name"] == "Coordinator" and records[-1]["kind"] == AGENT
+
+    summary = aggregator.summary()
+    assert summary["spans"]["agent:RAGAgent"]["count"] == 1
+    assert summary["spans"]["model:Coordinator"]["count"] == 2
+    assert summary["calls_per_college"]["Stanford University"] == {"tool:lookup_college_stats": 1}